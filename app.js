@@ -44,6 +44,10 @@ class WrappedRenderer {
         return this.renderBigHighlightCard(card);
       case "comparison":
         return this.renderComparisonCard(card);
+      case "trend":
+        return this.renderTrendCard(card);
+      case "heatmap":
+        return this.renderHeatmapCard(card);
       default:
         return `<div class="card">Unknown card type: ${card.type}</div>`;
     }
@@ -116,7 +120,8 @@ class WrappedRenderer {
       .substr(2, 9)}`;
 
     const renderItem = (item, globalIndex, pageIndex) => {
-      const rank = globalIndex + 1;
+      // Tied players share the rank computed by data.py
+      const rank = item.rank ?? globalIndex + 1;
       return `
         <div class="ranked-item" data-rank="${rank}">
           <span class="rank">#${rank}</span>
@@ -231,6 +236,133 @@ class WrappedRenderer {
     `;
   }
 
+  // Render trend card template - one line per player over time
+  renderTrendCard(card) {
+    const colors = [
+      "#ffd166", "#06d6a0", "#118ab2", "#ef476f", "#f78c6b",
+      "#c77dff", "#8ecae6", "#ffffff", "#b5e48c", "#ff99c8",
+    ];
+    const width = 100;
+    const height = 60;
+    const pointCount = card.dates.length;
+    const allValues = card.series
+      .flatMap((series) => series.values)
+      .filter((value) => value !== null);
+    const maxValue = Math.max(1, ...allValues);
+
+    const x = (index) =>
+      pointCount > 1 ? (index / (pointCount - 1)) * width : width / 2;
+    const y = (value) => height - (value / maxValue) * height;
+
+    const linesHTML = card.series
+      .map((series, seriesIndex) => {
+        const points = series.values
+          .map((value, index) =>
+            value === null ? null : `${x(index).toFixed(2)},${y(value).toFixed(2)}`
+          )
+          .filter((point) => point !== null)
+          .join(" ");
+        return `<polyline class="trend-line" points="${points}" stroke="${
+          colors[seriesIndex % colors.length]
+        }" />`;
+      })
+      .join("");
+
+    const legendHTML = card.series
+      .map(
+        (series, seriesIndex) => `
+          <span class="trend-legend-item">
+            <span class="trend-swatch" style="background: ${
+              colors[seriesIndex % colors.length]
+            }"></span>${this.escapeHtml(series.label)}
+          </span>
+        `
+      )
+      .join("");
+
+    const descriptionHTML = card.description
+      ? `<div class="description">${this.escapeHtml(card.description)}</div>`
+      : "";
+    const firstDate = card.dates.find((date) => date) || "";
+    const lastDate = card.dates[pointCount - 1] || "";
+
+    return `
+      <div class="card card-trend">
+        <div class="title">${this.escapeHtml(card.title)}</div>
+        ${descriptionHTML}
+        <svg class="trend-chart" viewBox="0 0 ${width} ${height}" preserveAspectRatio="none">
+          ${linesHTML}
+        </svg>
+        <div class="trend-axis">
+          <span>${this.escapeHtml(firstDate)}</span>
+          <span>${this.escapeHtml(lastDate)}</span>
+        </div>
+        <div class="trend-legend">${legendHTML}</div>
+      </div>
+    `;
+  }
+
+  // Render heatmap card template - one cell per pair of players
+  renderHeatmapCard(card) {
+    const limit = Math.max(
+      1,
+      ...card.values.flat().map((value) => (value === null ? 0 : Math.abs(value)))
+    );
+    const cellColor = (value) => {
+      if (value === null) return "transparent";
+      const alpha = (0.15 + 0.75 * Math.min(Math.abs(value) / limit, 1)).toFixed(2);
+      return value >= 0 ? `rgba(6, 214, 160, ${alpha})` : `rgba(239, 71, 111, ${alpha})`;
+    };
+    const unit = card.unit ? ` ${card.unit}` : "";
+
+    const headerHTML = card.players
+      .map(
+        (player) =>
+          `<div class="heatmap-col-label" title="${this.escapeHtml(player)}">${this.escapeHtml(
+            player.slice(0, 3)
+          )}</div>`
+      )
+      .join("");
+
+    const rowsHTML = card.players
+      .map((player, row) => {
+        const cellsHTML = card.values[row]
+          .map((value, col) => {
+            const rounds = card.rounds ? card.rounds[row][col] : null;
+            const tooltip =
+              row === col
+                ? ""
+                : `${player} with ${card.players[col]}: ${
+                    value === null ? "not enough rounds" : `${value > 0 ? "+" : ""}${value}${unit}`
+                  }${rounds !== null ? ` (${rounds} rounds)` : ""}`;
+            const text = value === null ? "" : `${value > 0 ? "+" : ""}${Math.round(value)}`;
+            return `<div class="heatmap-cell" style="background: ${cellColor(
+              value
+            )}" title="${this.escapeHtml(tooltip)}">${text}</div>`;
+          })
+          .join("");
+        return `<div class="heatmap-row-label">${this.escapeHtml(player)}</div>${cellsHTML}`;
+      })
+      .join("");
+
+    const descriptionHTML = card.description
+      ? `<div class="description">${this.escapeHtml(card.description)}</div>`
+      : "";
+
+    return `
+      <div class="card card-heatmap">
+        <div class="title">${this.escapeHtml(card.title)}</div>
+        ${descriptionHTML}
+        <div class="heatmap-grid" style="grid-template-columns: auto repeat(${
+          card.players.length
+        }, minmax(0, 1fr))">
+          <div></div>${headerHTML}
+          ${rowsHTML}
+        </div>
+      </div>
+    `;
+  }
+
   // Initialize Swiper with vertical direction
   initSwiper() {
     this.swiper = new Swiper("#wrappedSwiper", {
@@ -409,16 +541,47 @@ class WrappedRenderer {
   }
 }
 
+// Fetch one personal or group deck by key from the shards written by decks.py
+async function loadDeck(key, manifestUrl = "decks/index.json") {
+  const manifest = await fetch(manifestUrl).then((res) => {
+    if (!res.ok) throw new Error(`Deck manifest not found: ${manifestUrl}`);
+    return res.json();
+  });
+  const shard = manifest.decks[key];
+  if (!shard) throw new Error(`No deck for ${key}`);
+  const base = manifestUrl.slice(0, manifestUrl.lastIndexOf("/") + 1);
+  const deck = await fetch(base + shard).then((res) => res.json());
+  return deck.slides;
+}
+
 // Initialize the app when DOM is ready
 document.addEventListener("DOMContentLoaded", () => {
   const container = document.getElementById("swiperWrapper");
 
-  if (typeof wrappedData !== "undefined" && container) {
-    const renderer = new WrappedRenderer(wrappedData, container);
+  const start = (data) => {
+    const renderer = new WrappedRenderer(data, container);
     renderer.init();
     // Store renderer globally for visibility change handler
     window.wrappedRenderer = renderer;
+  };
+  const fallback = () => {
+    if (typeof wrappedData !== "undefined" && container) {
+      start(wrappedData);
+    } else {
+      console.error("Wrapped data or container not found");
+    }
+  };
+
+  // index.html?deck=<group>/<player> shows that player's deck
+  const deckKey = new URLSearchParams(window.location.search).get("deck");
+  if (deckKey && container) {
+    loadDeck(deckKey)
+      .then(start)
+      .catch((err) => {
+        console.error(err);
+        fallback();
+      });
   } else {
-    console.error("Wrapped data or container not found");
+    fallback();
   }
 });
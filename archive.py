@@ -0,0 +1,50 @@
+"""
+Process a whole archive of game logs (one file per season / table group) in
+parallel. Each file is reduced to a StatsAccumulator in a worker process and
+the partials are merged into one result.
+"""
+import glob
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+
+from stats_core import load_accumulator
+
+LOG_EXTENSIONS = (".json", ".ndjson", ".jsonl")
+
+
+def expand_paths(patterns):
+    """
+    Expand files, directories and glob patterns into a sorted list of game
+    log paths. Directories contribute every .json / .ndjson / .jsonl file in them.
+    """
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.update(os.path.join(pattern, name) for name in os.listdir(pattern)
+                         if name.endswith(LOG_EXTENSIONS))
+        elif glob.has_magic(pattern):
+            paths.update(path for path in glob.glob(pattern, recursive=True) if os.path.isfile(path))
+        else:
+            paths.add(pattern)
+    return sorted(paths)
+
+
+def _merge(left, right):
+    return left.merge(right)
+
+
+def accumulate_archive(patterns, jobs=None):
+    """
+    Accumulate every game log matched by patterns using a pool of jobs
+    worker processes (default: one per CPU) and merge the partials.
+    """
+    paths = expand_paths(patterns)
+    if not paths:
+        raise FileNotFoundError(f"No game logs found for {', '.join(patterns)}")
+    if len(paths) == 1 or jobs == 1:
+        return reduce(_merge, map(load_accumulator, paths))
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # Results arrive in path order, so the merged first-seen order is stable
+        return reduce(_merge, pool.map(load_accumulator, paths))
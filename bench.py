@@ -0,0 +1,132 @@
+"""
+Benchmark the stats pipeline on synthetic game logs of increasing size.
+
+Each size runs in a fresh process so peak RSS is per size. Results are
+written as JSON so runs can be compared, e.g.:
+
+    python bench.py --sizes 1000 100000 --output bench_results.json
+    python bench.py --baseline bench_results.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+ROUNDS_PER_GAME = (6, 10)  # same range the generator uses, 8 rounds on average
+OUTPUT_FILE = "bench_results.json"
+
+
+def _peak_rss_mb():
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_size(target_rounds, num_players=10, seed=0):
+    """Generate a log of about target_rounds rounds and time each pipeline stage on it."""
+    from chat import leader_stats_view
+    from data import generate_wrapped_data_js, stats_view
+    from ingest import GameLog
+    from rankings import build_leaderboards
+    from stats_core import load_accumulator
+    from synthetic import write_log
+
+    num_games = max(1, target_rounds // (sum(ROUNDS_PER_GAME) // 2))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "games.json")
+        write_log(path, num_games, num_players, rounds_per_game=ROUNDS_PER_GAME, seed=seed)
+        size_bytes = os.path.getsize(path)
+
+        stages = {}
+
+        def timed(name, fn, *args):
+            start = time.perf_counter()
+            value = fn(*args)
+            stages[name] = {"seconds": time.perf_counter() - start}
+            return value
+
+        # Games are streamed from disk in every stage, as data.py reads them,
+        # so peak RSS is that of the real pipeline rather than of a list of games
+        rounds = timed("parse", lambda: sum(len(game["rounds"]) for game in GameLog(path)))
+        # Parse, validate and aggregate: the end-to-end path of a data.py run
+        accumulator = timed("stream_total", load_accumulator, path)
+        stats = timed("rank", lambda: (stats_view(accumulator), leader_stats_view(accumulator))[0])
+        leaderboards = timed("leaderboards", build_leaderboards, stats["player_stats"])
+        timed("emit", generate_wrapped_data_js, stats, (), leaderboards)
+
+    for stage in stages.values():
+        stage["rounds_per_sec"] = rounds / stage["seconds"] if stage["seconds"] > 0 else None
+
+    return {
+        "target_rounds": target_rounds,
+        "rounds": rounds,
+        "games": num_games,
+        "file_bytes": size_bytes,
+        "stages": stages,
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+
+
+def run_benchmarks(sizes, num_players=10, seed=0):
+    results = []
+    # spawn, not fork, so every size starts from a clean process and its own peak RSS
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn"), max_tasks_per_child=1) as pool:
+        for size in sizes:
+            result = pool.submit(run_size, size, num_players, seed).result()
+            results.append(result)
+            print_result(result)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "num_players": num_players,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def print_result(result, baseline=None):
+    print(f"{result['rounds']:>10,} rounds  {result['file_bytes'] / 1e6:8.1f} MB  "
+          f"peak RSS {result['peak_rss_mb']:8.1f} MB")
+    for name, stage in result["stages"].items():
+        line = f"    {name:<13} {stage['seconds']:9.3f}s  {stage['rounds_per_sec'] or 0:>14,.0f} rounds/s"
+        if baseline and name in baseline["stages"]:
+            ratio = baseline["stages"][name]["seconds"] / stage["seconds"] if stage["seconds"] else 0
+            line += f"  ({ratio:.2f}x vs baseline)"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Kali Teeri stats pipeline.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="approximate rounds per run")
+    parser.add_argument("--players", type=int, default=10, help="frequent players in the synthetic league")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=OUTPUT_FILE, help="where to write the JSON results")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.sizes, args.players, args.seed)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = {r["target_rounds"]: r for r in json.load(f)["results"]}
+        print("\nCompared with", args.baseline)
+        for result in report["results"]:
+            print_result(result, baseline.get(result["target_rounds"]))
+
+    print(f"\n✓ Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
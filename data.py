@@ -1,174 +1,144 @@
-import json
-from collections import Counter, defaultdict
+import argparse
+import functools
+import os
+import sys
 
-def calculate_stats(data):
+from archive import accumulate_archive, expand_paths
+from instrument import dump_at_exit, metrics, start_memory_tracing, start_profiling
+from rankings import build_leaderboards
+from slide_writer import COMPRESSIONS, brotli, iter_js, write_slides
+from stats_core import accumulate_games, load_accumulator
+
+SNAPSHOT_FILE = "stats_snapshot.json"  # saved accumulator for incremental runs
+RATINGS_FILE = "ratings_checkpoint.json"  # saved rating engine for incremental runs
+CLUTCH_THRESHOLD = 200  # Clutch wins are wins as leader with bid >= this
+TRIO_MIN_PLAYERS = 8    # Trios only count in games with at least this many players
+
+
+def stats_view(accumulator, clutch_threshold=CLUTCH_THRESHOLD, trio_min_players=TRIO_MIN_PLAYERS):
     """
-    Calculate all statistics for Kali Teeri Wrapped 2025.
-    Only processes players in frequentNames array, ignores "Guest" players.
+    Build the Wrapped statistics from a filled StatsAccumulator.
+    Only reports players in frequentNames array, ignores "Guest" players.
     """
-    # Get the list of frequent players to filter by
-    frequent_players = set(data.get('frequentNames', []))
-    
-    # Statistics tracking dictionaries
-    games_played = defaultdict(set)  # Track unique games each player participated in
-    total_rounds = Counter()  # Total rounds participated (as leader or teammate)
-    total_wins = Counter()    # Total wins (as leader or teammate)
-    
-    # Leader stats
-    leader_count = Counter()  # Total times bidding/leading
-    leader_wins = Counter()   # Total wins as leader
-    clutch_wins = Counter()   # Wins as leader with bid >= 200
-    
-    # Teammate stats
-    teammate_count = Counter()  # Total times called as teammate
-    teammate_wins = Counter()   # Total wins as teammate
-    
-    # Trio tracking (only for games with 8+ players)
-    trios = Counter()  # Key: sorted tuple of 3 names, Value: win count
-    
-    # Process all games and rounds
-    for game_idx, game in enumerate(data.get('pastGames', [])):
-        game_players = set(game.get('players', []))
-        num_players = len(game_players)
-        
-        # Only process trios for games with 8 or more players
-        process_trios = num_players >= 8
-        
-        for rd in game.get('rounds', []):
-            leader = rd['leader']
-            teammates = rd['teammates']
-            points = rd['points']
-            won = rd['result']
-            
-            # Only process if leader is in frequentNames (ignore Guest players)
-            if leader not in frequent_players:
-                continue
-            
-            # Count as leader
-            leader_count[leader] += 1
-            total_rounds[leader] += 1
-            games_played[leader].add(game_idx)
-            
-            if won:
-                leader_wins[leader] += 1
-                total_wins[leader] += 1
-                
-                # Check for clutch win (bid >= 200)
-                if points >= 200:
-                    clutch_wins[leader] += 1
-            
-            # Process teammates (only if they're in frequentNames)
-            for tm in teammates:
-                if tm not in frequent_players:
-                    continue
-                
-                # Count as teammate
-                teammate_count[tm] += 1
-                total_rounds[tm] += 1
-                games_played[tm].add(game_idx)
-                
-                if won:
-                    teammate_wins[tm] += 1
-                    total_wins[tm] += 1
-            
-            # Track trios (only for games with 8+ players, and all must be frequent players)
-            if process_trios and won and len(teammates) == 2:
-                trio_members = [leader] + teammates
-                if all(member in frequent_players for member in trio_members):
-                    trio_key = tuple(sorted(trio_members))
-                    trios[trio_key] += 1
-    
-    # Calculate Podium Finishes (1st, 2nd, 3rd place)
-    podium_counts = {
-        '1st': Counter(),
-        '2nd': Counter(),
-        '3rd': Counter()
-    }
-    
-    for game in data.get('pastGames', []):
-        scores = game.get('scores', {})
-        if not scores:
-            continue
-        
-        # Sort players by score (descending)
-        sorted_players = sorted(scores.items(), key=lambda x: x[1], reverse=True)
-        
-        # Assign podium positions (only to frequent players)
-        for position, (player, score) in enumerate(sorted_players[:3], 1):
-            if player in frequent_players:
-                if position == 1:
-                    podium_counts['1st'][player] += 1
-                elif position == 2:
-                    podium_counts['2nd'][player] += 1
-                elif position == 3:
-                    podium_counts['3rd'][player] += 1
-    
+    clutch_wins = accumulator.clutch_counts(clutch_threshold)
+    podium_1st = accumulator.place_counts(1)
+
     # Calculate statistics for each frequent player
     player_stats = {}
-    
-    for player in frequent_players:
-        # Most Active (Games Played)
-        games_count = len(games_played[player])
-        
+
+    for player in accumulator.frequent_order:
+        total_rounds = accumulator.total_rounds(player)
+        leader_count = accumulator.leader_count[player]
+        teammate_count = accumulator.teammate_count[player]
+
         # Round Win %: (Total wins) / (Total rounds participated)
-        round_win_pct = (total_wins[player] / total_rounds[player] * 100) if total_rounds[player] > 0 else 0
-        
+        round_win_pct = (accumulator.total_wins(player) / total_rounds * 100) if total_rounds > 0 else 0
+
         # Leader Conversion Rate: (Wins as leader) / (Times bidding/leading)
-        leader_conv_rate = (leader_wins[player] / leader_count[player] * 100) if leader_count[player] > 0 else 0
-        
-        # The Clutch Player: Total wins as leader with bid >= 200
-        clutch_count = clutch_wins[player]
-        
+        leader_conv_rate = (accumulator.leader_wins[player] / leader_count * 100) if leader_count > 0 else 0
+
         # Teammate Win Rate: (Wins as teammate) / (Times called as teammate)
-        teammate_win_rate = (teammate_wins[player] / teammate_count[player] * 100) if teammate_count[player] > 0 else 0
-        
-        # Podium finishes
-        podium_1st = podium_counts['1st'][player]
-        
+        teammate_win_rate = (accumulator.teammate_wins[player] / teammate_count * 100) if teammate_count > 0 else 0
+
         player_stats[player] = {
-            'games_played': games_count,
+            'games_played': accumulator.games_played[player],
             'round_win_pct': round(round_win_pct, 1),
             'leader_conv_rate': round(leader_conv_rate, 1),
-            'clutch_wins': clutch_count,
-            'teammate_count': teammate_count[player],
+            'clutch_wins': clutch_wins[player],
+            'teammate_count': teammate_count,
             'teammate_win_rate': round(teammate_win_rate, 1),
-            'podium_1st': podium_1st
+            'podium_1st': podium_1st[player]
         }
-    
-    # Find The Most Wanted (most called as teammate)
-    most_wanted_player = None
-    most_wanted_count = 0
-    for player in frequent_players:
-        if teammate_count[player] > most_wanted_count:
-            most_wanted_count = teammate_count[player]
-            most_wanted_player = player
-    
-    # Find The Clutch King (most clutch wins)
-    clutch_king = None
-    clutch_king_count = 0
-    for player in frequent_players:
-        if clutch_wins[player] > clutch_king_count:
-            clutch_king_count = clutch_wins[player]
-            clutch_king = player
-    
-    # Find Unstoppable Trio (top trio with most wins)
+
+    # The Most Wanted (most called as teammate) and The Clutch King (most
+    # clutch wins). Players tied for first are listed in tied_with
+    boards = build_leaderboards(player_stats, ('teammate_count', 'clutch_wins'))
+    most_wanted = _top_with_ties(boards['teammate_count'])
+    clutch_king = _top_with_ties(boards['clutch_wins'])
+
+    # Find Unstoppable Trio (top winning trio, ties go alphabetically
+    # so the answer doesn't depend on the order games were added in)
     unstoppable_trio = None
     unstoppable_trio_wins = 0
-    if trios:
-        top_trio_key, unstoppable_trio_wins = trios.most_common(1)[0]
-        unstoppable_trio = list(top_trio_key)
-    
+    top_trios = accumulator.teams.top(1, by='wins', size=3, min_game_size=trio_min_players, tie_break='name')
+    if top_trios and top_trios[0]['wins'] > 0:
+        unstoppable_trio = list(top_trios[0]['players'])
+        unstoppable_trio_wins = top_trios[0]['wins']
+
     return {
         'player_stats': player_stats,
-        'most_wanted': {'player': most_wanted_player, 'count': most_wanted_count},
-        'clutch_king': {'player': clutch_king, 'count': clutch_king_count},
+        'most_wanted': most_wanted,
+        'clutch_king': clutch_king,
         'unstoppable_trio': {'players': unstoppable_trio, 'wins': unstoppable_trio_wins}
     }
 
 
-def print_stats(stats):
-    """Print all statistics to console for verification."""
-    player_stats = stats['player_stats']
+def _top_with_ties(board):
+    leaders = board.leaders()
+    if not leaders:
+        return {'player': None, 'count': 0, 'tied_with': []}
+    return {'player': leaders[0]['player'], 'count': leaders[0]['value'],
+            'tied_with': [entry['player'] for entry in leaders[1:]]}
+
+
+def calculate_stats(data):
+    """
+    Calculate all statistics for Kali Teeri Wrapped 2025.
+    Only processes players in frequentNames array, ignores "Guest" players.
+    """
+    return stats_view(accumulate_games(data.get('frequentNames', []), data.get('pastGames', [])))
+
+
+def calculate_stats_from_file(path):
+    """
+    Same as calculate_stats, but streams games from a JSON or NDJSON log
+    one at a time instead of loading the whole file first.
+    """
+    return stats_view(load_accumulator(path))
+
+
+def calculate_stats_incremental(path, snapshot_path):
+    """
+    Same as calculate_stats_from_file, but resumes from the accumulator saved
+    at snapshot_path and only processes games that aren't in it yet.
+    """
+    return stats_view(load_accumulator(path, snapshot_path))
+
+
+def calculate_stats_archive(patterns, jobs=None):
+    """
+    Calculate the statistics over many game logs (files, directories or glob
+    patterns) at once, processing the files in parallel worker processes.
+    """
+    return stats_view(accumulate_archive(patterns, jobs))
+
+
+@functools.lru_cache(maxsize=1)
+def load_round_table(path, cached=False):
+    """
+    The (RoundTable, header) of one log for the numpy extras, built once per
+    run. Through the binary cache next to the log with cached=True (--cache),
+    otherwise in memory so a plain run writes nothing beside the log.
+    """
+    if cached:
+        from game_cache import open_cached
+        return open_cached(path)
+    from round_table import RoundTable
+    return RoundTable.from_log(path)
+
+
+def _names(highlight):
+    """The highlighted player followed by anyone tied with them."""
+    return [highlight['player']] + highlight.get('tied_with', [])
+
+
+def print_stats(stats, leaderboards=None):
+    """
+    Print all statistics to console for verification.
+    leaderboards (from rankings.build_leaderboards) are built if not given.
+    """
+    if leaderboards is None:
+        leaderboards = build_leaderboards(stats['player_stats'])
     
     print("=" * 60)
     print("KALI TEERI WRAPPED 2025 - STATISTICS")
@@ -177,31 +147,27 @@ def print_stats(stats):
     
     # Most Active (Games Played)
     print("--- THE ACTIVE LEGENDS (Games Played) ---")
-    sorted_games = sorted(player_stats.items(), key=lambda x: x[1]['games_played'], reverse=True)
-    for i, (player, data) in enumerate(sorted_games, 1):
-        print(f"{i}. {player}: {data['games_played']} games")
+    for entry in leaderboards['games_played']:
+        print(f"{entry['rank']}. {entry['player']}: {entry['value']} games")
     print()
     
     # Round Win % (Champions)
     print("--- THE CHAMPIONS (Round Win %) ---")
-    sorted_win_pct = sorted(player_stats.items(), key=lambda x: x[1]['round_win_pct'], reverse=True)
-    for i, (player, data) in enumerate(sorted_win_pct, 1):
-        print(f"{i}. {player}: {data['round_win_pct']}%")
+    for entry in leaderboards['round_win_pct']:
+        print(f"{entry['rank']}. {entry['player']}: {_value_text(entry, '%')}")
     print()
     
-    # Leader Conversion Rate (Closers)
+    # Leader Conversion Rate (Closers), only players who have led
     print("--- THE CLOSERS (Leader Conversion Rate) ---")
-    sorted_conv = sorted(player_stats.items(), key=lambda x: x[1]['leader_conv_rate'], reverse=True)
-    for i, (player, data) in enumerate(sorted_conv, 1):
-        if data['leader_conv_rate'] > 0:  # Only show players who have led
-            print(f"{i}. {player}: {data['leader_conv_rate']}%")
+    for entry in leaderboards['leader_conv_rate']:
+        print(f"{entry['rank']}. {entry['player']}: {_value_text(entry, '%')}")
     print()
     
     # Clutch King
     clutch_king = stats['clutch_king']
     print("--- CLUTCH KING ---")
     if clutch_king['player']:
-        print(f"{clutch_king['player']}: {clutch_king['count']} wins with bid >= 200")
+        print(f"{', '.join(_names(clutch_king))}: {clutch_king['count']} wins with bid >= 200")
     else:
         print("No clutch wins recorded")
     print()
@@ -210,17 +176,15 @@ def print_stats(stats):
     most_wanted = stats['most_wanted']
     print("--- THE MOST WANTED ---")
     if most_wanted['player']:
-        print(f"{most_wanted['player']}: Called {most_wanted['count']} times")
+        print(f"{', '.join(_names(most_wanted))}: Called {most_wanted['count']} times")
     else:
         print("No teammate calls recorded")
     print()
     
-    # Teammate Win Rate (Kingmakers)
+    # Teammate Win Rate (Kingmakers), only players who have been teammates
     print("--- THE KINGMAKERS (Teammate Win Rate) ---")
-    sorted_tm_win = sorted(player_stats.items(), key=lambda x: x[1]['teammate_win_rate'], reverse=True)
-    for i, (player, data) in enumerate(sorted_tm_win, 1):
-        if data['teammate_win_rate'] > 0:  # Only show players who have been teammates
-            print(f"{i}. {player}: {data['teammate_win_rate']}%")
+    for entry in leaderboards['teammate_win_rate']:
+        print(f"{entry['rank']}. {entry['player']}: {_value_text(entry, '%')}")
     print()
     
     # Unstoppable Trio
@@ -235,20 +199,35 @@ def print_stats(stats):
     
     # Podium Finishes (1st place)
     print("--- THE PODIUM (Most 1st Place Finishes) ---")
-    sorted_podium = sorted(player_stats.items(), key=lambda x: x[1]['podium_1st'], reverse=True)
-    for i, (player, data) in enumerate(sorted_podium, 1):
-        print(f"{i}. {player}: {data['podium_1st']} first place finishes")
+    for entry in leaderboards['podium_1st']:
+        print(f"{entry['rank']}. {entry['player']}: {entry['value']} first place finishes")
     print()
     
     print("=" * 60)
 
 
-def generate_wrapped_data_js(stats):
+def _value_text(entry, unit):
+    """An entry's value with its unit, followed by its confidence interval if it has one."""
+    interval = entry.get('interval')
+    if interval is None:
+        return f"{entry['value']}{unit}"
+    return f"{entry['value']}{unit} ({interval[0]}–{interval[1]})"
+
+
+def _ranked_items(board, unit):
+    """ranked_list items for a leaderboard, with competition ranks so ties share a number."""
+    return [{'rank': entry['rank'], 'label': entry['player'], 'value': _value_text(entry, unit)}
+            for entry in board]
+
+
+def build_slides(stats, extra_slides=(), leaderboards=None):
     """
-    Generate the wrapped_data.js file content in the correct format.
-    Returns the JavaScript code as a string.
+    Build the list of slide dicts for a Wrapped deck.
+    extra_slides (e.g. a windows.trend_slide) are appended after the podium.
+    leaderboards (from rankings.build_leaderboards) are built if not given.
     """
-    player_stats = stats['player_stats']
+    if leaderboards is None:
+        leaderboards = build_leaderboards(stats['player_stats'])
     
     # Build the slides array
     slides = []
@@ -262,33 +241,26 @@ def generate_wrapped_data_js(stats):
     })
     
     # 2. The Active Legends (Games Played)
-    sorted_games = sorted(player_stats.items(), key=lambda x: x[1]['games_played'], reverse=True)
     slides.append({
         'type': 'ranked_list',
         'title': 'The Active Legends',
-        'items': [{'label': player, 'value': f"{data['games_played']} games"} 
-                 for player, data in sorted_games],
+        'items': _ranked_items(leaderboards['games_played'], ' games'),
         'theme': 'theme-1'
     })
     
     # 3. The Champions (Round Win %)
-    sorted_win_pct = sorted(player_stats.items(), key=lambda x: x[1]['round_win_pct'], reverse=True)
     slides.append({
         'type': 'ranked_list',
         'title': 'The Champions',
-        'items': [{'label': player, 'value': f"{data['round_win_pct']}%"} 
-                 for player, data in sorted_win_pct],
+        'items': _ranked_items(leaderboards['round_win_pct'], '%'),
         'theme': 'theme-4'
     })
     
     # 4. The Closers (Leader Conversion Rate)
-    sorted_conv = sorted(player_stats.items(), key=lambda x: x[1]['leader_conv_rate'], reverse=True)
-    sorted_conv = [(p, d) for p, d in sorted_conv if d['leader_conv_rate'] > 0]  # Filter out zeros
     slides.append({
         'type': 'ranked_list',
         'title': 'The Closers',
-        'items': [{'label': player, 'value': f"{data['leader_conv_rate']}%"} 
-                 for player, data in sorted_conv],
+        'items': _ranked_items(leaderboards['leader_conv_rate'], '%'),
         'theme': 'theme-2'
     })
     
@@ -298,7 +270,7 @@ def generate_wrapped_data_js(stats):
         slides.append({
             'type': 'big_highlight',
             'title': 'Clutch King',
-            'name': clutch_king['player'],
+            'name': " & ".join(_names(clutch_king)),
             'stat': f"{clutch_king['count']} Wins ≥ 200 pts",
             'description': 'The master of high-stakes victories.',
             'theme': 'theme-5'
@@ -310,24 +282,33 @@ def generate_wrapped_data_js(stats):
         slides.append({
             'type': 'big_highlight',
             'title': 'The Most Wanted',
-            'name': most_wanted['player'],
+            'name': " & ".join(_names(most_wanted)),
             'stat': f"{most_wanted['count']} Times Called",
             'description': 'The most sought-after teammate of 2025.',
             'theme': 'theme-3'
         })
     
     # 7. The Kingmakers (Teammate Win Rate)
-    sorted_tm_win = sorted(player_stats.items(), key=lambda x: x[1]['teammate_win_rate'], reverse=True)
-    sorted_tm_win = [(p, d) for p, d in sorted_tm_win if d['teammate_win_rate'] > 0]  # Filter out zeros
     slides.append({
         'type': 'ranked_list',
         'title': 'The Kingmakers',
-        'items': [{'label': player, 'value': f"{data['teammate_win_rate']}%"} 
-                 for player, data in sorted_tm_win],
+        'items': _ranked_items(leaderboards['teammate_win_rate'], '%'),
         'theme': 'theme-1'
     })
     
-    # 8. Unstoppable Trio
+    # 8. Leading vs Following (conversion as leader next to win rate as teammate)
+    player_stats = stats['player_stats']
+    slides.append({
+        'type': 'comparison',
+        'title': 'Leading vs Following',
+        'items': [{'label': entry['player'],
+                   'value': f"{player_stats[entry['player']]['leader_conv_rate']}% leading · "
+                            f"{player_stats[entry['player']]['teammate_win_rate']}% called"}
+                  for entry in leaderboards['games_played']],
+        'theme': 'theme-5'
+    })
+    
+    # 9. Unstoppable Trio
     unstoppable_trio = stats['unstoppable_trio']
     if unstoppable_trio['players']:
         players_str = ", ".join(unstoppable_trio['players'])
@@ -340,66 +321,175 @@ def generate_wrapped_data_js(stats):
             'theme': 'theme-4'
         })
     
-    # 9. The Podium (Most 1st place finishes)
-    sorted_podium = sorted(player_stats.items(), key=lambda x: x[1]['podium_1st'], reverse=True)
+    # 10. The Podium (Most 1st place finishes)
     slides.append({
         'type': 'ranked_list',
         'title': 'The Podium',
-        'items': [{'label': player, 'value': f"{data['podium_1st']} first place finishes"} 
-                 for player, data in sorted_podium],
+        'items': _ranked_items(leaderboards['podium_1st'], ' first place finishes'),
         'theme': 'theme-2'
     })
     
-    # Generate JavaScript code
-    js_lines = ["// Kali Teeri Wrapped 2025 Data", "const wrappedData = ["]
-    
-    for i, slide in enumerate(slides):
-        js_lines.append("  {")
-        if slide['type'] == 'intro':
-            js_lines.append(f"    type: \"{slide['type']}\",")
-            js_lines.append(f"    title: \"{slide['title']}\",")
-            js_lines.append(f"    subtitle: \"{slide['subtitle']}\",")
-            js_lines.append(f"    theme: \"{slide['theme']}\",")
-        elif slide['type'] == 'ranked_list':
-            js_lines.append(f"    type: \"{slide['type']}\",")
-            js_lines.append(f"    title: \"{slide['title']}\",")
-            js_lines.append("    items: [")
-            for item in slide['items']:
-                js_lines.append(f"      {{ label: \"{item['label']}\", value: \"{item['value']}\" }},")
-            js_lines.append("    ],")
-            js_lines.append(f"    theme: \"{slide['theme']}\",")
-        elif slide['type'] == 'big_highlight':
-            js_lines.append(f"    type: \"{slide['type']}\",")
-            js_lines.append(f"    title: \"{slide['title']}\",")
-            js_lines.append(f"    name: \"{slide['name']}\",")
-            js_lines.append(f"    stat: \"{slide['stat']}\",")
-            js_lines.append(f"    description: \"{slide['description']}\",")
-            js_lines.append(f"    theme: \"{slide['theme']}\",")
-        
-        js_lines.append("  },")
-    
-    js_lines.append("];")
-    
-    return "\n".join(js_lines)
+    slides.extend(extra_slides)
+    return slides
+
+
+def generate_wrapped_data_js(stats, extra_slides=(), leaderboards=None, pretty=True):
+    """
+    Generate the wrapped_data.js file content in the correct format.
+    Takes the same arguments as build_slides, plus pretty=False for minified output.
+    Returns the JavaScript code as a string.
+    """
+    return "".join(iter_js(build_slides(stats, extra_slides, leaderboards), pretty))
 
 
 # Main execution
 if __name__ == "__main__":
-    # Load data
-    with open("data.json", "r") as f:
-        game_data = json.load(f)
-    
-    # Calculate statistics
-    stats = calculate_stats(game_data)
-    
+    parser = argparse.ArgumentParser(description="Calculate Kali Teeri Wrapped statistics.")
+    parser.add_argument("logs", nargs="*", default=["data.json"],
+                        help="game log files, directories or glob patterns (default: data.json)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes when processing several logs (default: one per CPU)")
+    parser.add_argument("--cache", action="store_true",
+                        help="read the log through its binary cache (.ktwc, rebuilt when the log changes; needs numpy)")
+    parser.add_argument("--db", metavar="PATH",
+                        help="import the logs into a SQLite game store at PATH and compute the stats there (see store.py)")
+    parser.add_argument("--trend-window", type=int, metavar="GAMES",
+                        help="add a slide charting each player's rolling round win %% over GAMES games (needs numpy)")
+    parser.add_argument("--synergy", action="store_true",
+                        help="add a heatmap slide of how much each pair lifts each other's win %% (needs numpy)")
+    parser.add_argument("--ratings", action="store_true",
+                        help="add a slide of team-aware Elo ratings, resumed from ratings_checkpoint.json")
+    parser.add_argument("--validate-scores", action="store_true",
+                        help="replay every game's rounds and stop if the recorded scores disagree (needs numpy)")
+    parser.add_argument("--intervals", choices=("wilson", "bootstrap"),
+                        help="show 95%% confidence intervals on every rate (bootstrap over games needs numpy)")
+    parser.add_argument("--rank-by-lower-bound", action="store_true",
+                        help="rank the rate leaderboards by the lower end of their interval (implies --intervals wilson)")
+    parser.add_argument("--minify", action="store_true", help="write wrapped_data.js without indentation")
+    parser.add_argument("--compress", nargs="+", choices=COMPRESSIONS, default=(), metavar="FORMAT",
+                        help="also write precompressed wrapped_data.js.gz / .br (br needs the brotli package)")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and rebuild wrapped_data.js whenever the log changes (see watch.py)")
+    parser.add_argument("--metrics", metavar="PATH",
+                        help="write stage timings and counters to PATH as JSON at exit")
+    parser.add_argument("--profile", metavar="PATH", help="run under cProfile and write the stats to PATH")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="record peak memory and top allocation sites with tracemalloc (in --metrics)")
+    args = parser.parse_args()
+    if "br" in args.compress and brotli is None:
+        parser.error("--compress br needs the brotli package (pip install brotli)")
+    if args.watch and (len(args.logs) != 1 or not os.path.isfile(args.logs[0])):
+        parser.error("--watch needs a single game log file")
+    if args.watch and (args.trend_window or args.ratings or args.synergy or args.intervals or args.rank_by_lower_bound):
+        parser.error("--watch keeps the standard deck up to date; run the extra slides separately")
+    if args.watch and args.db:
+        parser.error("--watch and --db can't be combined")
+    if args.intervals == "bootstrap" and (len(args.logs) != 1 or not os.path.isfile(args.logs[0])):
+        parser.error("--intervals bootstrap needs a single game log file; use --intervals wilson for several")
+    if args.trend_window and (len(args.logs) != 1 or not os.path.isfile(args.logs[0])):
+        parser.error("--trend-window needs a single game log file")
+    if args.synergy and (len(args.logs) != 1 or not os.path.isfile(args.logs[0])):
+        parser.error("--synergy needs a single game log file")
+    if args.ratings and (len(args.logs) != 1 or not os.path.isfile(args.logs[0])):
+        parser.error("--ratings needs a single game log file")
+
+    if args.metrics:
+        dump_at_exit(args.metrics)
+    if args.profile:
+        start_profiling(args.profile)
+    if args.trace_memory:
+        start_memory_tracing()
+
+    if args.db:
+        # Games already in the store are skipped, so this only adds what's new
+        from store import GameStore
+        with GameStore(args.db) as store:
+            with metrics.span('store_import'):
+                store.import_logs(expand_paths(args.logs))
+            accumulator = store.accumulate()
+    elif args.cache and len(args.logs) == 1:
+        from game_cache import open_cached
+        from round_table import accumulate
+        with metrics.span('load'):
+            table, _ = open_cached(args.logs[0])
+        with metrics.span('aggregate'):
+            accumulator = accumulate(table)
+    elif len(args.logs) == 1 and os.path.isfile(args.logs[0]):
+        # Stream games from the log and calculate statistics, reusing the saved
+        # counters so only games added since the last run are processed
+        accumulator = load_accumulator(args.logs[0], SNAPSHOT_FILE)
+    else:
+        # Several seasons / table groups: process the files in parallel
+        with metrics.span('archive'):
+            accumulator = accumulate_archive(args.logs, args.jobs)
+
+    if args.validate_scores:
+        # The podium is ranked from the recorded scores, so check them against the rounds first
+        from replay import print_mismatches, validate
+        with metrics.span('validate'):
+            mismatches = []
+            for path in expand_paths(args.logs):
+                table, header = load_round_table(path, args.cache)
+                mismatches += [dict(entry, log=path) for entry in validate(table, header)]
+        if mismatches:
+            print_mismatches(mismatches)
+            sys.exit(f"✗ {len(mismatches)} games have scores that don't match their rounds, "
+                     "wrapped_data.js was not updated")
+
+    intervals = None
+    method = args.intervals or ("wilson" if args.rank_by_lower_bound else None)
+    if method == "bootstrap":
+        from intervals import bootstrap_intervals
+        with metrics.span('intervals'):
+            table, _ = load_round_table(args.logs[0], args.cache)
+            intervals = bootstrap_intervals(table, jobs=args.jobs or 1)
+    elif method:
+        # Wilson intervals only need the counts, so they work for archives too
+        from intervals import wilson_intervals
+        intervals = wilson_intervals(accumulator)
+
+    with metrics.span('rank'):
+        stats = stats_view(accumulator)
+        leaderboards = build_leaderboards(stats['player_stats'], intervals=intervals,
+                                          rank_by='lower' if args.rank_by_lower_bound else 'value')
+
     # Print statistics to console
-    print_stats(stats)
-    
-    # Generate wrapped_data.js content
-    js_content = generate_wrapped_data_js(stats)
-    
-    # Write to file
-    with open("wrapped_data.js", "w") as f:
-        f.write(js_content)
-    
-    print("\n✓ wrapped_data.js has been generated successfully!")
+    with metrics.span('report'):
+        print_stats(stats, leaderboards)
+
+    extra_slides = []
+    if args.trend_window:
+        from windows import WindowIndex, trend_slide
+        with metrics.span('windows'):
+            table, _ = load_round_table(args.logs[0], args.cache)
+            extra_slides.append(trend_slide(WindowIndex.from_table(table), window=args.trend_window))
+
+    if args.synergy:
+        from synergy import SynergyMatrix, synergy_slide
+        with metrics.span('synergy'):
+            table, _ = load_round_table(args.logs[0], args.cache)
+            matrix = SynergyMatrix.from_table(table, accumulator.frequent_order)
+            extra_slides.append(synergy_slide(matrix))
+
+    if args.ratings:
+        from ratings import load_ratings, ratings_slide
+        with metrics.span('ratings'):
+            engine = load_ratings(args.logs[0], RATINGS_FILE)
+            extra_slides.append(ratings_slide(engine, accumulator.frequent_order))
+
+    # Stream the slides into wrapped_data.js, leaving it untouched if nothing changed
+    with metrics.span('emit'):
+        slides = build_slides(stats, extra_slides, leaderboards)
+        changed = write_slides("wrapped_data.js", slides, pretty=not args.minify, compress=args.compress)
+
+    if changed:
+        print("\n✓ wrapped_data.js has been generated successfully!")
+    else:
+        print("\n✓ wrapped_data.js is already up to date")
+
+    if args.watch:
+        from watch import watch
+        try:
+            watch(args.logs[0], "wrapped_data.js", SNAPSHOT_FILE, pretty=not args.minify, compress=args.compress)
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,231 @@
+"""
+Batch generation of personalized Wrapped decks.
+
+Every game log in an archive is one table group. Each group is aggregated
+once, then a pool of workers renders the group's deck plus a deck for every
+frequent player in it, and writes each deck to its own JSON shard:
+
+    decks/index.json                  manifest of deck key -> shard path
+    decks/<group>/_group.json         the group's Wrapped deck
+    decks/<group>/<player>.json       one player's personal deck
+
+app.js loads a single shard by key (index.html?deck=<group>/<player>), so
+the page only downloads the deck it shows.
+
+    python3 decks.py seasons/ --out decks --jobs 4
+"""
+import argparse
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from archive import expand_paths
+from data import CLUTCH_THRESHOLD, build_slides, stats_view
+from rankings import build_leaderboards
+from slide_writer import write_json
+from stats_core import load_accumulator
+
+MANIFEST_FILE = "index.json"
+GROUP_DECK = "_group"
+PARTNER_MIN_ROUNDS = 5   # Pairs need this many rounds on the same side to be a best partner
+PLAYERS_PER_TASK = 256   # Players rendered per worker task
+
+# Leaderboard -> (title, value suffix) for the "Your Leaderboards" slide
+BOARD_TITLES = {
+    'games_played': ('The Active Legends', ' games'),
+    'round_win_pct': ('The Champions', '%'),
+    'leader_conv_rate': ('The Closers', '%'),
+    'teammate_count': ('The Most Wanted', ' calls'),
+    'clutch_wins': ('Clutch Wins', ' wins'),
+    'teammate_win_rate': ('The Kingmakers', '%'),
+    'podium_1st': ('The Podium', ' firsts'),
+}
+
+
+def slug(text):
+    """File-name-safe version of a group or player name."""
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-') or 'unnamed'
+
+
+def group_name(path):
+    """A log's group name: its file name without the extension."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def best_partners(accumulator, min_rounds=PARTNER_MIN_ROUNDS):
+    """
+    Each player's best partner: the frequent player they won most rounds
+    with on the same side (as leader and teammate or as two teammates).
+    Ties go to the higher win rate, then alphabetically.
+    Returns {player: {'partner', 'rounds', 'wins', 'win_rate'}}.
+    """
+    best = {}
+    pairs = accumulator.teams.stats(subset_size=2, min_rounds=min_rounds)
+    for mask, (rounds, wins, _) in pairs.items():
+        if not wins:
+            continue
+        win_rate = round(wins / rounds * 100, 1)
+        first, second = accumulator.teams.names(mask)
+        for player, partner in ((first, second), (second, first)):
+            current = best.get(player)
+            if current is None or (wins, win_rate, current['partner']) > (current['wins'], current['win_rate'], partner):
+                best[player] = {'partner': partner, 'rounds': rounds, 'wins': wins, 'win_rate': win_rate}
+    return best
+
+
+def biggest_bids_made(accumulator):
+    """The highest bid each player has led and won."""
+    biggest = {}
+    for (leader, points), wins in accumulator.leader_bid_wins.items():
+        if wins and points > biggest.get(leader, 0):
+            biggest[leader] = points
+    return biggest
+
+
+def group_facts(path):
+    """Aggregate one group's log into everything its decks are rendered from."""
+    accumulator = load_accumulator(path)
+    stats = stats_view(accumulator)
+    return {
+        'stats': stats,
+        'leaderboards': build_leaderboards(stats['player_stats']),
+        'partners': best_partners(accumulator),
+        'biggest_bids': biggest_bids_made(accumulator),
+    }
+
+
+def player_slides(player, group, facts):
+    """The slides of one player's personal deck."""
+    slides = [{
+        'type': 'intro',
+        'title': player,
+        'subtitle': f'Kali Teeri Wrapped 2025 · {group}',
+        'theme': 'theme-intro',
+    }]
+
+    # Where the player ranks on every leaderboard they are on
+    items = []
+    for metric, (title, unit) in BOARD_TITLES.items():
+        board = facts['leaderboards'][metric]
+        entry = board.rank_of(player)
+        if entry is not None:
+            items.append({'rank': entry['rank'], 'label': f"{title} (of {len(board)})", 'value': f"{entry['value']}{unit}"})
+    if items:
+        slides.append({'type': 'ranked_list', 'title': 'Your Leaderboards', 'items': items, 'theme': 'theme-1'})
+
+    partner = facts['partners'].get(player)
+    if partner:
+        slides.append({
+            'type': 'big_highlight',
+            'title': 'Your Best Partner',
+            'name': partner['partner'],
+            'stat': f"{partner['wins']} Wins Together",
+            'description': f"{partner['win_rate']}% of {partner['rounds']} rounds on the same side.",
+            'theme': 'theme-3',
+        })
+
+    clutch_wins = facts['stats']['player_stats'][player]['clutch_wins']
+    if clutch_wins:
+        slides.append({
+            'type': 'big_highlight',
+            'title': 'Your Clutch Moments',
+            'name': player,
+            'stat': f"{clutch_wins} Wins ≥ {CLUTCH_THRESHOLD} pts",
+            'description': f"Biggest bid made: {facts['biggest_bids'][player]} points.",
+            'theme': 'theme-5',
+        })
+    return slides
+
+
+def _write_deck(out_dir, rel_path, key, slides):
+    # Unchanged shards are left alone so re-runs don't bust browser caches
+    write_json(os.path.join(out_dir, rel_path), {'key': key, 'slides': slides})
+
+
+def _render(task):
+    """Worker: render and write the decks of one chunk of a group. Returns manifest entries."""
+    out_dir, group, group_slug, facts, players, with_group_deck = task
+    entries = []
+    if with_group_deck:
+        rel_path = f"{group_slug}/{GROUP_DECK}.json"
+        _write_deck(out_dir, rel_path, group, build_slides(facts['stats'], leaderboards=facts['leaderboards']))
+        entries.append((group, rel_path))
+    for player, player_slug in players:
+        key = f"{group}/{player}"
+        rel_path = f"{group_slug}/{player_slug}.json"
+        _write_deck(out_dir, rel_path, key, player_slides(player, group, facts))
+        entries.append((key, rel_path))
+    return entries
+
+
+def _unique_slugs(names):
+    """Map names to slugs, numbering any that collide (e.g. "A B" and "a-b")."""
+    taken = {GROUP_DECK}
+    slugs = {}
+    for name in names:
+        base = candidate = slug(name)
+        n = 1
+        while candidate in taken:
+            n += 1
+            candidate = f"{base}-{n}"
+        taken.add(candidate)
+        slugs[name] = candidate
+    return slugs
+
+
+def write_decks(patterns, out_dir='decks', jobs=None, players_per_task=PLAYERS_PER_TASK):
+    """
+    Render the group deck and every player's deck for each game log matched
+    by patterns into out_dir, and write the manifest last so it never points
+    at a shard that isn't there yet. Returns the manifest.
+    """
+    paths = expand_paths(patterns)
+    if not paths:
+        raise FileNotFoundError(f"No game logs found for {', '.join(patterns)}")
+    # Logs with the same file name in different directories get numbered
+    names, seen = [], Counter()
+    for path in paths:
+        name = group_name(path)
+        seen[name] += 1
+        names.append(name if seen[name] == 1 else f"{name} {seen[name]}")
+    groups = _unique_slugs(names)
+
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs != 1 else None
+    try:
+        run = pool.map if pool else map
+        # Aggregate each group once
+        all_facts = list(run(group_facts, paths))
+
+        tasks = []
+        for (group, group_slug), facts in zip(groups.items(), all_facts):
+            os.makedirs(os.path.join(out_dir, group_slug), exist_ok=True)
+            players = list(_unique_slugs(facts['stats']['player_stats']).items())
+            for start in range(0, max(len(players), 1), players_per_task):
+                tasks.append((out_dir, group, group_slug, facts, players[start:start + players_per_task], start == 0))
+
+        manifest = {'groups': {}, 'decks': {}}
+        for entries in run(_render, tasks):
+            manifest['decks'].update(entries)
+    finally:
+        if pool:
+            pool.shutdown()
+
+    for group, facts in zip(groups, all_facts):
+        manifest['groups'][group] = list(facts['stats']['player_stats'])
+
+    write_json(os.path.join(out_dir, MANIFEST_FILE), manifest, pretty=True)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a Wrapped deck per table group and per player.")
+    parser.add_argument("logs", nargs="*", default=["data.json"],
+                        help="game log files, directories or glob patterns, one group per file (default: data.json)")
+    parser.add_argument("--out", default="decks", help="output directory (default: decks)")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    manifest = write_decks(args.logs, args.out, args.jobs)
+    print(f"✓ {len(manifest['decks'])} decks for {len(manifest['groups'])} groups written to {args.out}/")
@@ -0,0 +1,201 @@
+"""
+Compact binary cache of a parsed game log, reloaded through mmap.
+
+Compiling a log writes one file with:
+- a fixed header (format version, the source's mtime, size and SHA-1, section counts)
+- a JSON blob with the log's non-game keys (frequentNames, scoring rules)
+- a string table of player names, NUL separated, indexed by player ID
+- fixed-width packed records: rounds, per-game sizes and dates, listed players,
+  placements and recorded final scores
+
+Loading maps the file and exposes each section as a zero-copy NumPy view
+inside a RoundTable, so stats run without building a dict per round. The
+cache is rebuilt automatically when the source log's mtime or hash changes.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from ingest import GameLog
+from round_table import MAX_TEAMMATES, RoundTable, accumulate
+
+CACHE_MAGIC = b"KTWC"
+CACHE_VERSION = 3
+CACHE_SUFFIX = ".ktwc"
+MAX_PLAYER_ID = np.iinfo(np.int16).max
+
+# magic, version, source mtime_ns, source size, source sha1,
+# players, games, rounds, listings, placements, meta bytes, string table bytes
+_HEADER = struct.Struct("<4sIQQ20sIIIIIII")
+_ALIGN = 8
+
+ROUND_DTYPE = np.dtype([
+    ("game", "<i4"),
+    ("leader", "<i2"),
+    ("mates", "<i2", (MAX_TEAMMATES,)),
+    ("points", "<i2"),
+    ("result", "?"),
+])
+LISTING_DTYPE = np.dtype([("game", "<i4"), ("player", "<i2")])
+PLACEMENT_DTYPE = np.dtype([("game", "<i4"), ("player", "<i2"), ("place", "<i2")])
+GAME_SIZE_DTYPE = np.dtype("<i2")
+GAME_DATE_DTYPE = np.dtype("<i8")
+FINAL_SCORE_DTYPE = np.dtype("<f8")
+
+
+def cache_path_for(source):
+    return source + CACHE_SUFFIX
+
+
+def file_digest(path):
+    """SHA-1 of a file, read in chunks."""
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def _pad(n):
+    return -n % _ALIGN
+
+
+def compile_cache(source, cache_path=None):
+    """Parse the source log once and write its binary cache. Returns the cache path."""
+    cache_path = cache_path or cache_path_for(source)
+    stat = os.stat(source)
+    sha1 = file_digest(source)
+
+    log = GameLog(source)
+    header = log.header()
+    table = RoundTable.from_games(log, header.get("frequentNames", []))
+    if table.num_players > MAX_PLAYER_ID:
+        raise ValueError(f"Game cache supports at most {MAX_PLAYER_ID} players, log has {table.num_players}")
+
+    rounds = np.zeros(len(table), dtype=ROUND_DTYPE)
+    rounds["game"] = table.game
+    rounds["leader"] = table.leader
+    rounds["mates"] = table.mates
+    rounds["points"] = table.points
+    rounds["result"] = table.result
+
+    listing = np.zeros(len(table.listing), dtype=LISTING_DTYPE)
+    listing["game"], listing["player"] = table.listing[:, 0], table.listing[:, 1]
+    placement = np.zeros(len(table.placement), dtype=PLACEMENT_DTYPE)
+    placement["game"], placement["player"], placement["place"] = table.placement.T
+
+    meta = json.dumps({"header": header, "frequent_players": table.frequent_order}).encode("utf-8")
+    strings = "\0".join(table.players).encode("utf-8")
+    sections = [meta, strings, rounds.tobytes(), table.game_size.astype(GAME_SIZE_DTYPE).tobytes(),
+                table.game_date.astype(GAME_DATE_DTYPE).tobytes(), listing.tobytes(), placement.tobytes(),
+                table.final_score.astype(FINAL_SCORE_DTYPE).tobytes()]
+
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, stat.st_mtime_ns, stat.st_size, sha1,
+                             table.num_players, table.num_games, len(table), len(listing), len(placement),
+                             len(meta), len(strings)))
+        f.write(b"\0" * _pad(_HEADER.size))
+        for section in sections:
+            f.write(section)
+            f.write(b"\0" * _pad(len(section)))
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def _read_header(cache_path):
+    with open(cache_path, "rb") as f:
+        raw = f.read(_HEADER.size)
+    if len(raw) < _HEADER.size:
+        return None
+    fields = _HEADER.unpack(raw)
+    if fields[0] != CACHE_MAGIC or fields[1] != CACHE_VERSION:
+        return None
+    return fields
+
+
+def is_fresh(source, cache_path=None):
+    """True if the cache exists and was compiled from the current source file."""
+    cache_path = cache_path or cache_path_for(source)
+    if not os.path.exists(cache_path):
+        return False
+    header = _read_header(cache_path)
+    if header is None:
+        return False
+    _, _, mtime_ns, size, sha1 = header[:5]
+    stat = os.stat(source)
+    if stat.st_size != size:
+        return False
+    # Same mtime and size is trusted; a touched file is only stale if its content changed
+    return stat.st_mtime_ns == mtime_ns or file_digest(source) == sha1
+
+
+def load_cache(cache_path):
+    """Map a compiled cache and return its RoundTable plus the log's header keys."""
+    header = _read_header(cache_path)
+    if header is None:
+        raise ValueError(f"{cache_path} is not a version {CACHE_VERSION} game cache")
+    num_players, num_games, num_rounds, num_listings, num_placements, meta_len, strings_len = header[5:]
+
+    with open(cache_path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    offset = _HEADER.size + _pad(_HEADER.size)
+
+    def section(length):
+        nonlocal offset
+        start = offset
+        offset += length + _pad(length)
+        return start
+
+    meta_start = section(meta_len)
+    meta = json.loads(buf[meta_start:meta_start + meta_len])
+    strings_start = section(strings_len)
+    strings = buf[strings_start:strings_start + strings_len].decode("utf-8")
+    players = strings.split("\0") if num_players else []
+
+    def view(dtype, count):
+        return np.frombuffer(buf, dtype=dtype, count=count, offset=section(dtype.itemsize * count))
+
+    rounds = view(ROUND_DTYPE, num_rounds)
+    game_size = view(GAME_SIZE_DTYPE, num_games)
+    game_date = view(GAME_DATE_DTYPE, num_games)
+    listing = view(LISTING_DTYPE, num_listings)
+    placement = view(PLACEMENT_DTYPE, num_placements)
+    final_score = view(FINAL_SCORE_DTYPE, num_placements)
+
+    table = RoundTable(
+        players, meta["frequent_players"],
+        game=rounds["game"],
+        leader=rounds["leader"],
+        mates=rounds["mates"],
+        points=rounds["points"],
+        result=rounds["result"],
+        game_size=game_size,
+        game_date=game_date,
+        listing=np.column_stack([listing["game"], listing["player"]]),
+        placement=np.column_stack([placement["game"], placement["player"], placement["place"]]),
+        final_score=final_score,
+    )
+    return table, meta["header"]
+
+
+def open_cached(source, cache_path=None):
+    """
+    Return (RoundTable, header) for a game log, compiling or recompiling the
+    binary cache first if it is missing or the source has changed.
+    """
+    cache_path = cache_path or cache_path_for(source)
+    if not is_fresh(source, cache_path):
+        compile_cache(source, cache_path)
+    return load_cache(cache_path)
+
+
+def accumulate_cached(source, cache_path=None):
+    """Fill a StatsAccumulator from the cached form of a game log."""
+    table, _ = open_cached(source, cache_path)
+    return accumulate(table)
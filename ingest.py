@@ -0,0 +1,167 @@
+import json
+
+CHUNK_SIZE = 64 * 1024  # bytes of text read from disk per refill
+_WHITESPACE = " \t\n\r"
+# Keys that mark the first NDJSON line as the header rather than a game
+HEADER_KEYS = ("frequentNames", "leaderWinPoints", "leaderLosePoints")
+
+
+class GameLog:
+    """
+    Streaming reader for a Kali Teeri game log.
+
+    Supports two on-disk formats:
+    - The app's JSON export: one object holding frequentNames, scoring rules
+      and a pastGames array. Games are decoded one at a time from pastGames.
+    - NDJSON: one game object per line. An optional first line without a
+      "rounds" key is treated as the header (frequentNames, scoring rules);
+      any other line without one is an error (see is_ndjson_header).
+
+    Only the header keys and the game currently being yielded are held in
+    memory, so peak memory depends on the size of one game, not the archive.
+    Header keys that appear before pastGames are available from header();
+    keys that appear after it are filled in once iteration finishes.
+    """
+
+    def __init__(self, path, chunk_size=CHUNK_SIZE):
+        self.path = path
+        self.chunk_size = chunk_size
+        self._header = None
+        self._games = None
+
+    def header(self):
+        """Return the non-game top-level keys (frequentNames, rules, ...)."""
+        if self._header is None:
+            self._prime()
+        return self._header
+
+    def _prime(self):
+        # Run the parser up to the first game so the leading header keys are known
+        self._games = self._iter_games()
+        self._first = next(self._games, None)
+
+    def __iter__(self):
+        if self._games is None:
+            self._prime()
+        games, first = self._games, self._first
+        # A GameLog is re-iterable: each later pass re-reads the file
+        self._games = None
+        if first is not None:
+            yield first
+            yield from games
+
+    def _iter_games(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            if self.path.endswith((".ndjson", ".jsonl")):
+                yield from self._iter_ndjson(f)
+            else:
+                yield from self._iter_json(_ChunkReader(f, self.chunk_size))
+
+    def _iter_ndjson(self, f):
+        self._header = {}
+        records = 0
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            obj = json.loads(line)
+            if is_ndjson_header(obj, records):
+                self._header = obj
+            else:
+                yield obj
+            records += 1
+
+    def _iter_json(self, reader):
+        self._header = {}
+        reader.expect("{")
+        while True:
+            if reader.peek() == "}":
+                return
+            key = reader.decode()
+            reader.expect(":")
+            if key == "pastGames":
+                reader.expect("[")
+                while reader.peek() != "]":
+                    yield reader.decode()
+                    if reader.peek() == ",":
+                        reader.expect(",")
+                reader.expect("]")
+            else:
+                self._header[key] = reader.decode()
+            if reader.peek() == ",":
+                reader.expect(",")
+
+
+def is_ndjson_header(record, index):
+    """
+    Whether the index-th record (0-based, blank lines skipped) of an NDJSON
+    log is its header. Only the first record can be, and only if it carries
+    header keys instead of rounds. Any other record without rounds raises
+    ValueError, so a game exported without rounds can't vanish into the
+    header or overwrite frequentNames.
+    """
+    if "rounds" in record:
+        return False
+    if index == 0 and any(key in record for key in HEADER_KEYS):
+        return True
+    if index == 0:
+        raise ValueError(f"NDJSON record 1 has neither rounds nor any header key ({', '.join(HEADER_KEYS)})")
+    raise ValueError(f"NDJSON record {index + 1} has no rounds; only the first record can be the header")
+
+
+class _ChunkReader:
+    """Incremental JSON value decoder over a text file read in chunks."""
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop the consumed prefix so the buffer never holds more than one value
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError(f"Unexpected end of game log at offset {self.pos}")
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in game log, found {found!r}")
+        self.pos += 1
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number that runs to the end of the buffer may be cut short
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill()
+
+
+def iter_rounds(games):
+    """Yield (game_idx, game, round) for every round of every game."""
+    for game_idx, game in enumerate(games):
+        for rd in game.get("rounds", []):
+            yield game_idx, game, rd
@@ -0,0 +1,116 @@
+"""
+Instrumentation for the stats pipeline.
+
+Named timing spans and counters are always collected on the shared
+`metrics` object (they cost a couple of perf_counter calls per game).
+cProfile and tracemalloc capture are opt-in, and dump_at_exit() writes
+everything to a JSON file when the process exits.
+
+Spans can nest (e.g. "podium" runs inside "aggregate"), so their times
+are not meant to add up to the total.
+"""
+import atexit
+import cProfile
+import json
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+
+class Metrics:
+    """Timing spans, counters and free-form values for one process."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.spans = {}  # name -> [calls, total seconds]
+        self.counters = Counter()
+        self.values = {}
+
+    def add_time(self, name, seconds, calls=1):
+        entry = self.spans.get(name)
+        if entry is None:
+            entry = self.spans[name] = [0, 0.0]
+        entry[0] += calls
+        entry[1] += seconds
+
+    @contextmanager
+    def span(self, name):
+        """Time the body of a with block under name."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def timed_iter(self, iterable, name):
+        """Yield from iterable, timing how long each item takes to produce."""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add_time(name, time.perf_counter() - start)
+                return
+            self.add_time(name, time.perf_counter() - start)
+            yield item
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def to_dict(self):
+        return {
+            "wall_seconds": round(time.perf_counter() - self.started, 6),
+            "spans": {name: {"calls": calls, "seconds": round(seconds, 6)}
+                      for name, (calls, seconds) in self.spans.items()},
+            "counters": dict(self.counters),
+            **self.values,
+        }
+
+    def dump(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+metrics = Metrics()
+
+
+def start_profiling(profile_path):
+    """Run cProfile until exit and write the stats to profile_path (open with pstats or snakeviz)."""
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    def stop():
+        profiler.disable()
+        profiler.dump_stats(profile_path)
+        metrics.values["profile"] = profile_path
+
+    atexit.register(stop)
+
+
+def start_memory_tracing(top=10):
+    """Trace allocations until exit and record peak memory and the top allocation sites."""
+    tracemalloc.start()
+
+    def stop():
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        metrics.values["memory"] = {
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "top_allocations": [
+                {"site": str(stat.traceback), "bytes": stat.size, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:top]
+            ],
+        }
+
+    atexit.register(stop)
+
+
+def dump_at_exit(path):
+    """Write the metrics to path as JSON when the process exits."""
+    # atexit runs handlers last-in first-out, so register this before the
+    # profiler / tracer to have them record their results first
+    atexit.register(metrics.dump, path)
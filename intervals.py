@@ -0,0 +1,175 @@
+"""
+Confidence intervals for the rates in data.stats_view's player_stats.
+
+A player who led 5 rounds and made 4 shows an 80% conversion rate, just
+like one who made 160 of 200, but the first 80% could easily be a 50%.
+Every rate (round_win_pct, leader_conv_rate, teammate_win_rate) is a
+proportion of rounds, so it gets an interval two ways:
+
+- Wilson score intervals straight from the accumulator's counts. Exact
+  enough for proportions, instant and standard library only.
+- Bootstrap percentile intervals from a RoundTable, resampling either
+  rounds or whole games (games are the honest unit: a bad hand hurts
+  every round of a game). Needs numpy.
+
+Resampling a player's n games only depends on how many of their games
+had each distinct per-game outcome (wins and rounds as leader and as
+teammate), and there are few distinct outcomes. So a player's replicates
+are drawn in multinomial batches over those outcomes, and the cost grows
+with replicates x outcomes rather than with the player's games. Players
+are resampled independently, one after another in a Python loop (each
+with its own seed), not in one draw for everyone: 10k replicates for
+every player take about 4 s on one core for 160k rounds, and jobs > 1
+spreads the players over worker processes.
+
+    intervals = wilson_intervals(accumulator)                   # {player: {metric: [low, high]}}
+    intervals = bootstrap_intervals(table, replicates=10_000)   # same shape
+    build_leaderboards(player_stats, intervals=intervals, rank_by='lower')
+"""
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+CONFIDENCE = 0.95
+REPLICATES = 10_000
+BATCH_CELLS = 4_000_000  # Replicates x outcomes drawn per multinomial batch
+
+# Rate -> (successes, trials) from a StatsAccumulator, as data.stats_view computes it
+RATES = {
+    'round_win_pct': lambda acc, player: (acc.total_wins(player), acc.total_rounds(player)),
+    'leader_conv_rate': lambda acc, player: (acc.leader_wins[player], acc.leader_count[player]),
+    'teammate_win_rate': lambda acc, player: (acc.teammate_wins[player], acc.teammate_count[player]),
+}
+
+
+def z_score(confidence=CONFIDENCE):
+    """Two-sided normal quantile, e.g. 1.96 for 0.95."""
+    from statistics import NormalDist
+    return NormalDist().inv_cdf(0.5 + confidence / 2)
+
+
+def wilson_interval(successes, trials, confidence=CONFIDENCE):
+    """Wilson score interval of a proportion, in percent, or None with no trials."""
+    if trials <= 0:
+        return None
+    z = z_score(confidence)
+    p = successes / trials
+    denominator = 1 + z * z / trials
+    center = (p + z * z / (2 * trials)) / denominator
+    margin = z * math.sqrt(p * (1 - p) / trials + z * z / (4 * trials * trials)) / denominator
+    return [round(max(0.0, center - margin) * 100, 1), round(min(1.0, center + margin) * 100, 1)]
+
+
+def wilson_intervals(accumulator, confidence=CONFIDENCE):
+    """Wilson intervals of every rate for every frequent player."""
+    return {
+        player: {metric: wilson_interval(*counts(accumulator, player), confidence) for metric, counts in RATES.items()}
+        for player in accumulator.frequent_order
+    }
+
+
+def outcome_counts(table, unit='games'):
+    """
+    Per frequent player, the distinct outcomes of their resampling units as
+    (outcomes, multiplicity): outcomes rows are (leader wins, leader rounds,
+    teammate wins, teammate rounds) of one game (unit='games') or one round
+    (unit='rounds'). Rounds are counted as data.stats_view counts them.
+    """
+    import numpy as np
+
+    if unit not in ('games', 'rounds'):
+        raise ValueError(f"Unknown resampling unit {unit}, expected games or rounds")
+    n = max(table.num_players, 1)
+    width = table.mates.shape[1]
+    leader_frequent = table.frequent(table.leader)
+    led = (table.frequent(table.mates) & leader_frequent[:, None]).ravel()
+
+    # One row per counted seat in a round: (game * n + player, as leader, won)
+    keys = np.concatenate([table.game[leader_frequent].astype(np.int64) * n + table.leader[leader_frequent],
+                           np.repeat(table.game, width)[led].astype(np.int64) * n + table.mates.ravel()[led]])
+    as_leader = np.r_[np.ones(leader_frequent.sum(), dtype=bool), np.zeros(led.sum(), dtype=bool)]
+    won = np.concatenate([table.result[leader_frequent], np.repeat(table.result, width)[led]])
+    if not len(keys):
+        return {}
+
+    seats, seat = np.unique(keys, return_inverse=True)
+    per_seat = np.column_stack([
+        np.bincount(seat, as_leader & won, minlength=len(seats)),
+        np.bincount(seat, as_leader, minlength=len(seats)),
+        np.bincount(seat, ~as_leader & won, minlength=len(seats)),
+        np.bincount(seat, ~as_leader, minlength=len(seats)),
+    ]).astype(np.int64)
+    seat_player = seats % n
+
+    result = {}
+    order = np.argsort(seat_player, kind='stable')
+    bounds = np.flatnonzero(np.diff(seat_player[order], prepend=-1, append=-1))
+    for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        rows = per_seat[order[start:end]]
+        player = table.players[seat_player[order[start]]]
+        if unit == 'rounds':
+            lw, lc, tw, tc = rows.sum(axis=0).tolist()
+            outcomes = np.array([[1, 1, 0, 0], [0, 1, 0, 0], [0, 0, 1, 1], [0, 0, 0, 1]], dtype=np.int64)
+            result[player] = (outcomes, np.array([lw, lc - lw, tw, tc - tw], dtype=np.int64))
+        else:
+            outcomes, multiplicity = np.unique(rows, axis=0, return_counts=True)
+            result[player] = (outcomes, multiplicity)
+    return result
+
+
+def _resample(task):
+    """Percentile intervals of one player's rates over bootstrap replicates of their units."""
+    import numpy as np
+
+    outcomes, multiplicity, replicates, confidence, seed = task
+    rng = np.random.default_rng(seed)
+    units = int(multiplicity.sum())
+    probabilities = multiplicity / units
+    batch = max(1, BATCH_CELLS // len(outcomes))
+    totals = np.empty((replicates, 4), dtype=np.int64)
+    for start in range(0, replicates, batch):
+        size = min(batch, replicates - start)
+        # Each row: how many times each distinct outcome was drawn in one replicate
+        draws = rng.multinomial(units, probabilities, size=size)
+        totals[start:start + size] = draws @ outcomes
+
+    lw, lc, tw, tc = totals.T
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = {
+            'round_win_pct': (lw + tw) / (lc + tc),
+            'leader_conv_rate': lw / lc,
+            'teammate_win_rate': tw / tc,
+        }
+    observed = outcomes.T @ multiplicity
+    trials = {'round_win_pct': observed[1] + observed[3], 'leader_conv_rate': observed[1],
+              'teammate_win_rate': observed[3]}
+    tail = (1 - confidence) / 2
+    intervals = {}
+    for metric, values in rates.items():
+        # Replicates that drew no rounds of this kind have no rate and are left out
+        if not trials[metric] or np.isnan(values).all():
+            intervals[metric] = None
+            continue
+        low, high = np.nanquantile(values, [tail, 1 - tail])
+        intervals[metric] = [round(float(low) * 100, 1), round(float(high) * 100, 1)]
+    return intervals
+
+
+def bootstrap_intervals(table, replicates=REPLICATES, unit='games', confidence=CONFIDENCE, seed=0, jobs=1):
+    """
+    Bootstrap percentile intervals of every rate for every frequent player
+    in a RoundTable. jobs > 1 spreads players over worker processes; each
+    player gets its own seed, so the result doesn't depend on jobs.
+    """
+    import numpy as np
+
+    counts = outcome_counts(table, unit)
+    seeds = np.random.SeedSequence(seed).spawn(len(table.frequent_order))
+    tasks = {player: (*counts[player], replicates, confidence, player_seed)
+             for player, player_seed in zip(table.frequent_order, seeds) if player in counts}
+    if jobs == 1 or len(tasks) < 2:
+        results = map(_resample, tasks.values())
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_resample, tasks.values()))
+    intervals = dict(zip(tasks, results))
+    return {player: intervals.get(player, dict.fromkeys(RATES)) for player in table.frequent_order}
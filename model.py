@@ -0,0 +1,155 @@
+"""
+Compact, validated game and round records.
+
+Game logs arrive as nested dicts with every player name as its own string
+object. The loader here checks each game once against the shape the app
+exports and turns it into __slots__ records with interned names (so a
+name repeated thousands of times is one string), and tuples instead of
+lists. The stats engine then reads plain attributes and never has to guess
+at missing keys:
+
+    for game in load_games(data['pastGames']):   # raises GameLogError on bad input
+        for rd in game.rounds:
+            rd.leader, rd.teammates, rd.points, rd.result
+
+Optional parts of a game (players, scores, date) may be missing, as in
+older exports. Every round must have a leader, teammates (at most
+MAX_TEAMMATES of them), points and result.
+"""
+from sys import intern
+
+from ingest import GameLog
+
+MAX_TEAMMATES = 4  # Teammates a leader can call, i.e. teams of up to 5
+_NUMBER_TYPES = (int, float)  # bool is excluded: type(True) is bool, not int
+
+
+class GameLogError(ValueError):
+    """A game or round that doesn't have the shape the app exports."""
+
+    def __init__(self, message, game_index=None, round_index=None):
+        where = []
+        if game_index is not None:
+            where.append(f"game {game_index}")
+        if round_index is not None:
+            where.append(f"round {round_index}")
+        super().__init__(f"{', '.join(where).capitalize()}: {message}" if where else message)
+        self.game_index = game_index
+        self.round_index = round_index
+
+
+def _all_names(values):
+    for value in values:
+        if type(value) is not str or not value:
+            return False
+    return True
+
+
+class Round:
+    """One bid: the leader, the teammates they called, the bid points and whether it was made."""
+
+    __slots__ = ('leader', 'teammates', 'points', 'result')
+
+    def __init__(self, leader, teammates, points, result):
+        self.leader = leader
+        self.teammates = teammates
+        self.points = points
+        self.result = result
+
+    @classmethod
+    def from_dict(cls, raw, game_index=None, round_index=None):
+        """Validate a round dict from a game log and build the record."""
+        if not isinstance(raw, dict):
+            raise GameLogError(f"expected an object, got {type(raw).__name__}", game_index, round_index)
+        missing = [key for key in ('leader', 'teammates', 'points', 'result') if key not in raw]
+        if missing:
+            raise GameLogError(f"missing {', '.join(missing)}", game_index, round_index)
+
+        leader, teammates, points, result = raw['leader'], raw['teammates'], raw['points'], raw['result']
+        # Exact type checks: cheaper than isinstance against ABCs, and JSON only produces these types
+        if type(leader) is not str or not leader:
+            raise GameLogError(f"leader must be a player name, got {leader!r}", game_index, round_index)
+        if type(teammates) is not list or not _all_names(teammates):
+            raise GameLogError(f"teammates must be a list of player names, got {teammates!r}",
+                               game_index, round_index)
+        if len(teammates) > MAX_TEAMMATES:
+            raise GameLogError(f"at most {MAX_TEAMMATES} teammates, got {len(teammates)}", game_index, round_index)
+        # Bids are whole points, and the round table and binary cache store them as integers
+        if type(points) is not int or points < 0:
+            raise GameLogError(f"points must be a non-negative whole number, got {points!r}", game_index, round_index)
+        if type(result) is not bool:
+            raise GameLogError(f"result must be true or false, got {result!r}", game_index, round_index)
+        return cls(intern(leader), tuple(map(intern, teammates)), points, result)
+
+    def to_dict(self):
+        return {'leader': self.leader, 'teammates': list(self.teammates), 'points': self.points, 'result': self.result}
+
+
+class Game:
+    """
+    One game: who was listed, their final scores, the rounds in the order
+    played and the start date (ISO string, or None if the export has none).
+    players is empty when the export didn't list them.
+    """
+
+    __slots__ = ('players', 'scores', 'rounds', 'date')
+
+    def __init__(self, players, scores, rounds, date=None):
+        self.players = players
+        self.scores = scores
+        self.rounds = rounds
+        self.date = date
+
+    @classmethod
+    def from_dict(cls, raw, game_index=None):
+        """Validate a game dict from pastGames and build the record."""
+        if not isinstance(raw, dict):
+            raise GameLogError(f"expected an object, got {type(raw).__name__}", game_index)
+
+        players = raw.get('players', [])
+        if type(players) is not list or not _all_names(players):
+            raise GameLogError(f"players must be a list of names, got {players!r}", game_index)
+        scores = raw.get('scores', {})
+        if type(scores) is not dict:
+            raise GameLogError(f"scores must be an object, got {type(scores).__name__}", game_index)
+        for player, score in scores.items():
+            if type(score) not in _NUMBER_TYPES:
+                raise GameLogError(f"score of {player} must be a number, got {score!r}", game_index)
+        rounds = raw.get('rounds', [])
+        if not isinstance(rounds, list):
+            raise GameLogError(f"rounds must be a list, got {type(rounds).__name__}", game_index)
+        date = raw.get('date')
+        if date is not None and not isinstance(date, str):
+            raise GameLogError(f"date must be an ISO date string, got {date!r}", game_index)
+
+        return cls(
+            tuple(map(intern, players)),
+            {intern(player): score for player, score in scores.items()},
+            tuple(Round.from_dict(rd, game_index, round_index) for round_index, rd in enumerate(rounds)),
+            date,
+        )
+
+    def to_dict(self):
+        game = {'scores': dict(self.scores), 'rounds': [rd.to_dict() for rd in self.rounds]}
+        if self.players:
+            game['players'] = list(self.players)
+        if self.date is not None:
+            game['date'] = self.date
+        return game
+
+
+def as_game(game, game_index=None):
+    """A Game record for either a raw game dict or an existing record."""
+    return game if isinstance(game, Game) else Game.from_dict(game, game_index)
+
+
+def load_games(games):
+    """Validate and convert an iterable of raw games (e.g. pastGames or a GameLog), lazily."""
+    for game_index, game in enumerate(games):
+        yield as_game(game, game_index)
+
+
+def read_log(path):
+    """Stream a JSON / NDJSON game log into (header, [Game, ...]) without holding the raw dicts."""
+    log = GameLog(path)
+    return log.header(), list(load_games(log))
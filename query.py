@@ -0,0 +1,323 @@
+"""
+Ad-hoc queries over every round of a game log.
+
+Questions like "X's win rate when Y is at the table", "bids of 200+ only"
+or "games with 8+ players" don't need a new pass over the log. A
+QueryIndex holds inverted indexes from a RoundTable, each one a bitmap
+over the round rows (a Python int, bit i = round i):
+
+- player -> rounds led, rounds as teammate, rounds of games they sat in
+- game size -> rounds of games with that many players listed
+- bid points -> rounds bid at exactly that many points
+- made bids, and rounds led by a frequent player
+
+A filter is an AND / OR of a few bitmaps and a count is a popcount, so a
+query over hundreds of thousands of rounds takes well under a millisecond
+per bitmap touched. Recent results are kept in an LRU cache.
+
+    index = QueryIndex.from_table(table)
+    index.summary(leader="Pinkey", in_game="Apurv")        # rounds, wins, win %, avg bid
+    index.summary(min_game_size=8, min_points=200)
+    index.player_summary("Pinkey", min_points=200)         # as leader / teammate / overall
+
+    python3 query.py data.json --player Pinkey --in-game Apurv --min-points 200
+
+Rounds led by Guests count like any other unless frequent_leader=True is
+given, which matches what data.py counts.
+"""
+import argparse
+import json
+from collections import OrderedDict
+
+import numpy as np
+
+from instrument import metrics
+from round_table import NO_PLAYER
+
+CACHE_SIZE = 1024  # Query results kept by the LRU cache
+
+# Filter -> the rounds it keeps (also the CLI help). Player filters take a
+# name or a list of names, the rest a number or a bool.
+FILTERS = {
+    'leader': 'any of these led',
+    'teammate': 'all of these were called as teammates',
+    'on_team': 'all of these were on the bidding team',
+    'in_game': 'all of these were at the table',
+    'not_in_game': 'none of these were at the table',
+    'min_game_size': 'at least this many players listed',
+    'max_game_size': 'at most this many players listed',
+    'min_points': 'bid at least this many points',
+    'max_points': 'bid at most this many points',
+    'result': 'the bid was made (True) or failed (False)',
+    'frequent_leader': 'led by a frequent player (True) or a Guest (False)',
+}
+PLAYER_FILTERS = ('leader', 'teammate', 'on_team', 'in_game', 'not_in_game')
+FLAG_FILTERS = ('result', 'frequent_leader')
+
+
+class LRUCache:
+    """A dict that forgets its least recently used entry once it holds maxsize."""
+
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+
+
+class QueryIndex:
+    """Bitmap indexes over the rounds of a RoundTable, and the filters built from them."""
+
+    def __init__(self, players, num_rounds, everything, won, frequent_led, led, called, seated, by_size,
+                 by_points, cache_size=CACHE_SIZE):
+        self.players = list(players)
+        self.num_rounds = num_rounds
+        self.everything = everything      # every round
+        self.won = won                    # made bids
+        self.frequent_led = frequent_led  # rounds led by a frequent player
+        self.led = led                    # player -> rounds they led
+        self.called = called              # player -> rounds they were a teammate
+        self.seated = seated              # player -> rounds of games they sat in
+        self.by_size = by_size            # game size -> rounds of games that size
+        self.by_points = by_points        # bid points -> rounds bid at that
+        self.cache = LRUCache(cache_size)
+
+    @classmethod
+    def from_table(cls, table, cache_size=CACHE_SIZE):
+        """Build every index from a RoundTable (e.g. game_cache.open_cached)."""
+        num_rounds = len(table)
+        rows = np.arange(num_rounds)
+        width = table.mates.shape[1]
+        names = table.players
+
+        led = _group_bitmaps(table.leader, rows, num_rounds, names)
+        mates = table.mates.ravel()
+        has_mate = mates != NO_PLAYER
+        called = _group_bitmaps(mates[has_mate], np.repeat(rows, width)[has_mate], num_rounds, names)
+
+        # Everyone at a game: its player list, its scores and anyone who played a round
+        seat_game = np.concatenate([table.listing[:, 0], table.placement[:, 0], table.game,
+                                    np.repeat(table.game, width)[has_mate]])
+        seat_player = np.concatenate([table.listing[:, 1], table.placement[:, 1], table.leader, mates[has_mate]])
+        seated = {}
+        order = np.argsort(seat_player, kind='stable')
+        bounds = np.flatnonzero(np.diff(seat_player[order], prepend=-1, append=-1))
+        for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+            in_game = np.zeros(table.num_games, dtype=bool)
+            in_game[seat_game[order[start:end]]] = True
+            seated[names[seat_player[order[start]]]] = _bitmap(in_game[table.game])
+
+        round_size = table.game_size[table.game]
+        by_size = {int(size): _bitmap(round_size == size) for size in np.unique(round_size).tolist()}
+        by_points = {int(points): _bitmap(table.points == points) for points in np.unique(table.points).tolist()}
+        return cls(names, num_rounds, (1 << num_rounds) - 1, _bitmap(table.result),
+                   _bitmap(table.frequent(table.leader)), led, called, seated, by_size, by_points, cache_size)
+
+    @classmethod
+    def from_log(cls, path, cached=False, cache_size=CACHE_SIZE):
+        """
+        Index a game log, from a table built in memory or, with cached=True,
+        through its binary cache (.ktwc next to the log, rebuilt if the log changed).
+        """
+        from data import load_round_table
+        table, _ = load_round_table(path, cached)
+        return cls.from_table(table, cache_size)
+
+    # --- Filters -----------------------------------------------------------
+
+    def select(self, **filters):
+        """Bitmap of the rounds matching every filter (see FILTERS). Cached."""
+        key = ('select', _cache_key(filters))
+        bitmap = self.cache.get(key)
+        if bitmap is None:
+            metrics.count('query_cache_misses')
+            bitmap = self._select(filters)
+            self.cache.put(key, bitmap)
+        else:
+            metrics.count('query_cache_hits')
+        return bitmap
+
+    def _select(self, filters):
+        unknown = set(filters) - set(FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filter {', '.join(sorted(unknown))}, expected one of {', '.join(FILTERS)}")
+
+        selected = self.everything
+        if filters.get('leader') is not None:
+            any_led = 0
+            for player in _names(filters['leader']):
+                any_led |= self.led.get(player, 0)
+            selected &= any_led
+        for player in _names(filters.get('teammate')):
+            selected &= self.called.get(player, 0)
+        for player in _names(filters.get('on_team')):
+            selected &= self.led.get(player, 0) | self.called.get(player, 0)
+        for player in _names(filters.get('in_game')):
+            selected &= self.seated.get(player, 0)
+        for player in _names(filters.get('not_in_game')):
+            selected &= ~self.seated.get(player, 0)
+
+        low, high = filters.get('min_game_size'), filters.get('max_game_size')
+        if low is not None or high is not None:
+            selected &= _range(self.by_size, low, high)
+        low, high = filters.get('min_points'), filters.get('max_points')
+        if low is not None or high is not None:
+            selected &= _range(self.by_points, low, high)
+
+        if filters.get('result') is not None:
+            selected &= self.won if filters['result'] else ~self.won
+        if filters.get('frequent_leader') is not None:
+            selected &= self.frequent_led if filters['frequent_leader'] else ~self.frequent_led
+        return selected & self.everything
+
+    # --- Answers -----------------------------------------------------------
+
+    def count(self, **filters):
+        """Number of rounds matching the filters."""
+        return self.select(**filters).bit_count()
+
+    def summary(self, **filters):
+        """Rounds, made bids, win % and average bid of the rounds matching the filters."""
+        key = ('summary', _cache_key(filters))
+        summary = self.cache.get(key)
+        if summary is None:
+            summary = self._summarize(self.select(**filters))
+            self.cache.put(key, summary)
+        return summary
+
+    def player_summary(self, player, **filters):
+        """One player's rounds matching the filters: as leader, as teammate and both together."""
+        if any(name in filters for name in ('leader', 'teammate')):
+            raise ValueError("player_summary sets leader / teammate itself, use on_team or in_game to filter")
+        key = ('player', player, _cache_key(filters))
+        summary = self.cache.get(key)
+        if summary is None:
+            selected = self.select(**filters)
+            led = selected & self.led.get(player, 0)
+            called = selected & self.called.get(player, 0)
+            summary = {
+                'player': player,
+                'leader': self._summarize(led),
+                'teammate': self._summarize(called),
+                'overall': self._summarize(led | called),
+            }
+            self.cache.put(key, summary)
+        return summary
+
+    def round_ids(self, **filters):
+        """Row numbers (in the RoundTable) of the rounds matching the filters."""
+        return _members(self.select(**filters), self.num_rounds)
+
+    def _summarize(self, selected):
+        rounds = selected.bit_count()
+        wins = (selected & self.won).bit_count()
+        points = sum(value * (selected & bitmap).bit_count() for value, bitmap in self.by_points.items())
+        return {
+            'rounds': rounds,
+            'wins': wins,
+            'win_rate': round(wins / rounds * 100, 1) if rounds else 0,
+            'avg_points': round(points / rounds, 1) if rounds else 0,
+        }
+
+
+def _bitmap(mask):
+    """A boolean array as a bitmap int, element i at bit i."""
+    return int.from_bytes(np.packbits(mask, bitorder='little').tobytes(), 'little')
+
+
+def _members(bitmap, size):
+    """The bit positions set in a bitmap, as a sorted list."""
+    packed = np.frombuffer(bitmap.to_bytes((size + 7) // 8, 'little'), dtype=np.uint8)
+    return np.flatnonzero(np.unpackbits(packed, bitorder='little')[:size]).tolist()
+
+
+def _group_bitmaps(keys, rows, size, names):
+    """name -> bitmap of the rows carrying each player ID in keys."""
+    bitmaps = {}
+    order = np.argsort(keys, kind='stable')
+    bounds = np.flatnonzero(np.diff(keys[order], prepend=-1, append=-1))
+    for start, end in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        mask = np.zeros(size, dtype=bool)
+        mask[rows[order[start:end]]] = True
+        bitmaps[names[keys[order[start]]]] = _bitmap(mask)
+    return bitmaps
+
+
+def _range(bitmaps, low, high):
+    """OR of the bitmaps whose key lies in [low, high] (either end open if None)."""
+    selected = 0
+    for value, bitmap in bitmaps.items():
+        if (low is None or value >= low) and (high is None or value <= high):
+            selected |= bitmap
+    return selected
+
+
+def _names(value):
+    if value is None:
+        return ()
+    return (value,) if isinstance(value, str) else tuple(value)
+
+
+def _cache_key(filters):
+    # Player lists are order-free, so ["A", "B"] and ["B", "A"] share an entry
+    return tuple(sorted(
+        (name, tuple(sorted(_names(value))) if name in PLAYER_FILTERS else value)
+        for name, value in filters.items() if value is not None
+    ))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Answer an ad-hoc question about the rounds of a game log.")
+    parser.add_argument("log", nargs="?", default="data.json", help="game log to query (default: data.json)")
+    parser.add_argument("--player", help="summarize one player's rounds as leader / teammate")
+    parser.add_argument("--cache", action="store_true",
+                        help="read the log through its binary cache (.ktwc next to the log)")
+    for name, help_text in FILTERS.items():
+        option = "--" + name.replace("_", "-")
+        if name in PLAYER_FILTERS:
+            parser.add_argument(option, nargs="+", metavar="PLAYER", help=help_text)
+        elif name in FLAG_FILTERS:
+            parser.add_argument(option, choices=("yes", "no"), help=help_text)
+        else:
+            parser.add_argument(option, type=int, help=help_text)
+    args = parser.parse_args()
+
+    filters = {}
+    for name in FILTERS:
+        value = getattr(args, name)
+        if value is not None:
+            filters[name] = value == "yes" if name in FLAG_FILTERS else value
+
+    index = QueryIndex.from_log(args.log, args.cache)
+    if args.player:
+        answer = index.player_summary(args.player, **filters)
+    else:
+        answer = index.summary(**filters)
+    print(json.dumps(answer, indent=2, ensure_ascii=False))
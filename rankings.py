@@ -0,0 +1,125 @@
+"""
+Leaderboards over the per-player stats from data.stats_view.
+
+Every leaderboard is built once per run and shared by the console report
+and the slide generator. Ties are broken deterministically (frequentNames
+order by default, or by name) and each entry carries both rank numbers:
+
+    competition ("1224"): tied players share a rank, the next rank skips
+    dense       ("1223"): tied players share a rank, the next rank doesn't
+
+    boards = build_leaderboards(stats['player_stats'])
+    boards['round_win_pct'].top(3)
+    boards['teammate_count'].leaders()     # everyone tied for first
+
+Rates can carry confidence intervals (see intervals.py). Entries then
+include an 'interval' and, with rank_by='lower', rate boards are ranked by
+the interval's lower bound, so a 100% from 5 rounds doesn't beat a solid
+70% from 200.
+"""
+import heapq
+
+# Stat key -> whether players with a zero value are left off the board
+# (e.g. players who never led have no conversion rate to rank)
+LEADERBOARDS = {
+    'games_played': False,
+    'round_win_pct': False,
+    'leader_conv_rate': True,
+    'clutch_wins': True,
+    'teammate_count': True,
+    'teammate_win_rate': True,
+    'podium_1st': False,
+}
+
+
+class Leaderboard:
+    """One metric's ranked players, best first."""
+
+    def __init__(self, metric, entries):
+        self.metric = metric
+        self.entries = entries  # [{'player', 'value', 'rank', 'dense_rank'[, 'interval']}, ...]
+        self._by_player = None
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def top(self, k, with_ties=False):
+        """The first k entries; with_ties extends the cut through players tied with the k-th."""
+        if k <= 0:
+            return []
+        if not with_ties or k >= len(self.entries):
+            return self.entries[:k]
+        cutoff = self.entries[k - 1]['rank']
+        end = k
+        while end < len(self.entries) and self.entries[end]['rank'] == cutoff:
+            end += 1
+        return self.entries[:end]
+
+    def leaders(self):
+        """Every player tied for first place."""
+        return self.top(1, with_ties=True)
+
+    def rank_of(self, player):
+        """The player's entry, or None if they are not on this board."""
+        if self._by_player is None:
+            self._by_player = {entry['player']: entry for entry in self.entries}
+        return self._by_player.get(player)
+
+
+def rank(metric, values, skip_zero=False, k=None, tie_break='order', intervals=None, rank_by='value'):
+    """
+    Rank players by value, highest first.
+    values maps player -> value in a stable order (e.g. frequentNames);
+    tie_break is 'order' to keep that order among ties, or 'name'.
+    With k, only the top k are kept, selected with a heap instead of a full sort.
+    intervals maps player -> [low, high] (or None); with rank_by='lower'
+    players are ranked by the lower bound, then by value.
+    """
+    if rank_by not in ('value', 'lower'):
+        raise ValueError(f"Unknown rank_by {rank_by}, expected value or lower")
+    rows = []
+    for position, (player, value) in enumerate(values.items()):
+        if skip_zero and not value:
+            continue
+        if rank_by == 'lower' and intervals is not None:
+            interval = intervals.get(player)
+            key = (-(interval[0] if interval else 0), -value)
+        else:
+            key = (-value,)
+        rows.append((key, player if tie_break == 'name' else position, player))
+
+    rows = heapq.nsmallest(k, rows) if k is not None and k < len(rows) else sorted(rows)
+
+    entries = []
+    previous = None
+    competition = dense = 0
+    for position, (key, _, player) in enumerate(rows, 1):
+        if key != previous:
+            competition, dense, previous = position, dense + 1, key
+        entry = {'player': player, 'value': -key[-1], 'rank': competition, 'dense_rank': dense}
+        if intervals is not None:
+            entry['interval'] = intervals.get(player)
+        entries.append(entry)
+    return Leaderboard(metric, entries)
+
+
+def build_leaderboards(player_stats, metrics=None, k=None, tie_break='order', intervals=None, rank_by='value'):
+    """
+    Build the leaderboard of each metric (default: all of LEADERBOARDS) in one pass over the stats.
+    intervals ({player: {metric: [low, high]}}, e.g. from intervals.wilson_intervals)
+    are attached to the boards of the metrics they cover, and used for ranking with rank_by='lower'.
+    """
+    metrics = LEADERBOARDS if metrics is None else {metric: LEADERBOARDS.get(metric, False) for metric in metrics}
+    columns = {metric: {} for metric in metrics}
+    bounds = {}
+    for player, stats in player_stats.items():
+        player_intervals = intervals.get(player, {}) if intervals else {}
+        for metric in metrics:
+            columns[metric][player] = stats[metric]
+            if metric in player_intervals:
+                bounds.setdefault(metric, {})[player] = player_intervals[metric]
+    return {metric: rank(metric, columns[metric], skip_zero, k, tie_break, bounds.get(metric), rank_by)
+            for metric, skip_zero in metrics.items()}
@@ -0,0 +1,290 @@
+"""
+Team-aware Elo ratings, updated round by round.
+
+Every round is a match between the bidding team (leader + teammates) and
+everyone else at the table. The team's chance of making the bid comes
+from the average rating on each side; the surprise (result - expectation)
+moves each side's ratings, scaled by the bid so a made 250 counts for more
+than a made 150. Mirroring the scoring, the leader takes a double share.
+Rating changes are zero-sum within a round.
+
+Each round touches only the players at that table, so the cost per round
+is constant however long the history is, and the engine can run inside
+any ingest loop (add_game). Its state is checkpointed like the stats
+snapshot, so new games extend the ratings without replaying history. The
+checkpoint records where the rated games sit in the log (how many, and the
+content hashes of the first and last), so finding the new games hashes only
+those plus two, whether the app prepends or appends them:
+
+    engine = load_ratings("data.json", "ratings_checkpoint.json")
+    engine.leaderboard(frequent_players)
+    ratings_slide(engine, frequent_players)
+
+    python3 ratings.py data.json --checkpoint ratings_checkpoint.json
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+from ingest import GameLog
+from model import as_game
+from rankings import rank
+from stats_core import game_key
+
+CHECKPOINT_VERSION = 3
+INITIAL_RATING = 1500.0
+K_FACTOR = 16.0      # Rating points at stake in a round bid at BASE_POINTS
+BASE_POINTS = 200    # Bid the K factor is calibrated to
+LEADER_SHARE = 2.0   # Leader's share of the team's change, teammates get 1
+RECENT_GAMES = 10    # Games the "recent form" change on the slide covers
+
+
+class RatingEngine:
+    """Ratings, rated rounds and per-game rating history for every player seen."""
+
+    def __init__(self, k_factor=K_FACTOR, initial=INITIAL_RATING):
+        self.k_factor = k_factor
+        self.initial = initial
+        self.ratings = {}
+        self.rounds = {}
+        # Player -> [[game date, rating after the game], ...], oldest first
+        self.history = {}
+        # The rated games' run in the log: how many, and the content hashes
+        # of the first and last of them in log order
+        self.num_games = 0
+        self.first_key = None
+        self.last_key = None
+        # Timestamp of the newest dated game rated so far
+        self.latest = None
+
+    def rating(self, player):
+        return self.ratings.get(player, self.initial)
+
+    def rate_round(self, leader, teammates, opponents, points, won):
+        """Update ratings for one round. O(players at the table)."""
+        team = list(dict.fromkeys([leader, *teammates]))
+        opponents = [player for player in opponents if player not in team]
+        if not opponents:
+            return
+
+        ratings = self.ratings
+        initial = self.initial
+        team_rating = sum(ratings.get(player, initial) for player in team) / len(team)
+        opponent_rating = sum(ratings.get(player, initial) for player in opponents) / len(opponents)
+        expected = 1 / (1 + 10 ** ((opponent_rating - team_rating) / 400))
+        change = self.k_factor * (points / BASE_POINTS) * ((1.0 if won else 0.0) - expected)
+
+        shares = {player: 1.0 for player in team}
+        shares[leader] = LEADER_SHARE
+        for player, share in shares.items():
+            ratings[player] = ratings.get(player, initial) + change * share
+            self.rounds[player] = self.rounds.get(player, 0) + 1
+        # The opponents split what the team gained or lost
+        opponent_change = change * sum(shares.values()) / len(opponents)
+        for player in opponents:
+            ratings[player] = ratings.get(player, initial) - opponent_change
+            self.rounds[player] = self.rounds.get(player, 0) + 1
+
+    def add_game(self, game):
+        """
+        Rate every round of one game (a model.Game or raw game dict), in the
+        order played, and record each player's new rating.
+        """
+        game = as_game(game)
+        # Everyone at the table: the player list, anyone with a score and anyone who played a round
+        seated = dict.fromkeys(game.players or game.scores)
+        for rd in game.rounds:
+            seated.update(dict.fromkeys([rd.leader, *rd.teammates]))
+
+        for rd in game.rounds:
+            self.rate_round(rd.leader, rd.teammates, seated, rd.points, rd.result)
+
+        for player in seated:
+            if player in self.ratings:
+                self.history.setdefault(player, []).append([game.date, round(self.ratings[player], 1)])
+
+    def pending(self, games):
+        """
+        The games of a log (in log order) that haven't been rated yet, as
+        (new games oldest first, the log's position to record once they are
+        rated). New games may come before the rated ones, after them or
+        both. Returns None if the rated games are no longer an unbroken run
+        of the log (one was edited or removed), so the ratings need a replay.
+        """
+        new_games = []
+        rated_end = None   # Log index just past the rated games, once their first one is found
+        first = last = None
+        count = 0
+        for index, game in enumerate(games):
+            if first is None:
+                first = game
+            last = game
+            count += 1
+            if rated_end is None:
+                if self.num_games and game_key(game) == self.first_key:
+                    rated_end = index + self.num_games
+                else:
+                    new_games.append(game)
+                    continue
+            if index >= rated_end:
+                new_games.append(game)
+            elif index == rated_end - 1 and game_key(game) != self.last_key:
+                return None
+        if self.num_games and (rated_end is None or count < rated_end):
+            return None
+
+        position = (count, game_key(first) if count else None, game_key(last) if count else None)
+        new_games.reverse()
+        if all(game.get('date') for game in new_games):
+            new_games.sort(key=lambda game: _timestamp(game['date']))
+        return new_games, position
+
+    def is_backfill(self, new_games):
+        """True if any pending game is older than a game already rated, so history would need replaying."""
+        return self.latest is not None and any(
+            game.get('date') and _timestamp(game['date']) < self.latest for game in new_games)
+
+    def rate(self, new_games, position):
+        """Rate pending games in order and record the log position from pending(). Returns how many were rated."""
+        for game in new_games:
+            self.add_game(game)
+            if game.get('date'):
+                self.latest = max(self.latest or 0, _timestamp(game['date']))
+        self.num_games, self.first_key, self.last_key = position
+        return len(new_games)
+
+    def extend(self, games):
+        """
+        Rate only the games of a log that haven't been rated yet, oldest
+        first. Returns the number added; raises ValueError if the rated
+        games were edited or removed from the log.
+        """
+        pending = self.pending(games)
+        if pending is None:
+            raise ValueError("The rated games are no longer in the log, rebuild the ratings")
+        return self.rate(*pending)
+
+    def leaderboard(self, players=None):
+        """Players (default: everyone rated) by rating, best first, with their rank, peak and recent change."""
+        players = list(self.ratings) if players is None else [player for player in players if player in self.ratings]
+        # Competition ranks like every other board: equal ratings share a rank
+        board = rank('rating', {player: round(self.ratings[player], 1) for player in players})
+        rows = []
+        for entry in board:
+            player = entry['player']
+            ratings = [rating for _, rating in self.history.get(player, [])]
+            recent = ratings[-RECENT_GAMES - 1] if len(ratings) > RECENT_GAMES else self.initial
+            rows.append({
+                'player': player,
+                'rank': entry['rank'],
+                'rating': entry['value'],
+                'peak': max(ratings, default=entry['value']),
+                'recent_change': round(self.ratings[player] - recent, 1),
+                'rounds': self.rounds.get(player, 0),
+            })
+        return rows
+
+    # --- Checkpoints -------------------------------------------------------
+
+    def to_dict(self):
+        return {
+            'version': CHECKPOINT_VERSION,
+            'k_factor': self.k_factor,
+            'initial': self.initial,
+            'ratings': self.ratings,
+            'rounds': self.rounds,
+            'history': self.history,
+            'num_games': self.num_games,
+            'first_key': self.first_key,
+            'last_key': self.last_key,
+            'latest': self.latest,
+        }
+
+    @classmethod
+    def from_dict(cls, checkpoint):
+        if checkpoint.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported ratings checkpoint version: {checkpoint.get('version')}")
+        engine = cls(checkpoint['k_factor'], checkpoint['initial'])
+        engine.ratings = checkpoint['ratings']
+        engine.rounds = checkpoint['rounds']
+        engine.history = checkpoint['history']
+        engine.num_games = checkpoint['num_games']
+        engine.first_key = checkpoint['first_key']
+        engine.last_key = checkpoint['last_key']
+        engine.latest = checkpoint['latest']
+        return engine
+
+    def save(self, path):
+        """Write the checkpoint to disk, replacing any previous one atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def _timestamp(date):
+    return datetime.fromisoformat(date.replace('Z', '+00:00')).timestamp()
+
+
+def load_ratings(path, checkpoint_path=None, k_factor=K_FACTOR):
+    """
+    Rate a game log. With checkpoint_path, resume from the saved ratings and
+    only rate games that aren't in it yet. The checkpoint is rebuilt if its
+    format or K factor changed, if a rated game was edited or removed, or if
+    a new game is older than the games already rated (ratings depend on
+    order, so backfilled games need a replay).
+    """
+    engine = None
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        try:
+            engine = RatingEngine.load(checkpoint_path)
+        except ValueError:
+            engine = None  # Checkpoint from an older version, rebuild it
+        if engine is not None and engine.k_factor != k_factor:
+            engine = None
+    if engine is None:
+        engine = RatingEngine(k_factor)
+
+    log = GameLog(path)
+    pending = engine.pending(log)
+    if pending is None or engine.is_backfill(pending[0]):
+        engine = RatingEngine(k_factor)
+        pending = engine.pending(log)
+    if engine.rate(*pending) and checkpoint_path:
+        engine.save(checkpoint_path)
+    return engine
+
+
+def ratings_slide(engine, players=None, title='The Rating Ladder'):
+    """A ranked-list slide of current ratings, with each player's peak and recent form."""
+    items = []
+    for row in engine.leaderboard(players):
+        change = row['recent_change']
+        items.append({
+            'rank': row['rank'],
+            'label': row['player'],
+            'value': f"{row['rating']:.0f} (peak {row['peak']:.0f}, {change:+.0f} last {RECENT_GAMES})",
+        })
+    return {'type': 'ranked_list', 'title': title, 'items': items, 'theme': 'theme-2'}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rate the players of a game log with team-aware Elo.")
+    parser.add_argument("log", nargs="?", default="data.json", help="game log to rate (default: data.json)")
+    parser.add_argument("--checkpoint", metavar="PATH", help="resume from and save to this ratings checkpoint")
+    parser.add_argument("--k-factor", type=float, default=K_FACTOR,
+                        help=f"rating points at stake in a {BASE_POINTS}-point round (default: {K_FACTOR:g})")
+    parser.add_argument("--all", action="store_true", help="list Guests too, not just frequentNames players")
+    args = parser.parse_args()
+
+    engine = load_ratings(args.log, args.checkpoint, args.k_factor)
+    players = None if args.all else GameLog(args.log).header().get('frequentNames', [])
+    for row in engine.leaderboard(players):
+        print(f"{row['rank']:>3}. {row['player']:<15} {row['rating']:7.1f}  peak {row['peak']:7.1f}  "
+              f"{row['recent_change']:+6.1f} last {RECENT_GAMES}  ({row['rounds']} rounds)")
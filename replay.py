@@ -0,0 +1,244 @@
+"""
+Score replay and validation.
+
+Recomputes every player's score from the rounds under the log's scoring
+rules and checks it against the final scores recorded in each game. The
+podium stats trust the recorded scores, so this catches games where they
+were typed in wrong.
+
+The scoring rules are read from the log header:
+- made bid: the leader scores leaderWinPoints ("2x" = twice the bid) and
+  each teammate scores the bid
+- failed bid: the leader scores leaderLosePoints (-1 = minus the bid) and
+  every other player in the game scores the bid
+
+Everything is computed over a whole RoundTable at once with bincounts and
+sorted lookups, so checking hundreds of thousands of rounds takes well
+under a second:
+
+    replay = ScoreReplay(table, ScoringRules.from_header(header))
+    replay.mismatches()        # games whose recorded scores disagree
+    replay.trajectory(0)       # running scores after each round of game 0
+
+    python3 replay.py data.json        # exits 1 if any game disagrees
+"""
+import argparse
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+from round_table import NO_DATE, NO_PLAYER
+
+
+def parse_multiplier(value):
+    """A scoring rule as a multiple of the bid: "2x", "2", 2 and -1 are all accepted."""
+    if isinstance(value, str):
+        return float(value.strip().lower().removesuffix('x'))
+    return float(value)
+
+
+class ScoringRules:
+    """Multiples of the bid scored by the leader on a made and on a failed bid."""
+
+    def __init__(self, leader_win=2.0, leader_lose=-1.0):
+        self.leader_win = leader_win
+        self.leader_lose = leader_lose
+
+    @classmethod
+    def from_header(cls, header):
+        """Rules from a log's leaderWinPoints / leaderLosePoints, defaulting to the app's "2x" / -1."""
+        return cls(parse_multiplier(header.get('leaderWinPoints', '2x')),
+                   parse_multiplier(header.get('leaderLosePoints', -1)))
+
+
+class ScoreReplay:
+    """
+    Replayed scores for every seat, i.e. every (game, player) that appears
+    in a game's player list, its recorded scores or its rounds. Seats are
+    sorted by game, then player ID.
+    """
+
+    def __init__(self, table, rules=None):
+        self.table = table
+        self.rules = rules or ScoringRules()
+        num_players = max(table.num_players, 1)
+        self._num_players = num_players
+
+        width = table.mates.shape[1]
+        mates = table.mates.ravel()
+        has_mate = mates != NO_PLAYER
+        mate_game = np.repeat(table.game, width)[has_mate]
+
+        keys = np.concatenate([
+            table.listing[:, 0].astype(np.int64) * num_players + table.listing[:, 1],
+            table.placement[:, 0].astype(np.int64) * num_players + table.placement[:, 1],
+            table.game.astype(np.int64) * num_players + table.leader,
+            mate_game.astype(np.int64) * num_players + mates[has_mate],
+        ])
+        # Sort + diff is much faster than np.unique's hashing on millions of int64 keys
+        keys.sort()
+        self.seat_keys = keys[np.r_[True, keys[1:] != keys[:-1]]] if len(keys) else keys
+        self.seat_game = self.seat_keys // num_players
+        self.seat_player = self.seat_keys % num_players
+        num_seats = len(self.seat_keys)
+
+        won = table.result
+        points = table.points.astype(np.float64)
+        lost_points = np.where(won, 0.0, points)
+        self._leader_seat = self._seat_of(table.game, table.leader)
+        mate_seat = np.full(mates.shape, -1, dtype=np.int64)
+        mate_seat[has_mate] = self._seat_of(mate_game, mates[has_mate])
+        self._mate_seat = mate_seat.reshape(-1, width)
+
+        mate_points = np.repeat(points, width)[has_mate]
+        mate_won = np.repeat(won, width)[has_mate]
+        # A leader who also listed themselves as a teammate is still only one seat on the team
+        mate_is_leader = mate_seat[has_mate] == np.repeat(self._leader_seat, width)[has_mate]
+        leader_score = np.where(won, self.rules.leader_win, self.rules.leader_lose) * points
+
+        # Leaders and teammates score by their own result; on a failed bid
+        # every seat at the table gets the bid, minus the bidding team's seats
+        score = np.bincount(self._leader_seat, leader_score, minlength=num_seats)
+        score += np.bincount(mate_seat[has_mate], np.where(mate_won, mate_points, 0.0), minlength=num_seats)
+        score += np.bincount(table.game, lost_points, minlength=table.num_games)[self.seat_game]
+        score -= np.bincount(self._leader_seat, lost_points, minlength=num_seats)
+        score -= np.bincount(mate_seat[has_mate], np.where(mate_won | mate_is_leader, 0.0, mate_points),
+                             minlength=num_seats)
+        self.replayed = score
+
+        # Recorded final scores, NaN where a seat has none
+        self.recorded = np.full(num_seats, np.nan)
+        self.recorded[self._seat_of(table.placement[:, 0], table.placement[:, 1])] = table.final_score
+        self.scored_games = np.bincount(table.placement[:, 0], minlength=table.num_games) > 0
+        self._running = None
+
+    def _seat_of(self, games, players):
+        return np.searchsorted(self.seat_keys, games.astype(np.int64) * self._num_players + players)
+
+    def bad_seats(self, tolerance=0):
+        """
+        Mask of seats whose replayed score differs from the recorded one by
+        more than tolerance. A seat with no recorded score counts as 0;
+        games with no recorded scores at all are not checked.
+        """
+        recorded = np.nan_to_num(self.recorded, nan=0.0)
+        return (np.abs(self.replayed - recorded) > tolerance) & self.scored_games[self.seat_game]
+
+    def mismatches(self, tolerance=0):
+        """Games whose recorded scores disagree with the replay, with the disagreeing players."""
+        bad = np.flatnonzero(self.bad_seats(tolerance))
+        games = {}
+        for seat in bad.tolist():
+            game = int(self.seat_game[seat])
+            entry = games.get(game)
+            if entry is None:
+                entry = games[game] = {'game': game, 'date': _iso(self.table.game_date[game]), 'players': []}
+            recorded = self.recorded[seat]
+            entry['players'].append({
+                'player': self.table.players[self.seat_player[seat]],
+                'recorded': None if np.isnan(recorded) else _number(recorded),
+                'replayed': _number(self.replayed[seat]),
+            })
+        return list(games.values())
+
+    def running_scores(self):
+        """
+        Every seat's score after every round of its game, as flat arrays
+        (round row, seat, score change, running score), ordered by round
+        then seat. Computed once, on first use.
+        """
+        if self._running is not None:
+            return self._running
+        table = self.table
+        seats_per_game = np.bincount(self.seat_game, minlength=table.num_games)
+        first_seat = np.concatenate([[0], np.cumsum(seats_per_game)[:-1]])
+
+        # One entry per (round, seat at that round's game)
+        per_round = seats_per_game[table.game]
+        entry_round = np.repeat(np.arange(len(table)), per_round)
+        round_start = np.cumsum(per_round) - per_round
+        entry_seat = first_seat[table.game][entry_round] + np.arange(len(entry_round)) - round_start[entry_round]
+
+        points = table.points.astype(np.float64)[entry_round]
+        won = table.result[entry_round]
+        is_leader = entry_seat == self._leader_seat[entry_round]
+        is_mate = (self._mate_seat[entry_round] == entry_seat[:, None]).any(axis=1)
+        leader_score = np.where(won, self.rules.leader_win, self.rules.leader_lose) * points
+        delta = (np.where(is_leader, leader_score, 0.0) + np.where(is_mate & won, points, 0.0)
+                 + np.where(~is_leader & ~is_mate & ~won, points, 0.0))
+
+        # Cumulative sum per seat: sort by seat (round order is kept), then
+        # subtract each seat's total before its first entry
+        order = np.argsort(entry_seat, kind='stable')
+        total = np.cumsum(delta[order])
+        sorted_seats = entry_seat[order]
+        starts = np.flatnonzero(np.diff(sorted_seats, prepend=-1))
+        offsets = np.repeat(total[starts] - delta[order][starts], np.diff(np.r_[starts, len(order)]))
+        running = np.empty_like(delta)
+        running[order] = total - offsets
+
+        self._running = (entry_round, entry_seat, delta, running)
+        return self._running
+
+    def trajectory(self, game):
+        """
+        Running scores for one game: {'players': [...], 'scores': rows of
+        each player's score after every round, in the order played}.
+        """
+        entry_round, entry_seat, _, running = self.running_scores()
+        seats = np.flatnonzero(self.seat_game == game)
+        rows = np.flatnonzero(self.table.game == game)
+        if not len(rows):
+            scores = []
+        else:
+            start = np.searchsorted(entry_round, rows[0])
+            scores = running[start:start + len(rows) * len(seats)].reshape(len(rows), len(seats))
+            scores = [[_number(v) for v in row] for row in scores.tolist()]
+        return {'players': [self.table.players[p] for p in self.seat_player[seats]], 'scores': scores}
+
+
+def _number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def _iso(ms):
+    if ms == NO_DATE:
+        return None
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')
+
+
+def validate(table, header, tolerance=0):
+    """Replay a table under its log's rules and return the mismatching games."""
+    return ScoreReplay(table, ScoringRules.from_header(header)).mismatches(tolerance)
+
+
+def print_mismatches(mismatches, limit=20):
+    for entry in mismatches[:limit]:
+        source = f"{entry['log']}, " if 'log' in entry else ""
+        print(f"Game {entry['game']} ({source}{entry['date'] or 'no date'}):")
+        for seat in entry['players']:
+            print(f"  {seat['player']}: recorded {seat['recorded']}, replayed {seat['replayed']}")
+    if len(mismatches) > limit:
+        print(f"... and {len(mismatches) - limit} more games")
+
+
+if __name__ == "__main__":
+    from data import load_round_table
+
+    parser = argparse.ArgumentParser(description="Check recorded scores against a replay of the rounds.")
+    parser.add_argument("log", nargs="?", default="data.json", help="game log to check (default: data.json)")
+    parser.add_argument("--tolerance", type=float, default=0, help="allowed difference per player")
+    parser.add_argument("--show", type=int, default=20, help="games to list (default: 20)")
+    parser.add_argument("--cache", action="store_true",
+                        help="read the log through its binary cache (.ktwc next to the log)")
+    args = parser.parse_args()
+
+    table, header = load_round_table(args.log, args.cache)
+    mismatches = validate(table, header, args.tolerance)
+    if mismatches:
+        print_mismatches(mismatches, args.show)
+        print(f"\n✗ {len(mismatches)} of {table.num_games} games have scores that don't match their rounds")
+        sys.exit(1)
+    print(f"✓ All {table.num_games} games' scores match their rounds")
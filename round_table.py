@@ -0,0 +1,301 @@
+"""
+Columnar round table for Kali Teeri game logs.
+
+Normalizes pastGames into flat NumPy columns (one row per round) with integer
+player IDs, so the stats can be computed with bincounts and group-bys
+instead of walking round dicts in Python.
+"""
+from array import array
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+
+from data import stats_view
+from ingest import GameLog
+from instrument import metrics
+from model import MAX_TEAMMATES, load_games
+from stats_core import StatsAccumulator
+
+NO_PLAYER = -1     # padding for unused teammate slots
+NO_DATE = np.iinfo(np.int64).min  # game_date for games without a parseable date
+
+
+class RoundTable:
+    """
+    One row per round:
+    - game:    index of the game in pastGames
+    - leader:  player ID of the bidder
+    - mates:   (rounds, MAX_TEAMMATES) teammate IDs, padded with NO_PLAYER
+    - points:  bid points
+    - result:  True if the bid was made
+
+    Plus one row per game:
+    - game_size: number of distinct players listed for the game
+    - game_date: start time in ms since the epoch, NO_DATE if unknown
+
+    And per-game player columns:
+    - listing:   (n, 2) rows of (game, player) for every listed player
+    - placement: (n, 3) rows of (game, player, place) from the final scores
+    - final_score: the recorded final score of each placement row
+    """
+
+    def __init__(self, players, frequent_players, game, leader, mates, points, result, game_size, listing,
+                 placement, game_date=None, final_score=None):
+        self.players = players
+        self.player_ids = {name: pid for pid, name in enumerate(players)}
+        self.frequent_order = list(dict.fromkeys(frequent_players))
+        frequent = set(self.frequent_order)
+        self.is_frequent = np.array([name in frequent for name in players], dtype=bool)
+        self.game = game
+        self.leader = leader
+        self.mates = mates
+        self.points = points
+        self.result = result
+        self.game_size = game_size
+        self.game_date = game_date if game_date is not None else np.full(len(game_size), NO_DATE)
+        self.listing = listing
+        self.placement = placement
+        self.final_score = final_score if final_score is not None else np.full(len(placement), np.nan)
+
+    @classmethod
+    def from_games(cls, games, frequent_players, max_teammates=MAX_TEAMMATES):
+        """
+        Build the table from any iterable of games (e.g. a streaming GameLog).
+        Raw game dicts are validated as they are read (see model.load_games).
+        """
+        player_ids = {}
+
+        def pid(name):
+            if name not in player_ids:
+                player_ids[name] = len(player_ids)
+            return player_ids[name]
+
+        # Preassign frequent players the lowest IDs so they line up with frequentNames
+        for name in frequent_players:
+            pid(name)
+
+        game_col, leader_col, points_col, result_col = array('i'), array('i'), array('i'), array('b')
+        mates_col = array('i')
+        size_col, listing_col, placement_col, date_col = array('i'), array('i'), array('i'), array('q')
+        score_col = array('d')
+        padding = [NO_PLAYER] * max_teammates
+
+        for game_idx, game in enumerate(load_games(games)):
+            listed = game.players
+            size_col.append(len(set(listed)))
+            date_col.append(_parse_date(game.date))
+            for player in listed:
+                listing_col.extend((game_idx, pid(player)))
+
+            sorted_players = sorted(game.scores.items(), key=lambda x: x[1], reverse=True)
+            for place, (player, score) in enumerate(sorted_players, 1):
+                placement_col.extend((game_idx, pid(player), place))
+                score_col.append(score)
+
+            for rd in game.rounds:
+                teammates = rd.teammates
+                if len(teammates) > max_teammates:
+                    raise ValueError(f"Round in game {game_idx} has {len(teammates)} teammates, "
+                                     f"more than max_teammates={max_teammates}")
+                game_col.append(game_idx)
+                leader_col.append(pid(rd.leader))
+                mates_col.extend([pid(tm) for tm in teammates] + padding[len(teammates):])
+                points_col.append(rd.points)
+                result_col.append(rd.result)
+
+        players = list(player_ids)
+        return cls(
+            players, frequent_players,
+            game=np.frombuffer(game_col, dtype=np.int32),
+            leader=np.frombuffer(leader_col, dtype=np.int32),
+            mates=np.frombuffer(mates_col, dtype=np.int32).reshape(-1, max_teammates),
+            points=np.frombuffer(points_col, dtype=np.int32),
+            result=np.frombuffer(result_col, dtype=np.int8).astype(bool),
+            game_size=np.frombuffer(size_col, dtype=np.int32),
+            game_date=np.frombuffer(date_col, dtype=np.int64),
+            listing=np.frombuffer(listing_col, dtype=np.int32).reshape(-1, 2),
+            placement=np.frombuffer(placement_col, dtype=np.int32).reshape(-1, 3),
+            final_score=np.frombuffer(score_col, dtype=np.float64),
+        )
+
+    @classmethod
+    def from_log(cls, path, max_teammates=MAX_TEAMMATES):
+        """Build the table straight from a game log, in memory. Returns (table, header)."""
+        log = GameLog(path)
+        table = cls.from_games(log, log.header().get('frequentNames', []), max_teammates)
+        return table, log.header()
+
+    def chronological_order(self):
+        """
+        Game indices sorted oldest first: by date when every game has one,
+        otherwise by reversed log order (the app exports newest first).
+        """
+        if self.num_games and (self.game_date != NO_DATE).all():
+            return np.argsort(self.game_date, kind='stable')
+        return np.arange(self.num_games)[::-1]
+
+    @property
+    def num_players(self):
+        return len(self.players)
+
+    @property
+    def num_games(self):
+        return len(self.game_size)
+
+    def __len__(self):
+        return len(self.leader)
+
+    def frequent(self, ids):
+        """Boolean mask of which IDs (NO_PLAYER allowed) are frequent players."""
+        return (ids >= 0) & self.is_frequent[np.maximum(ids, 0)]
+
+    def count(self, ids, mask=None, weights=None):
+        """Group-by count (or weighted sum) of rows per player ID."""
+        if mask is not None:
+            ids = ids[mask]
+            weights = weights[mask] if weights is not None else None
+        return np.bincount(ids, weights=weights, minlength=self.num_players)
+
+
+def _parse_date(value):
+    """ISO timestamp (as exported by the app) to ms since the epoch, or NO_DATE."""
+    if not value:
+        return NO_DATE
+    try:
+        return int(datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp() * 1000)
+    except (TypeError, ValueError):
+        return NO_DATE
+
+
+def accumulate(table):
+    """
+    Compute every StatsAccumulator counter from the table with vectorized
+    bincounts and group-bys. Keys are inserted in the order the per-round
+    loop would first see them, so every view produces identical output.
+    """
+    n = table.num_players
+    names = table.players
+    width = table.mates.shape[1]
+    accumulator = StatsAccumulator(table.frequent_order)
+
+    leader_frequent = table.frequent(table.leader)
+    mate_frequent = table.frequent(table.mates)
+    won = leader_frequent & table.result
+
+    metrics.count('games', table.num_games)
+    metrics.count('rounds', len(table))
+    metrics.count('guest_led_rounds', int(len(table) - leader_frequent.sum()))
+
+    accumulator.leader_count = _to_counter(names, table.count(table.leader, leader_frequent))
+    accumulator.leader_wins = _to_counter(names, table.count(table.leader, won))
+    accumulator.leader_bids = _group_counter(names, [table.leader, table.points], leader_frequent, name_columns=1)
+    accumulator.leader_bid_wins = _group_counter(names, [table.leader, table.points], won, name_columns=1)
+
+    # Teammates of frequent leaders, and of Guest leaders
+    mates = table.mates.ravel()
+    led = (mate_frequent & leader_frequent[:, None]).ravel()
+    guest_led = (mate_frequent & ~leader_frequent[:, None]).ravel()
+    mate_won = led & np.repeat(table.result, width)
+    accumulator.teammate_count = _to_counter(names, table.count(mates, led))
+    accumulator.teammate_wins = _to_counter(names, table.count(mates, mate_won))
+    accumulator.guest_led_teammate_count = _to_counter(names, table.count(mates, guest_led))
+
+    # Games played: distinct (game, player) pairs over every counted seat
+    seat_games = np.concatenate([table.game[leader_frequent], np.repeat(table.game, width)[led]])
+    seat_players = np.concatenate([table.leader[leader_frequent], mates[led]])
+    pairs = np.sort(seat_games.astype(np.int64) * n + seat_players)
+    pairs = pairs[np.concatenate([[True], pairs[1:] != pairs[:-1]])] if len(pairs) else pairs
+    accumulator.games_played = _to_counter(names, np.bincount(pairs % n, minlength=n))
+
+    listing_player = table.listing[:, 1]
+    accumulator.games_listed = _to_counter(names, table.count(listing_player, table.frequent(listing_player)))
+
+    # Teammate pairs: every (frequent teammate, other teammate) in the same round.
+    # nonzero() walks (round, slot, other slot) in the same order as the loop.
+    other = np.broadcast_to(table.mates[:, None, :], (len(table), width, width))
+    owner = np.broadcast_to(table.mates[:, :, None], (len(table), width, width))
+    pair_mask = mate_frequent[:, :, None] & (other >= 0) & (other != owner)
+    rows, slots, other_slots = np.nonzero(pair_mask)
+    accumulator.teammate_pairs = _group_counter(
+        names, [table.mates[rows, slots], table.mates[rows, other_slots]], name_columns=2)
+
+    # Teams made up entirely of frequent players, as (bitmask, game size).
+    # Frequent players hold IDs 0..F-1, which are also their bit positions.
+    if len(table.frequent_order) > 63:
+        raise ValueError("Vectorized team masks support at most 63 frequent players")
+    team_size = 1 + (table.mates >= 0).sum(axis=1)
+    all_frequent = leader_frequent & (mate_frequent.sum(axis=1) == team_size - 1)
+    team_rows = np.flatnonzero(all_frequent)
+    mate_bits = np.where(table.mates[team_rows] >= 0, np.left_shift(1, table.mates[team_rows].astype(np.int64)), 0)
+    masks = np.bitwise_or.reduce(mate_bits, axis=1) | np.left_shift(1, table.leader[team_rows].astype(np.int64))
+    keys, first, inverse, rounds = _unique_rows([masks, table.game_size[table.game[team_rows]]])
+    wins = np.bincount(inverse, weights=table.result[team_rows], minlength=len(keys))
+    points = np.bincount(inverse, weights=table.points[team_rows], minlength=len(keys))
+    for i in np.argsort(first, kind='stable').tolist():
+        accumulator.teams.add(int(keys[i, 0]), int(keys[i, 1]), int(points[i]), int(wins[i]), rounds=int(rounds[i]))
+
+    placement_player = table.placement[:, 1]
+    accumulator.placements = _group_counter(names, [placement_player, table.placement[:, 2]],
+                                            table.frequent(placement_player), name_columns=1)
+    return accumulator
+
+
+def _to_counter(names, counts):
+    return Counter({names[pid]: int(c) for pid, c in enumerate(counts.tolist()) if c})
+
+
+def _group_counter(names, columns, mask=None, name_columns=1):
+    """
+    Count distinct rows of the given columns into a Counter keyed by tuples,
+    mapping the first name_columns columns from player IDs back to names.
+    Keys are inserted in order of first appearance.
+    """
+    if mask is not None:
+        columns = [column[mask] for column in columns]
+    counts = Counter()
+    if not len(columns[0]):
+        return counts
+    keys, first, _, totals = _unique_rows(columns)
+    for i in np.argsort(first, kind='stable').tolist():
+        row = keys[i].tolist()
+        counts[tuple(names[v] for v in row[:name_columns]) + tuple(row[name_columns:])] = int(totals[i])
+    return counts
+
+
+def _unique_rows(columns):
+    """
+    np.unique over rows of integer columns, returning (keys, first index,
+    inverse, counts). Rows are packed into one int64 code (mixed radix over
+    each column's range) so the sort is 1-D; this is much faster than
+    np.unique(axis=0), which is only used when the codes would overflow.
+    """
+    columns = [np.asarray(column, dtype=np.int64) for column in columns]
+    if not len(columns[0]):
+        empty = np.zeros(0, dtype=np.int64)
+        return np.zeros((0, len(columns)), dtype=np.int64), empty, empty, empty
+
+    lows = [int(column.min()) for column in columns]
+    spans = [int(column.max()) - low + 1 for column, low in zip(columns, lows)]
+    if np.prod([float(span) for span in spans]) >= 2 ** 62:
+        keys, first, inverse, counts = np.unique(np.column_stack(columns), axis=0, return_index=True,
+                                                 return_inverse=True, return_counts=True)
+        return keys, first, inverse.ravel(), counts
+
+    codes = np.zeros(len(columns[0]), dtype=np.int64)
+    for column, low, span in zip(columns, lows, spans):
+        codes = codes * span + (column - low)
+    unique_codes, first, inverse, counts = np.unique(codes, return_index=True, return_inverse=True,
+                                                     return_counts=True)
+
+    keys = np.empty((len(unique_codes), len(columns)), dtype=np.int64)
+    for i in range(len(columns) - 1, -1, -1):
+        unique_codes, keys[:, i] = np.divmod(unique_codes, spans[i])
+        keys[:, i] += lows[i]
+    return keys, first, inverse.ravel(), counts
+
+
+def calculate_stats_vectorized(data):
+    """Vectorized equivalent of data.calculate_stats."""
+    table = RoundTable.from_games(data.get('pastGames', []), data.get('frequentNames', []))
+    return stats_view(accumulate(table))
@@ -0,0 +1,422 @@
+"""
+Async HTTP service for the Wrapped statistics.
+
+Holds the aggregated stats for one game log in memory and serves them as
+JSON, alongside the web app itself:
+
+    GET  /api/stats                    data.stats_view output
+    GET  /api/leaderboards             every leaderboard
+    GET  /api/leaderboards/<metric>    one leaderboard, ?k=N for the top N (ties included)
+    GET  /api/players                  frequent players
+    GET  /api/players/<name>           one player's stats and leaderboard ranks
+    GET  /api/slides                   the slide deck
+    GET  /api/synergy                  best and worst pairs, and the frequent players' lift heatmap
+    GET  /api/synergy/<name>           one player's partners by lift
+    GET  /api/synergy/<name>/<name>    everything about one pair
+    GET  /wrapped_data.js              the deck as the script index.html loads
+    POST /api/games                    add a game, a list of games or {"pastGames": [...]}
+
+Each response body is encoded once per version of the stats and reused,
+with a strong ETag (the gzipped form has its own), so a client
+revalidating with If-None-Match gets a bodyless 304. Posted games are
+folded into the running accumulator (games already counted are skipped)
+and, with a snapshot path, appended to <snapshot>.posted.ndjson and saved
+in the snapshot so a restart picks them up. Only the standard library is
+used, except for the synergy routes, which need numpy (and answer 501
+without it); one process handles hundreds of keep-alive clients.
+
+    python3 server.py data.json --port 8000
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import sys
+import traceback
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from data import build_slides, generate_wrapped_data_js, stats_view
+from ingest import GameLog
+from model import GameLogError, load_games
+from rankings import build_leaderboards
+from stats_core import StatsAccumulator, game_key, sync_snapshot
+
+try:
+    from synergy import SynergyMatrix
+except ImportError:  # numpy is optional, only the synergy routes need it
+    SynergyMatrix = None
+
+STATIC_FILES = {
+    '/': ('index.html', 'text/html; charset=utf-8'),
+    '/index.html': ('index.html', 'text/html; charset=utf-8'),
+    '/app.js': ('app.js', 'application/javascript; charset=utf-8'),
+    '/style.css': ('style.css', 'text/css; charset=utf-8'),
+}
+JSON_TYPE = 'application/json; charset=utf-8'
+MAX_BODY = 1 << 20      # Largest accepted POST body, in bytes
+IDLE_TIMEOUT = 30       # Seconds a keep-alive connection may sit idle
+GZIP_MIN_SIZE = 1024    # Smaller bodies are sent uncompressed
+POSTED_SUFFIX = '.posted.ndjson'  # Posted games, appended to <snapshot>.posted.ndjson
+
+REASONS = {
+    200: 'OK', 201: 'Created', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found',
+    405: 'Method Not Allowed', 413: 'Payload Too Large', 500: 'Internal Server Error', 501: 'Not Implemented',
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Body:
+    """An encoded response body with its ETag and, once asked for, its gzipped form."""
+
+    def __init__(self, data, content_type):
+        self.data = data
+        self.content_type = content_type
+        digest = hashlib.sha1(data).hexdigest()
+        self.etag = '"%s"' % digest
+        # Strong ETags identify the exact bytes sent, so the gzipped form has its own
+        self.gzip_etag = '"%s-gz"' % digest
+        self._gzipped = None
+
+    def gzipped(self):
+        if self._gzipped is None:
+            self._gzipped = gzip.compress(self.data, mtime=0)
+        return self._gzipped
+
+
+class StatsService:
+    """The in-memory stats for one game log, plus the cache of encoded responses."""
+
+    def __init__(self, log_path, snapshot_path=None, static_dir=None):
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path
+        # Posted games aren't written into the log, so they are kept next to the snapshot
+        self.posted_path = f"{snapshot_path}{POSTED_SUFFIX}" if snapshot_path else None
+        self.static_dir = static_dir or os.path.dirname(os.path.abspath(__file__))
+        frequent_players = list(dict.fromkeys(GameLog(log_path).header().get('frequentNames', [])))
+        if snapshot_path:
+            self.accumulator = sync_snapshot(snapshot_path, frequent_players, self._games)
+        else:
+            # extend() rather than accumulate_games so posted duplicates are recognised
+            self.accumulator = StatsAccumulator(frequent_players)
+            self.accumulator.extend(self._games())
+        # Pair counts over the same games as the stats, with posted games merged in as they arrive
+        self.synergy = SynergyMatrix.from_games(self._games()) if SynergyMatrix is not None else None
+        self.version = 0
+        self._lock = asyncio.Lock()
+        self._static = {}
+        self._refresh()
+
+    def _games(self):
+        """Every game the stats cover: the log's, then the ones posted since."""
+        yield from GameLog(self.log_path)
+        if self.posted_path and os.path.exists(self.posted_path):
+            yield from GameLog(self.posted_path)
+
+    def _refresh(self):
+        """Recompute the views and start a fresh response cache, swapped in as one object."""
+        stats = stats_view(self.accumulator)
+        leaderboards = build_leaderboards(stats['player_stats'])
+        self.version += 1
+        # (stats, leaderboards, synergy, route -> Body); replaced whole so readers never mix versions
+        self._state = (stats, leaderboards, self.synergy, {})
+
+    def add_games(self, games):
+        """
+        Fold in new games, save the snapshot and recompute. Returns how many
+        were new. Everything that can fail runs before the counts change, so
+        a rejected batch leaves the stats, synergy and journal as they were.
+        """
+        new_games = {}
+        for game in games:
+            key = game_key(game)
+            if key not in self.accumulator.game_keys:
+                new_games.setdefault(key, game)
+        if not new_games:
+            return 0
+        synergy = self.synergy
+        if synergy is not None:
+            synergy = synergy.merge(SynergyMatrix.from_games(new_games.values()))
+        if self.snapshot_path:
+            with open(self.posted_path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(game, ensure_ascii=False) + '\n' for game in new_games.values())
+        added = self.accumulator.extend(new_games.values())
+        self.synergy = synergy
+        if self.snapshot_path:
+            self.accumulator.save(self.snapshot_path)
+        self._refresh()
+        return added
+
+    async def post_games(self, payload):
+        games = parse_games(payload)
+        # One writer at a time; the recompute runs off the event loop so GETs keep flowing
+        async with self._lock:
+            added = await asyncio.to_thread(self.add_games, games)
+        return {'added': added, 'games': self.accumulator.num_games(), 'version': self.version}
+
+    def get(self, path, query):
+        """The cached Body for a GET route, encoding it on first use."""
+        if path in STATIC_FILES:
+            return self._static_body(path)
+
+        stats, leaderboards, synergy, cache = self._state
+        # Only leaderboard routes take a query, so other routes can't be cached once per junk URL
+        key = (path, query.get('k', [''])[0] if path.startswith('/api/leaderboards/') else '')
+        body = cache.get(key)
+        if body is None:
+            body = self._render(path, query, stats, leaderboards, synergy)
+            cache[key] = body
+        return body
+
+    def _render(self, path, query, stats, leaderboards, synergy):
+        parts = [unquote(part) for part in path.strip('/').split('/')]
+        if path == '/wrapped_data.js':
+            js = generate_wrapped_data_js(stats, leaderboards=leaderboards)
+            return Body(js.encode('utf-8'), 'application/javascript; charset=utf-8')
+        if parts[0] != 'api' or len(parts) < 2:
+            raise HTTPError(404, f"No route for {path}")
+
+        resource, rest = parts[1], parts[2:]
+        if resource == 'stats' and not rest:
+            value = stats
+        elif resource == 'slides' and not rest:
+            value = build_slides(stats, leaderboards=leaderboards)
+        elif resource == 'leaderboards' and not rest:
+            value = {metric: board.entries for metric, board in leaderboards.items()}
+        elif resource == 'leaderboards' and len(rest) == 1:
+            board = leaderboards.get(rest[0])
+            if board is None:
+                raise HTTPError(404, f"No leaderboard {rest[0]}")
+            k = query.get('k', [''])[0]
+            if k and not k.isdigit():
+                raise HTTPError(400, "k must be a non-negative integer")
+            value = board.top(int(k), with_ties=True) if k else board.entries
+        elif resource == 'players' and not rest:
+            value = list(stats['player_stats'])
+        elif resource == 'players' and len(rest) == 1:
+            player = rest[0]
+            if player not in stats['player_stats']:
+                raise HTTPError(404, f"No player {player}")
+            ranks = {}
+            for metric, board in leaderboards.items():
+                entry = board.rank_of(player)
+                if entry is not None:
+                    ranks[metric] = {'rank': entry['rank'], 'dense_rank': entry['dense_rank'], 'of': len(board)}
+            value = {'player': player, 'stats': stats['player_stats'][player], 'ranks': ranks}
+        elif resource == 'synergy' and len(rest) <= 2:
+            value = _synergy(synergy, rest, list(stats['player_stats']))
+        else:
+            raise HTTPError(404, f"No route for {path}")
+        return Body(_encode_json(value), JSON_TYPE)
+
+    def _static_body(self, path):
+        name, content_type = STATIC_FILES[path]
+        file_path = os.path.join(self.static_dir, name)
+        try:
+            mtime = os.stat(file_path).st_mtime_ns
+        except FileNotFoundError:
+            raise HTTPError(404, f"{name} not found")
+        cached = self._static.get(name)
+        if cached is None or cached[0] != mtime:
+            with open(file_path, 'rb') as f:
+                cached = self._static[name] = (mtime, Body(f.read(), content_type))
+        return cached[1]
+
+
+def _synergy(synergy, players, frequent):
+    if synergy is None:
+        raise HTTPError(501, "Synergy needs numpy (pip install numpy)")
+    unknown = [player for player in players if player not in synergy.player_index]
+    if unknown:
+        raise HTTPError(404, f"No player {unknown[0]}")
+    if len(players) == 2:
+        return synergy.pair(*players)
+    if len(players) == 1:
+        return {'player': players[0], 'partners': synergy.partners(players[0])}
+    return {
+        'best_pairs': synergy.best_pairs(),
+        'worst_pairs': synergy.best_pairs(worst=True),
+        'heatmap': synergy.heatmap(frequent),
+    }
+
+
+def parse_games(payload):
+    """Turn a POST body into a list of validated games."""
+    if isinstance(payload, dict) and 'pastGames' in payload:
+        games = payload['pastGames']
+    elif isinstance(payload, dict):
+        games = [payload]
+    else:
+        games = payload
+    if not isinstance(games, list):
+        raise HTTPError(400, "Expected a game, a list of games or {\"pastGames\": [...]}")
+    try:
+        # Check every game up front so a bad one rejects the whole request
+        for _ in load_games(games):
+            pass
+    except GameLogError as err:
+        raise HTTPError(400, str(err))
+    return games
+
+
+def _encode_json(value):
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def _etag_matches(header, etag):
+    if header is None:
+        return False
+    tags = [tag.strip() for tag in header.split(',')]
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+
+
+async def _read_request(reader):
+    """Read one request. Returns (method, target, headers, body), or None once the client is done."""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), IDLE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(400, "Request headers too large")
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        raise HTTPError(400, "Malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+    headers[':version'] = version
+
+    length = headers.get('content-length', '0')
+    if not length.isdigit():
+        raise HTTPError(400, "Bad Content-Length")
+    if int(length) > MAX_BODY:
+        raise HTTPError(413, f"Body larger than {MAX_BODY} bytes")
+    try:
+        body = await reader.readexactly(int(length)) if int(length) else b''
+    except asyncio.IncompleteReadError:
+        raise HTTPError(400, "Body shorter than Content-Length")
+    return method, target, headers, body
+
+
+def _response(status, headers, body=b'', send_body=True):
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    if status != 304:
+        lines.append(f"Content-Length: {len(body)}")
+    head = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1')
+    return head + body if send_body else head
+
+
+def _error(status, message, keep_alive):
+    headers = {'Content-Type': JSON_TYPE, 'Connection': 'keep-alive' if keep_alive else 'close'}
+    return _response(status, headers, _encode_json({'error': message}))
+
+
+class StatsServer:
+    """The HTTP front end: parses requests, serves cached bodies and answers 304s."""
+
+    def __init__(self, service):
+        self.service = service
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await _read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = (headers[':version'] == 'HTTP/1.1'
+                                  and headers.get('connection', '').lower() != 'close')
+                    writer.write(await self.dispatch(method, target, headers, body, keep_alive))
+                except HTTPError as err:
+                    writer.write(_error(err.status, str(err), keep_alive))
+                except Exception as err:
+                    # A bug or a failed save: log it and answer, rather than dropping the connection
+                    print(f"✗ Error handling a request: {err!r}", file=sys.stderr)
+                    traceback.print_exc()
+                    keep_alive = False
+                    writer.write(_error(500, "Internal server error", keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, target, headers, body, keep_alive):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        connection = {'Connection': 'keep-alive' if keep_alive else 'close'}
+
+        if url.path == '/api/games':
+            if method != 'POST':
+                raise HTTPError(405, "Use POST to add games")
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise HTTPError(400, "Body is not valid JSON")
+            result = await self.service.post_games(payload)
+            return _response(201, {'Content-Type': JSON_TYPE, **connection}, _encode_json(result))
+
+        if method not in ('GET', 'HEAD'):
+            raise HTTPError(405, f"{method} not allowed on {url.path}")
+        cached = self.service.get(url.path, query)
+        use_gzip = len(cached.data) >= GZIP_MIN_SIZE and 'gzip' in headers.get('accept-encoding', '')
+        etag = cached.gzip_etag if use_gzip else cached.etag
+        response_headers = {
+            'ETag': etag,
+            # Let browsers keep the body but check back every time
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+            **connection,
+        }
+        if _etag_matches(headers.get('if-none-match'), etag):
+            return _response(304, response_headers)
+
+        data = cached.data
+        response_headers['Content-Type'] = cached.content_type
+        if use_gzip:
+            data = cached.gzipped()
+            response_headers['Content-Encoding'] = 'gzip'
+        return _response(200, response_headers, data, send_body=method != 'HEAD')
+
+
+async def serve(service, host='127.0.0.1', port=8000):
+    server = await asyncio.start_server(StatsServer(service).handle, host, port)
+    async with server:
+        await server.serve_forever()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the Kali Teeri Wrapped stats over HTTP.")
+    parser.add_argument("log", nargs="?", default="data.json", help="game log to serve (default: data.json)")
+    parser.add_argument("--host", default="127.0.0.1", help="address to bind (use 0.0.0.0 for phones on the Wi-Fi)")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--snapshot", metavar="PATH",
+                        help="resume from and save posted games to this accumulator snapshot")
+    args = parser.parse_args()
+
+    async def main():
+        service = StatsService(args.log, args.snapshot)
+        print(f"Serving stats for {args.log} on http://{args.host}:{args.port}/")
+        await serve(service, args.host, args.port)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,128 @@
+"""
+Streaming serializer for slide decks.
+
+Slides go through the json encoder chunk by chunk straight into a temp
+file, which is renamed over the target only if its content hash differs
+from what is already on disk. An unchanged deck leaves the file (and its
+mtime) alone, so browser caches and deploy diffs stay warm.
+
+    write_slides("wrapped_data.js", slides)                    # pretty, like the hand-written file
+    write_slides("wrapped_data.js", slides, pretty=False, compress=("gz", "br"))
+
+Precompressed .gz / .br siblings are written next to the file for static
+hosts that serve them directly. Brotli needs `pip install brotli`.
+"""
+import gzip
+import hashlib
+import json
+import os
+
+try:
+    import brotli
+except ImportError:  # optional, only needed for .br siblings
+    brotli = None
+
+JS_PREAMBLE = "// Kali Teeri Wrapped 2025 Data\nconst wrappedData = "
+COMPRESSIONS = ("gz", "br")
+BUFFER_SIZE = 1 << 16
+
+
+def _encoder(pretty):
+    if pretty:
+        return json.JSONEncoder(ensure_ascii=False, indent=2)
+    return json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def iter_json(value, pretty=False):
+    """Encode value as JSON text chunks."""
+    # U+2028 / U+2029 are valid in JSON strings but end a line in older JS parsers
+    for chunk in _encoder(pretty).iterencode(value):
+        yield chunk.replace("\u2028", "\\u2028").replace("\u2029", "\\u2029")
+
+
+def iter_js(slides, pretty=True):
+    """Encode a deck as the wrapped_data.js script, in text chunks."""
+    yield JS_PREAMBLE
+    yield from iter_json(list(slides), pretty)
+    yield ";\n"
+
+
+def file_digest(path):
+    """SHA-1 of a file, or None if it doesn't exist."""
+    digest = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(BUFFER_SIZE), b""):
+                digest.update(chunk)
+    except FileNotFoundError:
+        return None
+    return digest.digest()
+
+
+def write_chunks(path, chunks, compress=()):
+    """
+    Write text chunks to path atomically, hashing them on the way. If the
+    result matches the existing file, the temp file is dropped and nothing
+    is touched. compress lists sibling formats ("gz", "br") to refresh too.
+    Returns True if the file was (re)written.
+    """
+    unknown = set(compress) - set(COMPRESSIONS)
+    if unknown:
+        raise ValueError(f"Unknown compression {', '.join(sorted(unknown))}, expected {' / '.join(COMPRESSIONS)}")
+    if "br" in compress and brotli is None:
+        raise RuntimeError("Writing .br files needs the brotli package (pip install brotli)")
+
+    digest = hashlib.sha1()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        buffer, size = [], 0
+        for chunk in chunks:
+            data = chunk.encode("utf-8")
+            buffer.append(data)
+            size += len(data)
+            if size >= BUFFER_SIZE:
+                block = b"".join(buffer)
+                digest.update(block)
+                f.write(block)
+                buffer, size = [], 0
+        block = b"".join(buffer)
+        digest.update(block)
+        f.write(block)
+
+    changed = digest.digest() != file_digest(path)
+    if changed:
+        os.replace(tmp_path, path)
+    else:
+        os.remove(tmp_path)
+
+    for fmt in compress:
+        sibling = f"{path}.{fmt}"
+        if changed or not os.path.exists(sibling):
+            _compress_file(path, sibling, fmt)
+    return changed
+
+
+def _compress_file(source, target, fmt):
+    tmp_path = f"{target}.tmp"
+    with open(source, "rb") as src, open(tmp_path, "wb") as dst:
+        if fmt == "gz":
+            # mtime=0 keeps the output byte-identical for identical input
+            with gzip.GzipFile(fileobj=dst, mode="wb", compresslevel=9, mtime=0) as gz:
+                for chunk in iter(lambda: src.read(BUFFER_SIZE), b""):
+                    gz.write(chunk)
+        else:
+            compressor = brotli.Compressor(quality=11)
+            for chunk in iter(lambda: src.read(BUFFER_SIZE), b""):
+                dst.write(compressor.process(chunk))
+            dst.write(compressor.finish())
+    os.replace(tmp_path, target)
+
+
+def write_slides(path, slides, pretty=True, compress=()):
+    """Write a deck as wrapped_data.js-style script. Returns True if the file changed."""
+    return write_chunks(path, iter_js(slides, pretty), compress)
+
+
+def write_json(path, value, pretty=False, compress=()):
+    """Write a JSON document (e.g. a deck shard). Returns True if the file changed."""
+    return write_chunks(path, iter_json(value, pretty), compress)
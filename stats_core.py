@@ -0,0 +1,379 @@
+"""
+Single-pass aggregation engine shared by data.py and chat.py.
+
+One traversal of the game log fills every counter either report needs.
+Rules that differ between the reports (clutch threshold, top-N finishes,
+minimum game size for trios) are applied when the counters are read, so
+changing them never needs another scan.
+"""
+import hashlib
+import json
+import os
+from collections import Counter
+
+from ingest import GameLog
+from instrument import metrics
+from model import as_game, load_games
+from team_index import TeamIndex
+
+SNAPSHOT_VERSION = 5
+
+# Counters keyed by player name
+_PLAYER_COUNTERS = (
+    'games_played', 'games_listed', 'leader_count', 'leader_wins',
+    'teammate_count', 'teammate_wins', 'guest_led_teammate_count',
+)
+# Counters keyed by a tuple
+_TUPLE_COUNTERS = (
+    'leader_bids', 'leader_bid_wins', 'teammate_pairs', 'placements',
+)
+
+
+class StatsAccumulator:
+    """
+    Running counters for every stat, updated one game at a time.
+    Only frequentNames players are counted, "Guest" players are ignored.
+    Nothing is kept per game, so memory stays flat however long the log is.
+    """
+
+    def __init__(self, frequent_players):
+        # Keep frequentNames order so ties resolve the same way on every run
+        self.frequent_order = list(dict.fromkeys(frequent_players))
+        self.frequent_players = set(self.frequent_order)
+
+        self.games_played = Counter()  # Games with at least one round played under a frequent leader
+        self.games_listed = Counter()  # Games the player is listed in
+
+        # Leader stats
+        self.leader_count = Counter()     # Total times bidding/leading
+        self.leader_wins = Counter()      # Total wins as leader
+        self.leader_bids = Counter()      # Key: (leader, points), rounds led at that bid
+        self.leader_bid_wins = Counter()  # Key: (leader, points), wins at that bid
+
+        # Teammate stats (rounds led by a frequent player)
+        self.teammate_count = Counter()  # Total times called as teammate
+        self.teammate_wins = Counter()   # Total wins as teammate
+        # Times called as teammate by a Guest leader
+        self.guest_led_teammate_count = Counter()
+        # Key: (player, other teammate in the same round)
+        self.teammate_pairs = Counter()
+
+        # Teams made up entirely of frequent players, as bitmasks
+        self.teams = TeamIndex(self.frequent_order)
+
+        # Finishing positions. Key: (player, place), 1 = highest score
+        self.placements = Counter()
+
+        # Content hashes of the games folded in, with multiplicity: two games
+        # with identical content are still two games (only tracked by extend / sync)
+        self.game_keys = Counter()
+
+    def num_games(self):
+        """Games folded in through extend() / sync()."""
+        return sum(self.game_keys.values())
+
+    def extend(self, games):
+        """
+        Fold in every one of games (only new games, e.g. just posted or just
+        appended to the log) and remember their content hashes.
+        Returns the number of games added.
+        """
+        added = 0
+        for game_index, game in enumerate(games):
+            key = game_key(game)
+            # Validate before touching any counter, so a bad game can't be half counted
+            self._add_keyed(key, as_game(game, game_index))
+            added += 1
+        return added
+
+    def sync(self, games):
+        """
+        Catch up with a whole game log: fold in the games that aren't in the
+        accumulator yet. Games are matched by content hash and counted with
+        multiplicity, so it doesn't matter whether new games were appended
+        or prepended, and two identical games are both counted.
+
+        Returns the number of games added, or None, leaving the accumulator
+        untouched, if it holds games the log no longer has (a game was
+        edited or deleted). Counters can't be taken back, so the caller has
+        to rebuild from scratch then.
+        """
+        counted = Counter(self.game_keys)
+        seen = Counter()
+        # When resuming, new games wait until the log is known to still have every counted game
+        pending = [] if counted else None
+        added = 0
+        for game_index, game in enumerate(games):
+            key = game_key(game)
+            seen[key] += 1
+            if seen[key] <= counted[key]:
+                continue
+            game = as_game(game, game_index)
+            if pending is None:
+                self._add_keyed(key, game)
+            else:
+                pending.append((key, game))
+            added += 1
+        if any(seen[key] < count for key, count in counted.items()):
+            return None
+        for key, game in pending or ():
+            self._add_keyed(key, game)
+        return added
+
+    def _add_keyed(self, key, game):
+        with metrics.span('aggregate'):
+            self.add_game(game)
+        self.game_keys[key] += 1
+
+    def add_game(self, game):
+        """Fold one game (a model.Game, or a raw game dict from pastGames) into the running counters."""
+        game = as_game(game)
+        frequent_players = self.frequent_players
+        listed = game.players
+        game_size = len(set(listed))
+
+        for player in listed:
+            if player in frequent_players:
+                self.games_listed[player] += 1
+
+        # Players seen in this game, so each game counts once towards games_played
+        participants = set()
+        rounds = game.rounds
+        guest_led_rounds = 0
+
+        for rd in rounds:
+            leader = rd.leader
+            teammates = rd.teammates
+            points = rd.points
+            won = rd.result
+
+            if leader in frequent_players:
+                # Count as leader
+                self.leader_count[leader] += 1
+                self.leader_bids[(leader, points)] += 1
+                participants.add(leader)
+                if won:
+                    self.leader_wins[leader] += 1
+                    self.leader_bid_wins[(leader, points)] += 1
+
+                # Count teammates (only if they're in frequentNames)
+                for tm in teammates:
+                    if tm in frequent_players:
+                        self.teammate_count[tm] += 1
+                        participants.add(tm)
+                        if won:
+                            self.teammate_wins[tm] += 1
+            else:
+                guest_led_rounds += 1
+                for tm in teammates:
+                    if tm in frequent_players:
+                        self.guest_led_teammate_count[tm] += 1
+
+            # Who each frequent teammate shared the round with
+            for tm in teammates:
+                if tm in frequent_players:
+                    for other in teammates:
+                        if other != tm:
+                            self.teammate_pairs[(tm, other)] += 1
+
+            # Teams made up entirely of frequent players
+            team_mask = self.teams.mask(leader, teammates)
+            if team_mask is not None:
+                self.teams.add(team_mask, game_size, points, 1 if won else 0)
+
+        self.games_played.update(participants)
+        metrics.count('games')
+        metrics.count('rounds', len(rounds))
+        metrics.count('guest_led_rounds', guest_led_rounds)
+
+        # Sort players by score (descending) and record finishing positions
+        with metrics.span('podium'):
+            sorted_players = sorted(game.scores.items(), key=lambda x: x[1], reverse=True)
+            for place, (player, score) in enumerate(sorted_players, 1):
+                if player in frequent_players:
+                    self.placements[(player, place)] += 1
+
+    def merge(self, other):
+        """
+        Add another accumulator's counters into this one. Merging is
+        associative, so per-file partials can be combined in any grouping.
+        Each game lives in exactly one partial, so games played simply add up.
+        If the frequentNames lists differ, the result covers their union and
+        each partial only contributes the players it counted.
+        """
+        for player in other.frequent_order:
+            if player not in self.frequent_players:
+                self.frequent_order.append(player)
+                self.frequent_players.add(player)
+                self.teams.add_player(player)
+        for name in _PLAYER_COUNTERS + _TUPLE_COUNTERS:
+            getattr(self, name).update(getattr(other, name))
+        self.teams.merge(other.teams)
+        self.game_keys.update(other.game_keys)
+        return self
+
+    # --- Views over the counters -------------------------------------------
+
+    def total_rounds(self, player, include_guest_led=False):
+        """Rounds played as leader or teammate."""
+        rounds = self.leader_count[player] + self.teammate_count[player]
+        if include_guest_led:
+            rounds += self.guest_led_teammate_count[player]
+        return rounds
+
+    def total_wins(self, player):
+        """Wins as leader or teammate (rounds led by frequent players)."""
+        return self.leader_wins[player] + self.teammate_wins[player]
+
+    def clutch_counts(self, threshold=200, strict=False, wins_only=True):
+        """
+        Rounds led with a bid at or above threshold (above it if strict),
+        counting only wins unless wins_only is False.
+        """
+        bids = self.leader_bid_wins if wins_only else self.leader_bids
+        counts = Counter()
+        for (leader, points), count in bids.items():
+            if points > threshold or (points == threshold and not strict):
+                counts[leader] += count
+        return counts
+
+    def points_as_leader(self):
+        """Total bid points per leader."""
+        totals = Counter()
+        for (leader, points), count in self.leader_bids.items():
+            totals[leader] += points * count
+        return totals
+
+    def place_counts(self, place):
+        """Number of times each player finished in exactly this place."""
+        return Counter({player: count for (player, p), count in self.placements.items() if p == place})
+
+    def top_n_finishes(self, n=3):
+        """Number of times each player finished in the top n."""
+        counts = Counter()
+        for (player, place), count in self.placements.items():
+            if place <= n:
+                counts[player] += count
+        return counts
+
+    # --- Snapshots ---------------------------------------------------------
+
+    def to_dict(self):
+        """Serialize every counter into a JSON-friendly snapshot."""
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'frequent_players': self.frequent_order,
+            'game_keys': sorted(self.game_keys.elements()),
+            'teams': self.teams.to_rows()
+        }
+        for name in _PLAYER_COUNTERS:
+            snapshot[name] = dict(getattr(self, name))
+        for name in _TUPLE_COUNTERS:
+            snapshot[name] = [[list(key) if isinstance(key, tuple) else key for key in keys] + [count]
+                              for keys, count in getattr(self, name).items()]
+        return snapshot
+
+    @classmethod
+    def from_dict(cls, snapshot):
+        """Rebuild an accumulator from a to_dict() snapshot."""
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported stats snapshot version: {snapshot.get('version')}")
+
+        accumulator = cls(snapshot['frequent_players'])
+        for name in _PLAYER_COUNTERS:
+            setattr(accumulator, name, Counter(snapshot[name]))
+        for name in _TUPLE_COUNTERS:
+            setattr(accumulator, name, Counter({
+                tuple(tuple(key) if isinstance(key, list) else key for key in row[:-1]): row[-1]
+                for row in snapshot[name]
+            }))
+        accumulator.teams = TeamIndex.from_rows(accumulator.frequent_order, snapshot['teams'])
+        accumulator.game_keys = Counter(snapshot['game_keys'])
+        return accumulator
+
+    def save(self, path):
+        """Write the snapshot to disk, replacing any previous one atomically."""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Read a snapshot written by save()."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def game_key(game):
+    """
+    Content hash identifying a game, independent of key order. A raw dict
+    is hashed as its model.Game record, so keys the app doesn't export and
+    defaults left out (no scores, no players) hash the same either way.
+    """
+    canonical = json.dumps(as_game(game).to_dict(), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def accumulate_games(frequent_players, games):
+    """
+    Run one pass over games and return the filled accumulator. Raw game
+    dicts are validated as they are read (see model.load_games).
+    """
+    accumulator = StatsAccumulator(frequent_players)
+    for game in load_games(games):
+        with metrics.span('aggregate'):
+            accumulator.add_game(game)
+    return accumulator
+
+
+def resume_accumulator(snapshot_path, frequent_players):
+    """
+    The accumulator saved at snapshot_path, or an empty one if there is no
+    usable snapshot (missing, an older format or different frequentNames).
+    """
+    if os.path.exists(snapshot_path):
+        try:
+            with metrics.span('snapshot_load'):
+                accumulator = StatsAccumulator.load(snapshot_path)
+        except ValueError:
+            accumulator = None  # Snapshot from an older version, rebuild it
+        if accumulator is not None and accumulator.frequent_order == frequent_players:
+            return accumulator
+    return StatsAccumulator(frequent_players)
+
+
+def load_accumulator(path, snapshot_path=None):
+    """
+    Stream a game log into an accumulator. With snapshot_path, resume from
+    the saved accumulator and only process games that aren't in it yet; the
+    snapshot is rebuilt from scratch if frequentNames or its format has
+    changed, or a game it holds was edited or deleted from the log.
+    """
+    log = GameLog(path)
+    with metrics.span('parse'):
+        frequent_players = list(dict.fromkeys(log.header().get('frequentNames', [])))
+    # Time spent decoding JSON, separately from the round loop
+    if snapshot_path is None:
+        return accumulate_games(frequent_players, metrics.timed_iter(log, 'parse'))
+
+    return sync_snapshot(snapshot_path, frequent_players, lambda: metrics.timed_iter(log, 'parse'))
+
+
+def sync_snapshot(snapshot_path, frequent_players, read_games):
+    """
+    The accumulator saved at snapshot_path, caught up with the games
+    read_games() yields (every game of the log) and saved again if that
+    changed it. If a game in the snapshot was edited or deleted, it is
+    rebuilt from scratch, calling read_games() a second time.
+    """
+    accumulator = resume_accumulator(snapshot_path, frequent_players)
+    added = accumulator.sync(read_games())
+    if added is None:
+        accumulator = StatsAccumulator(frequent_players)
+        accumulator.extend(read_games())
+        metrics.count('snapshot_rebuilds')
+    if added != 0:
+        with metrics.span('snapshot_save'):
+            accumulator.save(snapshot_path)
+    return accumulator
@@ -0,0 +1,409 @@
+"""
+SQLite storage for game logs, with the stats computed inside the database.
+
+Games are normalized into tables:
+
+    players        id, name, frequent_rank (position in frequentNames, NULL for Guests)
+    games          id, game_key (content hash), date, size (distinct players listed)
+    game_players   game_id, slot, player_id     the game's player list
+    rounds         id, game_id, seq, leader_id, points, won
+    round_members  round_id, slot, player_id    the teammates the leader called
+    scores         game_id, player_id, score, place
+
+Imports run in one transaction with batched executemany calls, and games
+already in the database (same content hash) are skipped, so re-importing
+a log that grew only adds the new games; its frequentNames replace the
+frequent players. accumulate() fills a StatsAccumulator with GROUP BY
+queries, so only per-player totals ever leave the database, whatever its
+size. The database is in WAL mode, so readers (a read-only connection is
+GameStore(path, readonly=True)) see a consistent snapshot while another
+process appends games.
+
+    store = GameStore("games.db")
+    store.import_log("data.json")
+    stats_view(store.accumulate())
+
+    python3 store.py data.json --db games.db      # import, then print the stats
+"""
+import argparse
+import json
+import pathlib
+import sqlite3
+from itertools import chain
+
+from ingest import GameLog
+from instrument import metrics
+from model import load_games
+from stats_core import StatsAccumulator, game_key
+from team_index import TeamIndex
+
+SCHEMA_VERSION = 2
+BATCH_GAMES = 1000  # Games buffered per executemany batch
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    frequent_rank INTEGER
+);
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    game_key TEXT NOT NULL UNIQUE,
+    date TEXT,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS game_players (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    slot INTEGER NOT NULL,
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    PRIMARY KEY (game_id, slot)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rounds (
+    id INTEGER PRIMARY KEY,
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    seq INTEGER NOT NULL,
+    leader_id INTEGER NOT NULL REFERENCES players(id),
+    points INTEGER NOT NULL,
+    won INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS round_members (
+    round_id INTEGER NOT NULL REFERENCES rounds(id),
+    slot INTEGER NOT NULL,
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    PRIMARY KEY (round_id, slot)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS scores (
+    game_id INTEGER NOT NULL REFERENCES games(id),
+    player_id INTEGER NOT NULL REFERENCES players(id),
+    score REAL NOT NULL,
+    place INTEGER NOT NULL,
+    PRIMARY KEY (game_id, player_id)
+) WITHOUT ROWID;
+"""
+# Secondary indexes. A first import into an empty store builds them once at
+# the end, which is cheaper than updating them row by row.
+INDEXES = """
+CREATE INDEX IF NOT EXISTS rounds_game ON rounds (game_id);
+CREATE INDEX IF NOT EXISTS rounds_leader ON rounds (leader_id, points);
+CREATE INDEX IF NOT EXISTS round_members_player ON round_members (player_id);
+CREATE INDEX IF NOT EXISTS game_players_player ON game_players (player_id);
+CREATE INDEX IF NOT EXISTS scores_player ON scores (player_id, place);
+CREATE INDEX IF NOT EXISTS games_size ON games (size);
+"""
+
+# Aggregations behind each StatsAccumulator counter. "frequent" players
+# have a frequent_rank; teammates only count in rounds a frequent player led.
+_LEADER_TOTALS = """
+SELECT p.name, COUNT(*), SUM(r.won)
+FROM rounds r JOIN players p ON p.id = r.leader_id
+WHERE p.frequent_rank IS NOT NULL
+GROUP BY r.leader_id
+"""
+_LEADER_BIDS = """
+SELECT p.name, r.points, COUNT(*), SUM(r.won)
+FROM rounds r JOIN players p ON p.id = r.leader_id
+WHERE p.frequent_rank IS NOT NULL
+GROUP BY r.leader_id, r.points
+"""
+_TEAMMATE_TOTALS = """
+SELECT mp.name, lp.frequent_rank IS NOT NULL AS frequent_led, COUNT(*), SUM(r.won)
+FROM round_members m
+JOIN rounds r ON r.id = m.round_id
+JOIN players mp ON mp.id = m.player_id
+JOIN players lp ON lp.id = r.leader_id
+WHERE mp.frequent_rank IS NOT NULL
+GROUP BY m.player_id, frequent_led
+"""
+# Every (frequent teammate, other teammate) pair in a round, in the order the
+# per-round loop first meets them
+_TEAMMATE_PAIRS = """
+SELECT ap.name, bp.name, COUNT(*)
+FROM round_members a
+JOIN round_members b ON b.round_id = a.round_id AND b.player_id <> a.player_id
+JOIN players ap ON ap.id = a.player_id
+JOIN players bp ON bp.id = b.player_id
+WHERE ap.frequent_rank IS NOT NULL
+GROUP BY a.player_id, b.player_id
+ORDER BY MIN((a.round_id * 1024 + a.slot) * 1024 + b.slot)
+"""
+# Distinct games each frequent player led in, or was called in by a frequent leader
+_GAMES_PLAYED = """
+SELECT p.name, COUNT(*)
+FROM (
+    SELECT r.game_id, r.leader_id AS player_id
+    FROM rounds r JOIN players lp ON lp.id = r.leader_id
+    WHERE lp.frequent_rank IS NOT NULL
+    UNION
+    SELECT r.game_id, m.player_id
+    FROM round_members m
+    JOIN rounds r ON r.id = m.round_id
+    JOIN players lp ON lp.id = r.leader_id
+    JOIN players mp ON mp.id = m.player_id
+    WHERE lp.frequent_rank IS NOT NULL AND mp.frequent_rank IS NOT NULL
+) seats JOIN players p ON p.id = seats.player_id
+GROUP BY seats.player_id
+"""
+_GAMES_LISTED = """
+SELECT p.name, COUNT(*)
+FROM game_players gp JOIN players p ON p.id = gp.player_id
+WHERE p.frequent_rank IS NOT NULL
+GROUP BY gp.player_id
+"""
+_PLACEMENTS = """
+SELECT p.name, s.place, COUNT(*)
+FROM scores s JOIN players p ON p.id = s.player_id
+WHERE p.frequent_rank IS NOT NULL
+GROUP BY s.player_id, s.place
+"""
+# Teams made up entirely of frequent players, as (bitmask, game size), in
+# first-seen order. A player's bit is their frequent_rank; SUM(DISTINCT) of
+# the bits is their OR, since each player has one bit.
+_TEAMS = """
+WITH members AS (
+    SELECT r.id AS round_id, p.frequent_rank AS bit FROM rounds r JOIN players p ON p.id = r.leader_id
+    UNION ALL
+    SELECT m.round_id, p.frequent_rank FROM round_members m JOIN players p ON p.id = m.player_id
+), teams AS (
+    SELECT round_id, SUM(DISTINCT 1 << bit) AS mask
+    FROM members
+    GROUP BY round_id
+    HAVING COUNT(bit) = COUNT(*)
+)
+SELECT t.mask, g.size, COUNT(*), SUM(r.won), SUM(r.points)
+FROM teams t JOIN rounds r ON r.id = t.round_id JOIN games g ON g.id = r.game_id
+GROUP BY t.mask, g.size
+ORDER BY MIN(t.round_id)
+"""
+
+
+class GameStore:
+    """A SQLite database of games, and the stats computed from it."""
+
+    def __init__(self, path, readonly=False):
+        self.path = path
+        if readonly:
+            # As a URI, so a path with ? or # in it still opens the right file
+            uri = f"{pathlib.Path(path).resolve().as_uri()}?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, isolation_level=None)
+        else:
+            # Transactions are managed explicitly (see _transaction)
+            self.conn = sqlite3.connect(path, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA + INDEXES)
+            self._check_version()
+
+    def _check_version(self):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        if row is None:
+            self.conn.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        elif int(row[0]) != SCHEMA_VERSION:
+            raise ValueError(f"Unsupported game store schema version: {row[0]}")
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def header(self):
+        """The log header (frequentNames, scoring rules) saved by the last import."""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'header'").fetchone()
+        return json.loads(row[0]) if row else {}
+
+    def frequent_players(self):
+        return [name for (name,) in self.conn.execute(
+            "SELECT name FROM players WHERE frequent_rank IS NOT NULL ORDER BY frequent_rank")]
+
+    def num_games(self):
+        return self.conn.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    # --- Import ------------------------------------------------------------
+
+    def import_log(self, path):
+        """Import a JSON / NDJSON game log. Returns the number of new games."""
+        return self.import_logs([path])
+
+    def import_logs(self, paths):
+        """
+        Import several game logs in one transaction. Returns the number of
+        new games. The frequent players become the frequentNames of every
+        log, in first-seen order, as for an archive.
+        """
+        logs = [GameLog(path) for path in paths]
+
+        def header():
+            # Read once the games are in: a JSON log may list its keys after pastGames
+            if not logs:
+                return None
+            frequent = {}
+            for log in logs:
+                frequent.update(dict.fromkeys(log.header().get('frequentNames', [])))
+            return dict(logs[-1].header(), frequentNames=list(frequent))
+
+        return self._import(chain.from_iterable(logs), header)
+
+    def import_games(self, games, header=None):
+        """
+        Add games (raw dicts or model.Game records) in one transaction,
+        skipping any already stored. header's frequentNames replace the
+        frequent players, ranked in that order.
+        """
+        return self._import(games, lambda: header)
+
+    def _import(self, games, header):
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # IDs are assigned here rather than by SQLite, so each batch goes out in a few executemany calls
+            self._player_ids = dict(conn.execute("SELECT name, id FROM players"))
+            self._new_players = []
+            ids = [conn.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {table}").fetchone()[0]
+                   for table in ('players', 'games', 'rounds')]
+            self._next_player, next_game, next_round = ids
+            bulk_load = next_game == 1
+            if bulk_load:
+                for (index,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND sql IS NOT NULL").fetchall():
+                    conn.execute(f"DROP INDEX {index}")
+
+            added = 0
+            batch = []
+            for game in load_games(games):
+                batch.append(game)
+                if len(batch) >= BATCH_GAMES:
+                    count, next_game, next_round = self._insert_batch(batch, next_game, next_round)
+                    added += count
+                    batch = []
+            if batch:
+                count, next_game, next_round = self._insert_batch(batch, next_game, next_round)
+                added += count
+            saved_header = header()
+            if saved_header is not None:
+                self._save_header(saved_header)
+            if bulk_load:
+                with metrics.span('store_index'):
+                    for statement in INDEXES.strip().split(";"):
+                        if statement.strip():
+                            conn.execute(statement)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        metrics.count('store_games_imported', added)
+        return added
+
+    def _save_header(self, header):
+        """Store the header and rank the frequent players by its frequentNames, dropping any it no longer lists."""
+        header = {key: value for key, value in header.items() if key != 'pastGames'}
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES ('header', ?)", (json.dumps(header),))
+        self.conn.execute("UPDATE players SET frequent_rank = NULL WHERE frequent_rank IS NOT NULL")
+        self.conn.executemany("INSERT INTO players (name, frequent_rank) VALUES (?, ?) "
+                              "ON CONFLICT (name) DO UPDATE SET frequent_rank = excluded.frequent_rank",
+                              [(name, rank) for rank, name in enumerate(dict.fromkeys(header.get('frequentNames', [])))])
+
+    def _player_id(self, name):
+        player_id = self._player_ids.get(name)
+        if player_id is None:
+            player_id = self._player_ids[name] = self._next_player
+            self._next_player += 1
+            self._new_players.append((player_id, name))
+        return player_id
+
+    def _insert_batch(self, batch, next_game, next_round):
+        """Insert the games of a batch that aren't stored yet, numbering them from next_game / next_round."""
+        keyed = {}
+        for game in batch:
+            keyed.setdefault(game_key(game), game)
+        placeholders = ",".join("?" * len(keyed))
+        stored = {key for (key,) in self.conn.execute(
+            f"SELECT game_key FROM games WHERE game_key IN ({placeholders})", list(keyed))}
+
+        games_rows, listing_rows, round_rows, member_rows, score_rows = [], [], [], [], []
+        for key, game in keyed.items():
+            if key in stored:
+                continue
+            game_id = next_game
+            next_game += 1
+            games_rows.append((game_id, key, game.date, len(set(game.players))))
+            listing_rows.extend((game_id, slot, self._player_id(player)) for slot, player in enumerate(game.players))
+            for seq, rd in enumerate(game.rounds):
+                round_rows.append((next_round, game_id, seq, self._player_id(rd.leader), rd.points, int(rd.result)))
+                member_rows.extend((next_round, slot, self._player_id(tm)) for slot, tm in enumerate(rd.teammates))
+                next_round += 1
+            # Same order as StatsAccumulator: by score, ties in the order they were recorded
+            ranked = sorted(game.scores.items(), key=lambda item: item[1], reverse=True)
+            score_rows.extend((game_id, self._player_id(player), score, place)
+                              for place, (player, score) in enumerate(ranked, 1))
+
+        conn = self.conn
+        conn.executemany("INSERT INTO players (id, name) VALUES (?, ?)", self._new_players)
+        self._new_players = []
+        conn.executemany("INSERT INTO games VALUES (?, ?, ?, ?)", games_rows)
+        conn.executemany("INSERT INTO game_players VALUES (?, ?, ?)", listing_rows)
+        conn.executemany("INSERT INTO rounds VALUES (?, ?, ?, ?, ?, ?)", round_rows)
+        conn.executemany("INSERT INTO round_members VALUES (?, ?, ?)", member_rows)
+        conn.executemany("INSERT INTO scores VALUES (?, ?, ?, ?)", score_rows)
+        return len(games_rows), next_game, next_round
+
+    # --- Aggregation -------------------------------------------------------
+
+    def accumulate(self):
+        """
+        Fill a StatsAccumulator with GROUP BY queries, all read from one
+        snapshot of the database. Its game_keys stay empty: the store itself
+        keeps track of which games it holds.
+        """
+        conn = self.conn
+        conn.execute("BEGIN")
+        try:
+            with metrics.span('store_aggregate'):
+                accumulator = StatsAccumulator(self.frequent_players())
+                if len(accumulator.frequent_order) > 63:
+                    raise ValueError("SQL team masks support at most 63 frequent players")
+                for name, count, wins in conn.execute(_LEADER_TOTALS):
+                    accumulator.leader_count[name] = count
+                    accumulator.leader_wins[name] = wins
+                for name, points, count, wins in conn.execute(_LEADER_BIDS):
+                    accumulator.leader_bids[(name, points)] = count
+                    if wins:
+                        accumulator.leader_bid_wins[(name, points)] = wins
+                for name, frequent_led, count, wins in conn.execute(_TEAMMATE_TOTALS):
+                    if frequent_led:
+                        accumulator.teammate_count[name] = count
+                        accumulator.teammate_wins[name] = wins
+                    else:
+                        accumulator.guest_led_teammate_count[name] = count
+                for player, other, count in conn.execute(_TEAMMATE_PAIRS):
+                    accumulator.teammate_pairs[(player, other)] = count
+                accumulator.games_played.update(dict(conn.execute(_GAMES_PLAYED)))
+                accumulator.games_listed.update(dict(conn.execute(_GAMES_LISTED)))
+                for name, place, count in conn.execute(_PLACEMENTS):
+                    accumulator.placements[(name, place)] = count
+                accumulator.teams = TeamIndex.from_rows(accumulator.frequent_order, conn.execute(_TEAMS))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return accumulator
+
+
+if __name__ == "__main__":
+    from data import print_stats, stats_view
+
+    parser = argparse.ArgumentParser(description="Import game logs into SQLite and print the stats computed there.")
+    parser.add_argument("logs", nargs="*", help="game logs to import first (already stored games are skipped)")
+    parser.add_argument("--db", default="games.db", help="database file (default: games.db)")
+    args = parser.parse_args()
+
+    with GameStore(args.db) as store:
+        if args.logs:
+            added = store.import_logs(args.logs)
+            print(f"Imported {added} new games from {', '.join(args.logs)}")
+        print_stats(stats_view(store.accumulate()))
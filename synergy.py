@@ -0,0 +1,249 @@
+"""
+Player-by-player synergy matrices over a RoundTable.
+
+For every pair of players the matrices count the rounds they were on the
+same bidding team, how many of those bids were made, and how often one
+called the other as leader. Each count is a single bincount over packed
+(player, player) codes, one pass per pair of team slots, so the cost is
+linear in the rounds and the matrices are dense (players x players):
+hundreds of players cost a few MB.
+
+From those counts comes the pair's lift: how much a player's bid win rate
+changes with a given partner, in percentage points over that player's
+win rate across all their team rounds.
+
+    matrix = SynergyMatrix.from_table(table)
+    matrix.pair("Pinkey", "Apurv")       # rounds together, wins, calls, lift both ways
+    matrix.partners("Pinkey", k=3)       # who lifts Pinkey the most
+    matrix.best_pairs(k=5)               # the league's best duos
+    synergy_slide(matrix, frequent)      # heatmap slide
+"""
+import numpy as np
+
+from round_table import NO_PLAYER
+
+MIN_ROUNDS = 5  # Rounds together before a pair's lift is shown
+
+
+class SynergyMatrix:
+    """
+    Pair counts over a list of players, indexed in that order:
+    - together[i, j]:      rounds i and j were on the same bidding team (symmetric)
+    - wins_together[i, j]: of those, bids that were made
+    - calls[i, j]:         rounds leader i called teammate j
+    - call_wins[i, j]:     of those, bids that were made
+    Plus per player team_rounds / team_wins: every round on a bidding team.
+    """
+
+    def __init__(self, players, together, wins_together, calls, call_wins, team_rounds, team_wins):
+        self.players = list(players)
+        self.player_index = {name: i for i, name in enumerate(self.players)}
+        self.together = together
+        self.wins_together = wins_together
+        self.calls = calls
+        self.call_wins = call_wins
+        self.team_rounds = team_rounds
+        self.team_wins = team_wins
+
+    @classmethod
+    def from_table(cls, table, players=None):
+        """Count every pair in a RoundTable, over players (default: everyone in the table)."""
+        names = table.players if players is None else list(dict.fromkeys(players))
+        size = len(names)
+        # Table player ID -> matrix column, NO_PLAYER for players left out. The
+        # extra last entry maps NO_PLAYER padding (index -1) to NO_PLAYER too.
+        column = np.full(table.num_players + 1, NO_PLAYER, dtype=np.int64)
+        ids = [table.player_ids[name] for name in names if name in table.player_ids]
+        column[ids] = [i for i, name in enumerate(names) if name in table.player_ids]
+
+        # Team slots: the leader then the teammates, as matrix columns. A
+        # leader listed as their own teammate, or a teammate listed twice,
+        # is only one seat on the team.
+        team = column[np.column_stack([table.leader, table.mates])]
+        for slot in range(1, team.shape[1]):
+            repeated = (team[:, slot, None] == team[:, :slot]).any(axis=1)
+            team[repeated, slot] = NO_PLAYER
+        won = table.result.astype(np.float64)
+        on_team = team >= 0
+
+        team_rounds = np.zeros(size, dtype=np.int64)
+        team_wins = np.zeros(size, dtype=np.int64)
+        together = np.zeros(size * size, dtype=np.int64)
+        wins_together = np.zeros(size * size, dtype=np.int64)
+        for slot in range(team.shape[1]):
+            rows = on_team[:, slot]
+            team_rounds += np.bincount(team[rows, slot], minlength=size)
+            team_wins += np.bincount(team[rows, slot], won[rows], minlength=size).astype(np.int64)
+            for other in range(slot + 1, team.shape[1]):
+                rows = on_team[:, slot] & on_team[:, other]
+                a, b = team[rows, slot], team[rows, other]
+                for codes in (a * size + b, b * size + a):
+                    together += np.bincount(codes, minlength=size * size)
+                    wins_together += np.bincount(codes, won[rows], minlength=size * size).astype(np.int64)
+
+        calls = np.zeros(size * size, dtype=np.int64)
+        call_wins = np.zeros(size * size, dtype=np.int64)
+        for slot in range(1, team.shape[1]):
+            rows = on_team[:, 0] & on_team[:, slot]
+            codes = team[rows, 0] * size + team[rows, slot]
+            calls += np.bincount(codes, minlength=size * size)
+            call_wins += np.bincount(codes, won[rows], minlength=size * size).astype(np.int64)
+
+        shape = (size, size)
+        return cls(names, together.reshape(shape), wins_together.reshape(shape), calls.reshape(shape),
+                   call_wins.reshape(shape), team_rounds, team_wins)
+
+    @classmethod
+    def from_games(cls, games, players=None):
+        """Count every pair in an iterable of games (e.g. posted games)."""
+        from round_table import RoundTable
+        return cls.from_table(RoundTable.from_games(games, players or []), players)
+
+    def merge(self, other):
+        """Counts over both matrices' games, indexed by the union of their players."""
+        players = list(dict.fromkeys(self.players + other.players))
+        merged = SynergyMatrix(players, *(np.zeros((len(players),) * 2, dtype=np.int64) for _ in range(4)),
+                               np.zeros(len(players), dtype=np.int64), np.zeros(len(players), dtype=np.int64))
+        for source in (self, other):
+            index = np.array([merged.player_index[name] for name in source.players], dtype=np.int64)
+            grid = np.ix_(index, index)
+            merged.together[grid] += source.together
+            merged.wins_together[grid] += source.wins_together
+            merged.calls[grid] += source.calls
+            merged.call_wins[grid] += source.call_wins
+            merged.team_rounds[index] += source.team_rounds
+            merged.team_wins[index] += source.team_wins
+        return merged
+
+    def __len__(self):
+        return len(self.players)
+
+    def index(self, player):
+        try:
+            return self.player_index[player]
+        except KeyError:
+            raise KeyError(f"No player {player}") from None
+
+    # --- Rates -------------------------------------------------------------
+
+    def baseline(self):
+        """Each player's bid win % over all their team rounds (NaN if they never played one)."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 100.0 * self.team_wins / self.team_rounds
+
+    def win_rate(self, min_rounds=1):
+        """Win % of every pair's rounds together, NaN below min_rounds."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rate = 100.0 * self.wins_together / self.together
+        rate[self.together < max(min_rounds, 1)] = np.nan
+        return rate
+
+    def lift(self, min_rounds=MIN_ROUNDS):
+        """
+        lift[i, j]: percentage points player i's win rate gains (or loses)
+        with j on the team, over i's baseline. NaN below min_rounds together.
+        """
+        return self.win_rate(min_rounds) - self.baseline()[:, None]
+
+    def pair_lift(self, min_rounds=MIN_ROUNDS):
+        """The pair's win rate over the average of both players' baselines (symmetric)."""
+        baseline = self.baseline()
+        return self.win_rate(min_rounds) - (baseline[:, None] + baseline[None, :]) / 2
+
+    # --- Queries -----------------------------------------------------------
+
+    def pair(self, a, b, min_rounds=MIN_ROUNDS):
+        """Everything the matrices know about two players."""
+        i, j = self.index(a), self.index(b)
+        lift = self.lift(min_rounds)
+        return {
+            'players': [a, b],
+            'rounds_together': int(self.together[i, j]),
+            'wins_together': int(self.wins_together[i, j]),
+            'win_rate': _number(self.win_rate()[i, j]),
+            'calls': {a: int(self.calls[i, j]), b: int(self.calls[j, i])},
+            'call_wins': {a: int(self.call_wins[i, j]), b: int(self.call_wins[j, i])},
+            'lift': {a: _number(lift[i, j]), b: _number(lift[j, i])},
+        }
+
+    def partners(self, player, min_rounds=MIN_ROUNDS, k=None):
+        """A player's partners by lift, best first, skipping pairs below min_rounds."""
+        i = self.index(player)
+        lift = self.lift(min_rounds)[i]
+        rate = self.win_rate()[i]
+        order = [j for j in np.argsort(-lift, kind='stable').tolist() if j != i and not np.isnan(lift[j])]
+        return [{
+            'player': self.players[j],
+            'rounds_together': int(self.together[i, j]),
+            'win_rate': _number(rate[j]),
+            'lift': _number(lift[j]),
+            'called': int(self.calls[i, j]),
+            'called_by': int(self.calls[j, i]),
+        } for j in order[:k]]
+
+    def best_pairs(self, min_rounds=MIN_ROUNDS, k=10, worst=False):
+        """Pairs by symmetric lift, best first (or worst first), each pair once."""
+        lift = self.pair_lift(min_rounds)
+        rows, cols = np.triu_indices(len(self), k=1)
+        values = lift[rows, cols]
+        keep = ~np.isnan(values)
+        rows, cols, values = rows[keep], cols[keep], values[keep]
+        order = np.argsort(values if worst else -values, kind='stable')[:k]
+        rate = self.win_rate()
+        return [{
+            'players': [self.players[rows[n]], self.players[cols[n]]],
+            'rounds_together': int(self.together[rows[n], cols[n]]),
+            'win_rate': _number(rate[rows[n], cols[n]]),
+            'lift': _number(values[n]),
+        } for n in order.tolist()]
+
+    def heatmap(self, players=None, metric='lift', min_rounds=MIN_ROUNDS):
+        """
+        Heatmap-ready rows for players (default: everyone): values[r][c] is
+        metric for row player r with column player c ('lift', 'win_rate',
+        'together' or 'calls'), None where there is too little data.
+        """
+        players = self.players if players is None else [player for player in players if player in self.player_index]
+        index = np.array([self.player_index[player] for player in players], dtype=np.int64)
+        values = {
+            'lift': lambda: self.lift(min_rounds),
+            'win_rate': lambda: self.win_rate(min_rounds),
+            'together': lambda: self.together.astype(np.float64),
+            'calls': lambda: self.calls.astype(np.float64),
+        }
+        if metric not in values:
+            raise ValueError(f"Unknown synergy metric {metric}, expected one of {', '.join(values)}")
+        grid = np.ix_(index, index)
+        matrix = values[metric]()[grid]
+        np.fill_diagonal(matrix, np.nan)
+        return {
+            'players': players,
+            'metric': metric,
+            'values': [[_number(v) for v in row] for row in matrix.tolist()],
+            'rounds': self.together[grid].tolist(),
+        }
+
+
+def _number(value):
+    value = float(value)
+    if np.isnan(value):
+        return None
+    return round(value, 1)
+
+
+def synergy_slide(matrix, players=None, min_rounds=MIN_ROUNDS, title='Chemistry Check'):
+    """
+    A "heatmap" slide of pair lift: each row player's win % with each column
+    player, over their own average. Cells below min_rounds together are empty.
+    """
+    heatmap = matrix.heatmap(players, 'lift', min_rounds)
+    return {
+        'type': 'heatmap',
+        'title': title,
+        'description': f"Win % with each partner vs. their own average (min {min_rounds} rounds together)",
+        'players': heatmap['players'],
+        'values': heatmap['values'],
+        'rounds': heatmap['rounds'],
+        'unit': 'pts',
+        'theme': 'theme-4',
+    }
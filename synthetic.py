@@ -0,0 +1,118 @@
+"""
+Seeded generator of synthetic Kali Teeri game logs, for benchmarks.
+
+Games look like the app's export: a frequentNames list, the scoring rules
+and pastGames newest first, each with date, players, rounds and final
+scores worked out from the rounds.
+"""
+import json
+import random
+from datetime import datetime, timedelta, timezone
+
+PLAYER_NAMES = [
+    "Yogesh", "Pinkey", "Apurv", "Jesal", "Paresh", "Hiral", "Samir", "Mital",
+    "Rajen", "Reena", "Soniya", "Rakesh", "Nita", "Kiran", "Bhavna", "Dipak",
+]
+TEAMMATE_WEIGHTS = {1: 23, 2: 69, 3: 8}  # share of rounds by number of teammates
+BID_POINTS = list(range(150, 285, 5))
+
+
+def player_names(num_players):
+    """Distinct player names, numbering repeats once the name list runs out."""
+    names = []
+    for i in range(num_players):
+        repeat, base = divmod(i, len(PLAYER_NAMES))
+        names.append(PLAYER_NAMES[base] + (str(repeat + 1) if repeat else ""))
+    return names
+
+
+def score_game(players, rounds):
+    """
+    Final scores under the app's default rules (leaderWinPoints "2x",
+    leaderLosePoints -1): a made bid pays the leader double and each
+    teammate the bid, a failed bid costs the leader the bid and pays it to
+    every opponent.
+    """
+    scores = {player: 0 for player in players}
+    for rd in rounds:
+        points = rd["points"]
+        if rd["result"]:
+            scores[rd["leader"]] += 2 * points
+            for tm in rd["teammates"]:
+                scores[tm] += points
+        else:
+            scores[rd["leader"]] -= points
+            team = {rd["leader"], *rd["teammates"]}
+            for player in players:
+                if player not in team:
+                    scores[player] += points
+    return scores
+
+
+def generate_games(num_games, num_players=10, guests=4, rounds_per_game=(6, 10), seed=0,
+                   start=datetime(2025, 1, 1, tzinfo=timezone.utc)):
+    """
+    Yield num_games synthetic games, newest first like the app's export.
+    Each game seats 6 to num_players frequent players plus up to two guests
+    drawn from a pool of `guests` names. Higher bids are harder to make.
+    """
+    rng = random.Random(seed)
+    frequent = player_names(num_players)
+    guest_pool = [f"Guest {i + 1}" for i in range(guests)]
+    sizes, weights = zip(*TEAMMATE_WEIGHTS.items())
+
+    for game_idx in range(num_games):
+        seated = rng.sample(frequent, rng.randint(min(6, num_players), num_players))
+        if guest_pool:
+            seated += rng.sample(guest_pool, rng.randint(0, min(2, len(guest_pool))))
+
+        rounds = []
+        for _ in range(rng.randint(*rounds_per_game)):
+            leader = rng.choice(seated)
+            num_teammates = min(rng.choices(sizes, weights)[0], len(seated) - 1)
+            others = [player for player in seated if player != leader]
+            points = rng.choice(BID_POINTS)
+            rounds.append({
+                "leader": leader,
+                "teammates": rng.sample(others, num_teammates),
+                "points": points,
+                "result": rng.random() < 0.9 - (points - 150) / 250,
+            })
+
+        date = start + timedelta(days=(num_games - 1 - game_idx) * 3, minutes=rng.randint(0, 600))
+        yield {
+            "scores": score_game(seated, rounds),
+            "rounds": rounds,
+            "players": seated,
+            "date": date.isoformat(timespec="milliseconds").replace("+00:00", "Z"),
+        }
+
+
+def generate_log(num_games, num_players=10, **kwargs):
+    """A whole synthetic game log as a dict, like json.load of games.json."""
+    return {
+        "frequentNames": player_names(num_players),
+        "leaderLosePoints": -1,
+        "leaderWinPoints": "2x",
+        "pastGames": list(generate_games(num_games, num_players, **kwargs)),
+    }
+
+
+def write_log(path, num_games, num_players=10, **kwargs):
+    """
+    Stream a synthetic log straight to disk without holding it in memory.
+    Paths ending in .ndjson / .jsonl get a header line and one game per line,
+    anything else gets the app's JSON layout.
+    """
+    header = {"frequentNames": player_names(num_players), "leaderLosePoints": -1, "leaderWinPoints": "2x"}
+    games = generate_games(num_games, num_players, **kwargs)
+    with open(path, "w", encoding="utf-8") as f:
+        if path.endswith((".ndjson", ".jsonl")):
+            f.write(json.dumps(header) + "\n")
+            for game in games:
+                f.write(json.dumps(game) + "\n")
+            return
+        f.write(json.dumps(header)[:-1] + ', "pastGames": [')
+        for game_idx, game in enumerate(games):
+            f.write((",\n" if game_idx else "\n") + json.dumps(game))
+        f.write("\n]}\n")
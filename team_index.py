@@ -0,0 +1,150 @@
+"""
+Bitmask-based index of team combinations.
+
+Each frequent player gets a bit position, so a team is a single int and
+checking "is everyone on this team a frequent player" is one dict lookup
+per member. Leaderboards are pulled out with heap selection instead of
+sorting every team.
+"""
+import heapq
+from itertools import combinations
+
+# Metrics a leaderboard can be ranked by, computed from [rounds, wins, points].
+# Rates are rounded the same way the reports display them, so ties between
+# displayed values fall through to the next metric.
+METRICS = {
+    'rounds': lambda v: v[0],
+    'wins': lambda v: v[1],
+    'win_rate': lambda v: round(v[1] / v[0] * 100, 1) if v[0] > 0 else 0,
+    'avg_points': lambda v: round(v[2] / v[0], 1) if v[0] > 0 else 0,
+}
+
+
+class TeamIndex:
+    """
+    Rounds, wins and bid points per team of frequent players.
+    Teams are stored as (bitmask, game size) so views can filter on how many
+    players were at the table.
+    """
+
+    def __init__(self, players):
+        self.players = list(players)
+        self.bits = {player: 1 << i for i, player in enumerate(self.players)}
+        # Key: (mask, game_size), Value: [rounds, wins, points], in first-seen order
+        self.teams = {}
+
+    def mask(self, leader, teammates):
+        """Bitmask for a round's team, or None if anyone isn't a frequent player."""
+        bits = self.bits
+        mask = bits.get(leader)
+        if mask is None:
+            return None
+        for tm in teammates:
+            bit = bits.get(tm)
+            if bit is None:
+                return None
+            mask |= bit
+        return mask
+
+    def add(self, mask, game_size, points, wins, rounds=1):
+        """Record rounds played by the team, with their wins and total bid points."""
+        entry = self.teams.get((mask, game_size))
+        if entry is None:
+            entry = self.teams[(mask, game_size)] = [0, 0, 0]
+        entry[0] += rounds
+        entry[1] += wins
+        entry[2] += points
+
+    def names(self, mask):
+        """Alphabetically sorted tuple of the players in a mask."""
+        return tuple(sorted(player for player, bit in self.bits.items() if mask & bit))
+
+    def stats(self, size=None, subset_size=None, min_rounds=1, min_game_size=0):
+        """
+        Aggregate rounds/wins/points per team mask, in first-seen order.
+        With size, only teams of exactly that many players are kept. With
+        subset_size, every subset of that many players within a team is
+        credited with the team's rounds (e.g. subset_size=2 for pairs that
+        played on the same side in teams of any size).
+        """
+        totals = {}
+        for (mask, game_size), (rounds, wins, points) in self.teams.items():
+            if game_size < min_game_size:
+                continue
+            team_size = bin(mask).count('1')
+            if subset_size is None:
+                if size is not None and team_size != size:
+                    continue
+                keys = (mask,)
+            else:
+                if team_size < subset_size:
+                    continue
+                member_bits = [1 << i for i in range(mask.bit_length()) if mask >> i & 1]
+                keys = (sum(subset) for subset in combinations(member_bits, subset_size))
+            for key in keys:
+                entry = totals.get(key)
+                if entry is None:
+                    entry = totals[key] = [0, 0, 0]
+                entry[0] += rounds
+                entry[1] += wins
+                entry[2] += points
+        return {mask: vals for mask, vals in totals.items() if vals[0] >= min_rounds}
+
+    def top(self, k, by='wins', size=None, subset_size=None, min_rounds=1, min_game_size=0, tie_break='first_seen'):
+        """
+        Top k teams ranked by one metric or a tuple of metrics (see METRICS).
+        Ties keep first-seen order, or go alphabetically with tie_break='name'.
+        Pass k=None for every team. Returns a list of dicts with players,
+        rounds, wins, points, win_rate and avg_points.
+        """
+        metrics = (by,) if isinstance(by, str) else tuple(by)
+        rows = self.stats(size, subset_size, min_rounds, min_game_size).items()
+
+        # Rank (mask, vals) rows and only build output entries for the winners
+        if tie_break == 'name':
+            # Negating numbers lets names sort ascending within the same heap key
+            key = lambda row: tuple(-METRICS[m](row[1]) for m in metrics) + (self.names(row[0]),)
+            ranked = heapq.nsmallest(k, rows, key=key) if k is not None else sorted(rows, key=key)
+        else:
+            key = lambda row: tuple(METRICS[m](row[1]) for m in metrics)
+            ranked = heapq.nlargest(k, rows, key=key) if k is not None else sorted(rows, key=key, reverse=True)
+        return [self._entry(mask, vals) for mask, vals in ranked]
+
+    def _entry(self, mask, vals):
+        rounds, wins, points = vals
+        return {
+            'players': self.names(mask),
+            'rounds': rounds,
+            'wins': wins,
+            'points': points,
+            'win_rate': METRICS['win_rate'](vals),
+            'avg_points': METRICS['avg_points'](vals),
+        }
+
+    def add_player(self, player):
+        """Give a new player the next free bit; existing masks are unaffected."""
+        if player not in self.bits:
+            self.bits[player] = 1 << len(self.players)
+            self.players.append(player)
+
+    def merge(self, other):
+        """Add another index's teams into this one, remapping bits by player name."""
+        for player in other.players:
+            self.add_player(player)
+        same_bits = other.players == self.players[:len(other.players)]
+        for (mask, game_size), (rounds, wins, points) in other.teams.items():
+            if not same_bits:
+                mask = sum(self.bits[player] for player in other.names(mask))
+            self.add(mask, game_size, points, wins, rounds=rounds)
+        return self
+
+    def to_rows(self):
+        """JSON-friendly rows of [mask, game_size, rounds, wins, points]."""
+        return [[mask, game_size] + vals for (mask, game_size), vals in self.teams.items()]
+
+    @classmethod
+    def from_rows(cls, players, rows):
+        index = cls(players)
+        for mask, game_size, rounds, wins, points in rows:
+            index.teams[(mask, game_size)] = [rounds, wins, points]
+        return index
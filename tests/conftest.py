@@ -0,0 +1,33 @@
+import json
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+GAMES_FILE = os.path.join(ROOT, "games.json")
+
+
+@pytest.fixture
+def log_data():
+    """games.json, loaded fresh for every test so tests can edit it."""
+    with open(GAMES_FILE, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    return str(path)
+
+
+def write_ndjson(path, data, header=True):
+    """Write a log as NDJSON: the header line (everything but pastGames), then one game per line."""
+    with open(path, "w", encoding="utf-8") as f:
+        if header:
+            f.write(json.dumps({key: value for key, value in data.items() if key != "pastGames"}) + "\n")
+        for game in data["pastGames"]:
+            f.write(json.dumps(game) + "\n")
+    return str(path)
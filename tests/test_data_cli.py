@@ -0,0 +1,27 @@
+"""data.py's command line: extras that need one log file refuse anything else up front."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT, write_json
+
+
+def _run(args, cwd):
+    return subprocess.run([sys.executable, os.path.join(ROOT, "data.py"), *args],
+                          cwd=cwd, capture_output=True, text=True)
+
+
+@pytest.mark.parametrize("flag", [["--trend-window", "10"], ["--synergy"], ["--ratings"]])
+@pytest.mark.parametrize("logs", ["several", "directory", "glob"])
+def test_single_log_extras_refuse_archives(log_data, tmp_path, flag, logs):
+    seasons = tmp_path / "seasons"
+    seasons.mkdir()
+    first = write_json(seasons / "a.json", log_data)
+    second = write_json(seasons / "b.json", log_data)
+    paths = {"several": [first, second], "directory": [str(seasons)], "glob": [str(seasons / "*.json")]}[logs]
+    result = _run(paths + flag, tmp_path)
+    assert result.returncode == 2
+    assert f"{flag[0]} needs a single game log file" in result.stderr
+    assert not (tmp_path / "wrapped_data.js").exists()
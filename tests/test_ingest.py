@@ -0,0 +1,116 @@
+"""Reading game logs: GameLog and watch.LogTail."""
+import json
+
+import pytest
+
+from conftest import write_json, write_ndjson
+from data import calculate_stats, stats_view
+from ingest import GameLog
+from stats_core import StatsAccumulator
+from watch import LogTail
+
+
+def test_chunked_json_matches_json_load(log_data, tmp_path):
+    path = write_json(tmp_path / "data.json", log_data)
+    log = GameLog(path, chunk_size=7)
+    assert list(log) == log_data["pastGames"]
+    assert log.header() == {key: value for key, value in log_data.items() if key != "pastGames"}
+
+
+def test_ndjson_header_is_first_line_only(log_data, tmp_path):
+    path = write_ndjson(tmp_path / "data.ndjson", log_data)
+    log = GameLog(path)
+    assert list(log) == log_data["pastGames"]
+    assert log.header()["frequentNames"] == log_data["frequentNames"]
+
+
+def test_ndjson_game_without_rounds_is_rejected(log_data, tmp_path):
+    game = dict(log_data["pastGames"][0])
+    del game["rounds"]
+    log_data["pastGames"].insert(2, game)
+    path = write_ndjson(tmp_path / "data.ndjson", log_data)
+    with pytest.raises(ValueError, match="record 4 has no rounds"):
+        list(GameLog(path))
+
+
+def test_ndjson_second_header_is_rejected(log_data, tmp_path):
+    path = write_ndjson(tmp_path / "data.ndjson", log_data)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"frequentNames": ["Someone"]}) + "\n")
+    with pytest.raises(ValueError, match="only the first record"):
+        list(GameLog(path))
+    with pytest.raises(ValueError, match="only the first record"):
+        LogTail(path).load()
+
+
+def test_ndjson_first_line_must_be_header_or_game(log_data, tmp_path):
+    path = tmp_path / "data.ndjson"
+    path.write_text(json.dumps({"note": "exported"}) + "\n" + json.dumps(log_data["pastGames"][0]) + "\n")
+    with pytest.raises(ValueError, match="neither rounds nor any header key"):
+        list(GameLog(str(path)))
+
+
+def _tail_stats(tail, games):
+    accumulator = StatsAccumulator(tail.header.get("frequentNames", []))
+    accumulator.extend(games)
+    return accumulator
+
+
+def test_log_tail_prepended_games_match_calculate_stats(log_data, tmp_path):
+    partial = dict(log_data, pastGames=log_data["pastGames"][5:])
+    path = write_json(tmp_path / "data.json", partial)
+    tail = LogTail(path)
+    accumulator = _tail_stats(tail, tail.load())
+    assert stats_view(accumulator) == calculate_stats(partial)
+
+    write_json(path, log_data)
+    added = tail.update()
+    assert added == log_data["pastGames"][:5]
+    accumulator.extend(added)
+    assert stats_view(accumulator) == calculate_stats(log_data)
+
+
+def test_log_tail_ndjson_append_and_edit(log_data, tmp_path):
+    partial = dict(log_data, pastGames=log_data["pastGames"][:-5])
+    path = write_ndjson(tmp_path / "data.ndjson", partial)
+    tail = LogTail(path)
+    accumulator = _tail_stats(tail, tail.load())
+
+    write_ndjson(path, log_data)
+    accumulator.extend(tail.update())
+    assert stats_view(accumulator) == calculate_stats(log_data)
+
+    # An edited game can't be patched in, so update() asks for a reload
+    log_data["pastGames"][0]["rounds"][0]["result"] = not log_data["pastGames"][0]["rounds"][0]["result"]
+    write_ndjson(path, log_data)
+    assert tail.update() is None
+    assert stats_view(_tail_stats(tail, tail.load())) == calculate_stats(log_data)
+
+
+def test_log_tail_rejects_a_line_without_rounds(log_data, tmp_path):
+    path = write_ndjson(tmp_path / "data.ndjson", log_data)
+    tail = LogTail(path)
+    tail.load()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"players": ["A"], "scores": {}}) + "\n")
+    assert tail.update() is None
+    with pytest.raises(ValueError, match="has no rounds"):
+        tail.load()
+
+
+def test_log_tail_counts_a_repeated_game(log_data, tmp_path):
+    path = write_ndjson(tmp_path / "data.ndjson", log_data)
+    tail = LogTail(path)
+    accumulator = _tail_stats(tail, tail.load())
+
+    log_data["pastGames"].append(log_data["pastGames"][-1])
+    write_ndjson(path, log_data)
+    added = tail.update()
+    assert added == [log_data["pastGames"][-1]]
+    accumulator.extend(added)
+    assert stats_view(accumulator) == calculate_stats(log_data)
+
+    # Dropping one of the two copies is a deletion
+    del log_data["pastGames"][-1]
+    write_ndjson(path, log_data)
+    assert tail.update() is None
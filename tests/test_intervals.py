@@ -0,0 +1,60 @@
+"""Confidence intervals (intervals.py) around the rates calculate_stats reports."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT, write_json
+from data import calculate_stats
+from intervals import RATES, bootstrap_intervals, wilson_interval, wilson_intervals
+from stats_core import StatsAccumulator
+
+
+def _contains(interval, value):
+    low, high = interval
+    return low <= value <= high
+
+
+def test_wilson_interval():
+    assert wilson_interval(4, 5) == [37.6, 96.4]
+    assert wilson_interval(160, 200) == [73.9, 85.0]
+    assert wilson_interval(0, 0) is None
+
+
+def test_wilson_intervals_contain_the_rates(log_data):
+    accumulator = StatsAccumulator(log_data["frequentNames"])
+    accumulator.extend(log_data["pastGames"])
+    player_stats = calculate_stats(log_data)["player_stats"]
+    intervals = wilson_intervals(accumulator)
+    assert list(intervals) == list(player_stats)
+    for player, rates in intervals.items():
+        for metric, interval in rates.items():
+            if interval is not None:
+                assert _contains(interval, player_stats[player][metric])
+
+
+@pytest.mark.parametrize("unit", ["games", "rounds"])
+def test_bootstrap_intervals_contain_the_rates(log_data, unit):
+    pytest.importorskip("numpy")
+    from round_table import RoundTable
+    table = RoundTable.from_games(log_data["pastGames"], log_data["frequentNames"])
+    player_stats = calculate_stats(log_data)["player_stats"]
+    intervals = bootstrap_intervals(table, replicates=2_000, unit=unit)
+    assert intervals == bootstrap_intervals(table, replicates=2_000, unit=unit)  # Seeded
+    assert set(intervals) == set(player_stats)
+    for player, rates in intervals.items():
+        assert set(rates) == set(RATES)
+        for metric, interval in rates.items():
+            if interval is not None:
+                assert _contains(interval, player_stats[player][metric])
+
+
+def test_bootstrap_refuses_several_logs(log_data, tmp_path):
+    first = write_json(tmp_path / "a.json", log_data)
+    second = write_json(tmp_path / "b.json", log_data)
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "data.py"), first, second, "--intervals", "bootstrap"],
+                            cwd=tmp_path, capture_output=True, text=True)
+    assert result.returncode == 2
+    assert "--intervals bootstrap needs a single game log file" in result.stderr
+    assert not (tmp_path / "wrapped_data.js").exists()
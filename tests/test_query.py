@@ -0,0 +1,30 @@
+"""The query layer (query.py) against calculate_stats on the same games."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from conftest import ROOT, write_json
+from data import calculate_stats
+from query import QueryIndex
+
+
+def test_player_summaries_match_calculate_stats(log_data, tmp_path):
+    index = QueryIndex.from_log(write_json(tmp_path / "data.json", log_data))
+    for player, stats in calculate_stats(log_data)["player_stats"].items():
+        summary = index.player_summary(player, frequent_leader=True)
+        assert summary["leader"]["win_rate"] == stats["leader_conv_rate"]
+        assert summary["teammate"]["rounds"] == stats["teammate_count"]
+        assert summary["teammate"]["win_rate"] == stats["teammate_win_rate"]
+
+
+def test_cli_writes_no_cache_next_to_the_log(log_data, tmp_path):
+    path = write_json(tmp_path / "data.json", log_data)
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "query.py"), path, "--min-points", "200"],
+                            cwd=tmp_path, env=env, check=True, capture_output=True, text=True)
+    assert "win_rate" in result.stdout
+    assert not any(name.endswith(".ktwc") for name in os.listdir(tmp_path))
@@ -0,0 +1,65 @@
+"""Elo ratings (ratings.py): checkpoints must give the same ratings as one full pass."""
+import copy
+
+import ratings
+from conftest import write_json
+from ratings import RatingEngine, load_ratings, ratings_slide
+
+
+def _oldest_first(data):
+    return dict(data, pastGames=sorted(data["pastGames"], key=lambda game: game["date"]))
+
+
+def _full(path):
+    return load_ratings(path).ratings
+
+
+def test_appended_games_extend_the_checkpoint(log_data, tmp_path, monkeypatch):
+    data = _oldest_first(log_data)
+    checkpoint = str(tmp_path / "ratings.json")
+    path = write_json(tmp_path / "data.json", dict(data, pastGames=data["pastGames"][:60]))
+    load_ratings(path, checkpoint)
+
+    write_json(path, data)
+    real_key = ratings.game_key
+    hashed = []
+
+    def counting_key(game):
+        hashed.append(game)
+        return real_key(game)
+
+    monkeypatch.setattr(ratings, "game_key", counting_key)
+    engine = load_ratings(path, checkpoint)
+    # Only the ends of the rated run and of the log are hashed, not every game
+    assert len(hashed) <= 4
+    assert engine.ratings == _full(path)
+    assert engine.num_games == len(data["pastGames"])
+
+
+def test_prepended_games_extend_the_checkpoint(log_data, tmp_path):
+    data = _oldest_first(log_data)
+    newest_first = dict(data, pastGames=data["pastGames"][::-1])
+    checkpoint = str(tmp_path / "ratings.json")
+    path = write_json(tmp_path / "data.json", dict(newest_first, pastGames=newest_first["pastGames"][8:]))
+    load_ratings(path, checkpoint)
+
+    write_json(path, newest_first)
+    assert load_ratings(path, checkpoint).ratings == _full(path)
+
+
+def test_edited_rated_game_replays_the_ratings(log_data, tmp_path):
+    checkpoint = str(tmp_path / "ratings.json")
+    path = write_json(tmp_path / "data.json", log_data)
+    load_ratings(path, checkpoint)
+
+    edited = copy.deepcopy(log_data)
+    edited["pastGames"][-1]["rounds"][0]["result"] = not edited["pastGames"][-1]["rounds"][0]["result"]
+    write_json(path, edited)
+    assert load_ratings(path, checkpoint).ratings == _full(path)
+
+
+def test_equal_ratings_share_a_rank():
+    engine = RatingEngine()
+    engine.ratings = {"A": 1600.0, "B": 1550.04, "C": 1550.0, "D": 1500.0}
+    assert [row["rank"] for row in engine.leaderboard()] == [1, 2, 2, 4]
+    assert [item["rank"] for item in ratings_slide(engine)["items"]] == [1, 2, 2, 4]
@@ -0,0 +1,50 @@
+"""Score replay (replay.py) and the --validate-scores gate."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from conftest import ROOT, write_json
+from replay import validate
+from round_table import RoundTable
+
+
+def _table(data):
+    return RoundTable.from_games(data["pastGames"], data["frequentNames"])
+
+
+def test_recorded_scores_match_the_rounds(log_data):
+    assert validate(_table(log_data), log_data) == []
+
+
+def test_a_wrong_score_is_reported(log_data):
+    game = log_data["pastGames"][4]
+    player = next(iter(game["scores"]))
+    game["scores"][player] += 50
+    mismatches = validate(_table(log_data), log_data)
+    assert [entry["game"] for entry in mismatches] == [4]
+    assert player in [seat["player"] for seat in mismatches[0]["players"]]
+
+
+def _run_data(tmp_path, *args):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.run([sys.executable, os.path.join(ROOT, "data.py"), *args],
+                          cwd=tmp_path, env=env, capture_output=True, text=True)
+
+
+def test_validate_scores_writes_no_cache_next_to_the_log(log_data, tmp_path):
+    path = write_json(tmp_path / "data.json", log_data)
+    assert _run_data(tmp_path, path, "--validate-scores").returncode == 0
+    assert not any(name.endswith(".ktwc") for name in os.listdir(tmp_path))
+
+
+def test_validate_scores_blocks_the_deck_on_a_mismatch(log_data, tmp_path):
+    game = log_data["pastGames"][0]
+    game["scores"][next(iter(game["scores"]))] += 50
+    path = write_json(tmp_path / "data.json", log_data)
+    result = _run_data(tmp_path, path, "--validate-scores")
+    assert result.returncode != 0
+    assert not (tmp_path / "wrapped_data.js").exists()
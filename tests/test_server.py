@@ -0,0 +1,138 @@
+"""The HTTP service (server.py), over a real socket."""
+import asyncio
+import copy
+import http.client
+import json
+import os
+import socket
+import threading
+
+import pytest
+
+from conftest import write_json
+from data import calculate_stats
+from server import GZIP_MIN_SIZE, StatsServer, StatsService
+
+
+@pytest.fixture
+def served(log_data, tmp_path):
+    """A StatsService for games.json with a snapshot, listening on a free port."""
+    service = StatsService(write_json(tmp_path / "data.json", log_data), str(tmp_path / "snapshot.json"))
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(asyncio.start_server(StatsServer(service).handle, "127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield service, server.sockets[0].getsockname()[1]
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    server.close()
+    # Let closed connections finish tearing down before the loop goes away
+    loop.run_until_complete(asyncio.sleep(0.05))
+    loop.close()
+
+
+def _request(port, method, path, body=None, headers=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.request(method, path, body=body, headers=headers or {})
+    response = connection.getresponse()
+    data = response.read()
+    connection.close()
+    return response, data
+
+
+def _new_game(log_data):
+    game = copy.deepcopy(log_data["pastGames"][0])
+    game["date"] = "2030-01-01T20:00:00.000Z"
+    return game
+
+
+def test_stats_match_calculate_stats(served, log_data):
+    _, port = served
+    response, data = _request(port, "GET", "/api/stats")
+    assert response.status == 200
+    assert json.loads(data) == json.loads(json.dumps(calculate_stats(log_data)))
+
+
+def test_posted_games_are_counted_once_and_survive_a_restart(served, log_data, tmp_path):
+    service, port = served
+    game = _new_game(log_data)
+    response, data = _request(port, "POST", "/api/games", json.dumps(game))
+    assert response.status == 201 and json.loads(data)["added"] == 1
+    response, data = _request(port, "POST", "/api/games", json.dumps(game))
+    assert json.loads(data)["added"] == 0
+
+    expected = json.loads(json.dumps(calculate_stats(dict(log_data, pastGames=[game] + log_data["pastGames"]))))
+    assert json.loads(_request(port, "GET", "/api/stats")[1]) == expected
+    restarted = StatsService(service.log_path, service.snapshot_path)
+    assert json.loads(json.dumps(restarted._state[0])) == expected
+
+
+def test_etags_revalidate_and_differ_per_encoding(served):
+    _, port = served
+    plain, data = _request(port, "GET", "/api/stats")
+    assert len(data) >= GZIP_MIN_SIZE
+    gzipped, _ = _request(port, "GET", "/api/stats", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.getheader("Content-Encoding") == "gzip"
+    assert gzipped.getheader("ETag") != plain.getheader("ETag")
+
+    response, data = _request(port, "GET", "/api/stats", headers={"If-None-Match": plain.getheader("ETag")})
+    assert response.status == 304 and data == b""
+    response, _ = _request(port, "GET", "/api/stats",
+                           headers={"If-None-Match": plain.getheader("ETag"), "Accept-Encoding": "gzip"})
+    assert response.status == 200
+
+
+def test_bad_game_is_rejected_with_400(served, log_data):
+    game = _new_game(log_data)
+    del game["rounds"][0]["leader"]
+    response, data = _request(served[1], "POST", "/api/games", json.dumps(game))
+    assert response.status == 400
+    assert "missing leader" in json.loads(data)["error"]
+
+
+def test_too_many_teammates_is_rejected_and_changes_nothing(served, log_data):
+    service, port = served
+    game = _new_game(log_data)
+    game["rounds"][0]["teammates"] = ["A", "B", "C", "D", "E"]
+    version, games = service.version, service.accumulator.num_games()
+    response, data = _request(port, "POST", "/api/games", json.dumps(game))
+    assert response.status == 400
+    assert "at most 4 teammates" in json.loads(data)["error"]
+    # Straight to add_games, past the request validation: still all or nothing
+    with pytest.raises(ValueError):
+        service.add_games([_new_game(log_data), game])
+    assert (service.version, service.accumulator.num_games()) == (version, games)
+    assert not os.path.exists(service.posted_path)
+
+
+def test_synergy_after_a_restart_includes_posted_games(served, log_data):
+    pytest.importorskip("numpy")
+    from synergy import SynergyMatrix
+    service, port = served
+    game = _new_game(log_data)
+    _request(port, "POST", "/api/games", json.dumps(game))
+    expected = SynergyMatrix.from_games([game] + log_data["pastGames"])
+    for synergy in (service.synergy, StatsService(service.log_path, service.snapshot_path).synergy):
+        assert synergy.players == expected.players
+        assert (synergy.together == expected.together).all()
+        assert (synergy.wins_together == expected.wins_together).all()
+
+
+def test_unexpected_errors_answer_500(served, monkeypatch):
+    service, port = served
+
+    def broken(path, query):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(service, "get", broken)
+    response, data = _request(port, "GET", "/api/stats")
+    assert response.status == 500
+    assert json.loads(data) == {"error": "Internal server error"}
+
+
+def test_short_body_answers_400(served):
+    with socket.create_connection(("127.0.0.1", served[1]), timeout=10) as sock:
+        sock.sendall(b"POST /api/games HTTP/1.1\r\nHost: x\r\nContent-Length: 100\r\n\r\n{}")
+        sock.shutdown(socket.SHUT_WR)
+        reply = sock.recv(4096)
+    assert reply.startswith(b"HTTP/1.1 400")
@@ -0,0 +1,161 @@
+"""Every way of computing the stats must agree with data.calculate_stats."""
+import copy
+
+import pytest
+
+import chat
+from archive import accumulate_archive
+from conftest import write_json, write_ndjson
+from data import calculate_stats, calculate_stats_from_file, calculate_stats_incremental, stats_view
+from model import Game, GameLogError
+from stats_core import StatsAccumulator, game_key
+
+
+def test_streaming_matches_calculate_stats(log_data, tmp_path):
+    path = write_json(tmp_path / "data.json", log_data)
+    assert calculate_stats_from_file(path) == calculate_stats(log_data)
+
+
+def test_ndjson_matches_calculate_stats(log_data, tmp_path):
+    path = write_ndjson(tmp_path / "data.ndjson", log_data)
+    assert calculate_stats_from_file(path) == calculate_stats(log_data)
+
+
+def test_incremental_matches_full_rebuild(log_data, tmp_path):
+    snapshot = str(tmp_path / "snapshot.json")
+    partial = dict(log_data, pastGames=log_data["pastGames"][10:])
+    path = write_json(tmp_path / "data.json", partial)
+    assert calculate_stats_incremental(path, snapshot) == calculate_stats(partial)
+
+    # New games at the front, as the app adds them
+    write_json(tmp_path / "data.json", log_data)
+    assert calculate_stats_incremental(path, snapshot) == calculate_stats(log_data)
+    # Nothing new: the snapshot alone gives the same answer
+    assert calculate_stats_incremental(path, snapshot) == calculate_stats(log_data)
+
+
+def test_snapshot_round_trip(log_data, tmp_path):
+    accumulator = StatsAccumulator(log_data["frequentNames"])
+    accumulator.extend(log_data["pastGames"])
+    accumulator.save(str(tmp_path / "snapshot.json"))
+    assert stats_view(StatsAccumulator.load(str(tmp_path / "snapshot.json"))) == calculate_stats(log_data)
+
+
+def test_chat_report_matches_streaming(log_data, tmp_path):
+    from ingest import GameLog
+    path = write_json(tmp_path / "data.json", log_data)
+    streamed = chat.compute_leader_stats_from_games(log_data["frequentNames"], GameLog(path))
+    assert streamed == chat.compute_leader_stats(log_data)
+
+
+def test_archive_matches_calculate_stats(log_data, tmp_path):
+    games = log_data["pastGames"]
+    write_json(tmp_path / "a.json", dict(log_data, pastGames=games[:30]))
+    write_json(tmp_path / "b.json", dict(log_data, pastGames=games[30:]))
+    assert stats_view(accumulate_archive([str(tmp_path)], jobs=1)) == calculate_stats(log_data)
+
+
+def test_vectorized_matches_calculate_stats(log_data):
+    pytest.importorskip("numpy")
+    from round_table import calculate_stats_vectorized
+    assert calculate_stats_vectorized(log_data) == calculate_stats(log_data)
+
+
+def test_cached_table_matches_calculate_stats(log_data, tmp_path):
+    pytest.importorskip("numpy")
+    from game_cache import open_cached
+    from round_table import RoundTable, accumulate
+    path = write_ndjson(tmp_path / "data.ndjson", log_data)
+    table, header = open_cached(path, str(tmp_path / "data.ktwc"))
+    assert header["frequentNames"] == log_data["frequentNames"]
+    assert stats_view(accumulate(table)) == calculate_stats(log_data)
+    table, _ = RoundTable.from_log(path)
+    assert stats_view(accumulate(table)) == calculate_stats(log_data)
+
+
+@pytest.mark.parametrize("key, value, error", [
+    ("leader", None, "missing leader"),
+    ("points", 7.5, "points must be a non-negative whole number"),
+    ("points", True, "points must be a non-negative whole number"),
+])
+def test_table_rejects_what_the_accumulator_rejects(log_data, tmp_path, key, value, error):
+    pytest.importorskip("numpy")
+    from round_table import RoundTable
+    if value is None:
+        del log_data["pastGames"][4]["rounds"][2][key]
+    else:
+        log_data["pastGames"][4]["rounds"][2][key] = value
+    with pytest.raises(GameLogError, match=f"(?i)round 2: {error}"):
+        StatsAccumulator(log_data["frequentNames"]).extend(log_data["pastGames"])
+    with pytest.raises(GameLogError, match=f"(?i)round 2: {error}"):
+        RoundTable.from_log(write_json(tmp_path / "data.json", log_data))
+
+
+def test_game_key_is_the_same_for_a_dict_and_its_record(log_data):
+    raw = dict(log_data["pastGames"][0], comment="not exported by the app")
+    del raw["scores"]
+    record = Game.from_dict(raw)
+    assert game_key(raw) == game_key(record) == game_key(record.to_dict())
+    assert game_key(raw) != game_key(log_data["pastGames"][0])
+
+
+def test_empty_log(log_data, tmp_path):
+    empty = dict(log_data, pastGames=[])
+    stats = calculate_stats(empty)
+    assert all(entry['games_played'] == 0 for entry in stats['player_stats'].values())
+    assert stats['most_wanted']['player'] is None
+    assert stats['unstoppable_trio'] == {'players': None, 'wins': 0}
+    assert calculate_stats_from_file(write_json(tmp_path / "data.json", empty)) == stats
+    assert calculate_stats_from_file(write_ndjson(tmp_path / "data.ndjson", empty)) == stats
+
+
+def test_undated_game(log_data, tmp_path):
+    undated = copy.deepcopy(log_data)
+    del undated["pastGames"][3]["date"]
+    assert calculate_stats(undated) == calculate_stats(log_data)
+    assert calculate_stats_from_file(write_json(tmp_path / "data.json", undated)) == calculate_stats(log_data)
+
+
+def test_ndjson_header_sets_frequent_players(log_data, tmp_path):
+    # Without the header line nobody is frequent, so nothing is counted
+    headless = write_ndjson(tmp_path / "headless.ndjson", log_data, header=False)
+    assert calculate_stats_from_file(headless)['player_stats'] == {}
+    with_header = write_ndjson(tmp_path / "data.ndjson", log_data)
+    assert list(calculate_stats_from_file(with_header)['player_stats']) == log_data["frequentNames"]
+
+
+
+def test_identical_games_are_counted_twice(log_data, tmp_path):
+    snapshot = str(tmp_path / "snapshot.json")
+    path = write_json(tmp_path / "data.json", log_data)
+    calculate_stats_incremental(path, snapshot)
+
+    doubled = copy.deepcopy(log_data)
+    doubled["pastGames"].insert(0, copy.deepcopy(log_data["pastGames"][5]))
+    write_json(path, doubled)
+    assert calculate_stats_incremental(path, snapshot) == calculate_stats(doubled)
+    assert StatsAccumulator.load(snapshot).num_games() == len(doubled["pastGames"])
+
+
+@pytest.mark.parametrize("change", ["edit", "delete"])
+def test_snapshot_is_rebuilt_when_a_counted_game_changes(log_data, tmp_path, change):
+    snapshot = str(tmp_path / "snapshot.json")
+    path = write_json(tmp_path / "data.json", log_data)
+    calculate_stats_incremental(path, snapshot)
+
+    changed = copy.deepcopy(log_data)
+    if change == "edit":
+        changed["pastGames"][7]["rounds"][0]["result"] = not changed["pastGames"][7]["rounds"][0]["result"]
+    else:
+        del changed["pastGames"][7]
+    write_json(path, changed)
+    assert calculate_stats_incremental(path, snapshot) == calculate_stats(changed)
+    assert stats_view(StatsAccumulator.load(snapshot)) == calculate_stats(changed)
+
+
+def test_sync_leaves_a_stale_accumulator_untouched(log_data):
+    accumulator = StatsAccumulator(log_data["frequentNames"])
+    accumulator.extend(log_data["pastGames"])
+    before = stats_view(accumulator)
+    assert accumulator.sync(log_data["pastGames"][1:] + [log_data["pastGames"][1]]) is None
+    assert stats_view(accumulator) == before
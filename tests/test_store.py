@@ -0,0 +1,56 @@
+"""The SQLite game store (store.py) against calculate_stats on the same games."""
+import copy
+
+from conftest import write_json, write_ndjson
+from data import calculate_stats, stats_view
+from store import GameStore
+
+
+def _store_stats(db_path):
+    with GameStore(str(db_path)) as store:
+        return stats_view(store.accumulate())
+
+
+def test_store_matches_calculate_stats(log_data, tmp_path):
+    path = write_ndjson(tmp_path / "data.ndjson", log_data)
+    with GameStore(str(tmp_path / "games.db")) as store:
+        assert store.import_log(path) == len(log_data["pastGames"])
+        assert store.import_log(path) == 0
+        assert store.header()["frequentNames"] == log_data["frequentNames"]
+    assert _store_stats(tmp_path / "games.db") == calculate_stats(log_data)
+
+
+def test_latest_frequent_names_win(log_data, tmp_path):
+    db_path = tmp_path / "games.db"
+    path = write_json(tmp_path / "data.json", log_data)
+    with GameStore(str(db_path)) as store:
+        store.import_log(path)
+
+    changed = copy.deepcopy(log_data)
+    changed["frequentNames"] = changed["frequentNames"][::-1][:-1]
+    write_json(path, changed)
+    with GameStore(str(db_path)) as store:
+        assert store.import_log(path) == 0
+        assert store.frequent_players() == changed["frequentNames"]
+    assert _store_stats(db_path) == calculate_stats(changed)
+
+
+def test_several_logs_share_their_frequent_names(log_data, tmp_path):
+    games = log_data["pastGames"]
+    first = write_json(tmp_path / "a.json", dict(log_data, frequentNames=log_data["frequentNames"][:2],
+                                                 pastGames=games[:30]))
+    second = write_json(tmp_path / "b.json", dict(log_data, frequentNames=log_data["frequentNames"][1:],
+                                                  pastGames=games[30:]))
+    with GameStore(str(tmp_path / "games.db")) as store:
+        assert store.import_logs([first, second]) == len(games)
+        assert store.frequent_players() == log_data["frequentNames"]
+    assert _store_stats(tmp_path / "games.db") == calculate_stats(log_data)
+
+
+def test_readonly_path_with_uri_characters(log_data, tmp_path):
+    db_path = tmp_path / "season?1#final.db"
+    with GameStore(str(db_path)) as store:
+        store.import_log(write_json(tmp_path / "data.json", log_data))
+    with GameStore(str(db_path), readonly=True) as store:
+        assert store.num_games() == len(log_data["pastGames"])
+        assert stats_view(store.accumulate()) == calculate_stats(log_data)
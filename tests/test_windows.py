@@ -0,0 +1,68 @@
+"""Windowed stats (windows.py) against calculate_stats on the same games."""
+import copy
+import os
+import subprocess
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from conftest import ROOT, write_json
+from data import calculate_stats
+from round_table import RoundTable
+from windows import WindowIndex
+
+
+def _index(data):
+    return WindowIndex.from_table(RoundTable.from_games(data["pastGames"], data["frequentNames"]))
+
+
+def _without_podium(player_stats):
+    return {player: {key: value for key, value in entry.items() if key != 'podium_1st'}
+            for player, entry in player_stats.items()}
+
+
+def _newest(data, n):
+    games = sorted(data["pastGames"], key=lambda game: game["date"])[-n:]
+    return dict(data, pastGames=games)
+
+
+def test_whole_history_matches_calculate_stats(log_data):
+    index = _index(log_data)
+    expected = _without_podium(calculate_stats(log_data)["player_stats"])
+    assert index.window(0, index.num_games) == expected
+    assert index.since("1970-01-01") == expected
+
+
+def test_last_games_matches_calculate_stats_of_those_games(log_data):
+    expected = _without_podium(calculate_stats(_newest(log_data, 10))["player_stats"])
+    assert _index(log_data).last_games(10) == expected
+
+
+def test_month_matches_calculate_stats_of_that_month(log_data):
+    month = sorted(log_data["pastGames"], key=lambda game: game["date"])[-1]["date"][:7]
+    in_month = dict(log_data, pastGames=[game for game in log_data["pastGames"] if game["date"].startswith(month)])
+    year, number = map(int, month.split("-"))
+    assert _index(log_data).month(year, number) == _without_podium(calculate_stats(in_month)["player_stats"])
+
+
+def test_date_windows_refuse_undated_games(log_data):
+    undated = copy.deepcopy(log_data)
+    del undated["pastGames"][3]["date"]
+    index = _index(undated)
+    with pytest.raises(ValueError, match="1 of 74"):
+        index.since("2025-01-01")
+    with pytest.raises(ValueError):
+        index.month(2025, 7)
+    # Windows by position still work, in log order
+    assert index.window(0, index.num_games) == _without_podium(calculate_stats(undated)["player_stats"])
+
+
+def test_trend_window_writes_no_cache_next_to_the_log(log_data, tmp_path):
+    path = write_json(tmp_path / "data.json", log_data)
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    subprocess.run([sys.executable, os.path.join(ROOT, "data.py"), path, "--trend-window", "5"],
+                   cwd=tmp_path, env=env, check=True, capture_output=True)
+    assert not any(name.endswith(".ktwc") for name in os.listdir(tmp_path))
+    assert (tmp_path / "wrapped_data.js").exists()
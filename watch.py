@@ -0,0 +1,411 @@
+"""
+Watch a game log and keep wrapped_data.js up to date.
+
+Made for game nights: leave it running and every time the log is saved
+the page's data is refreshed, usually within a few hundred milliseconds.
+
+- Changes are picked up with inotify on Linux (watching the directory, so
+  saves that write a temp file and rename it over the log are seen too),
+  or by polling the file's size and mtime elsewhere.
+- A burst of writes is debounced into one update.
+- The new text is diffed against the previous version: games that sit in
+  the unchanged prefix or suffix are not decoded again, only the games in
+  between are. That works whether the app prepends new games (newest
+  first) or appends them, and for NDJSON logs.
+- New games are folded into the running accumulator; if a game was
+  edited or removed, or the header (frequentNames, rules) changed, the
+  log is reprocessed from scratch instead.
+- wrapped_data.js is written through slide_writer, so it is replaced
+  atomically and only when the deck actually changed.
+
+    python3 watch.py data.json
+    python3 data.py --watch
+"""
+import argparse
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import time
+from collections import Counter
+
+from data import SNAPSHOT_FILE, build_slides, stats_view
+from ingest import is_ndjson_header
+from instrument import metrics
+from model import GameLogError
+from rankings import build_leaderboards
+from slide_writer import COMPRESSIONS, write_slides
+from stats_core import StatsAccumulator, resume_accumulator
+
+DEBOUNCE = 0.1        # Seconds of quiet after a write before updating
+MAX_DELAY = 1.0       # Update anyway if writes keep coming for this long
+POLL_INTERVAL = 0.2   # Seconds between checks when inotify isn't available
+COMPARE_BLOCK = 1 << 16
+_SEPARATORS = " \t\n\r,"
+
+
+class LogTail:
+    """
+    The current text of a game log and where each top-level object sits in
+    it, so the next version can be matched against this one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.ndjson = path.endswith((".ndjson", ".jsonl"))
+        self.decoder = json.JSONDecoder()
+        self.text = ""
+        self.header = {}
+        # (start, end) of the text games live in: inside pastGames' brackets,
+        # or the whole file for NDJSON
+        self.region = (0, 0)
+        # (start, end, is_game) of every object in the region, in file order
+        self.spans = []
+
+    def _read(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def load(self):
+        """Read the whole log. Returns its games (raw dicts) in file order."""
+        text = self._read()
+        header = {}
+        if self.ndjson:
+            start = 0
+            items, end = self._scan(text, 0, len(text))
+        else:
+            items, start, end = None, None, None
+            pos = self._skip(text, 0, " \t\n\r")
+            if text[pos:pos + 1] != "{":
+                raise ValueError(f"{self.path} is not a JSON object")
+            pos += 1
+            while True:
+                pos = self._skip(text, pos, _SEPARATORS)
+                if text[pos:pos + 1] == "}":
+                    break
+                key, pos = self.decoder.raw_decode(text, pos)
+                pos = self._skip(text, pos, " \t\n\r")
+                if text[pos:pos + 1] != ":":
+                    raise ValueError(f"Expected ':' after {key!r} in {self.path}")
+                pos = self._skip(text, pos + 1, " \t\n\r")
+                if key == "pastGames":
+                    if text[pos:pos + 1] != "[":
+                        raise ValueError(f"pastGames in {self.path} is not a list")
+                    start = pos + 1
+                    items, end = self._scan(text, start, len(text))
+                    if text[end:end + 1] != "]":
+                        raise ValueError(f"Unterminated pastGames in {self.path}")
+                    pos = end + 1
+                else:
+                    header[key], pos = self.decoder.raw_decode(text, pos)
+            if items is None:
+                items, start, end = [], pos, pos
+
+        games = []
+        spans = []
+        for index, (span_start, span_end, value) in enumerate(items):
+            if self.ndjson and is_ndjson_header(value, index):
+                header = value
+                spans.append((span_start, span_end, False))
+            else:
+                games.append(value)
+                spans.append((span_start, span_end, True))
+        self.text, self.header, self.region, self.spans = text, header, (start, end), spans
+        return games
+
+    def update(self):
+        """
+        Re-read the log and return the games that are new since the last
+        read, or None if it changed in a way that needs a full reload (call
+        load()). Raises ValueError, leaving the state as it was, if the file
+        doesn't parse (e.g. it is still being written).
+        """
+        text = self._read()
+        old = self.text
+        if text == old:
+            return []
+        prefix = _common_prefix(old, text)
+        suffix = _common_suffix(old, text, min(len(old), len(text)) - prefix)
+        delta = len(text) - len(old)
+        start, end = self.region
+        if prefix < start or len(old) - suffix > end:
+            return None  # Something outside the games changed
+
+        # Objects untouched at either end, and the stretch between them to decode again
+        head = 0
+        while head < len(self.spans) and self.spans[head][1] <= prefix:
+            head += 1
+        tail = len(self.spans)
+        while tail > head and self.spans[tail - 1][0] >= len(old) - suffix:
+            tail -= 1
+        changed_start = self.spans[head - 1][1] if head else start
+        changed_end = self.spans[tail][0] if tail < len(self.spans) else end
+
+        items, stop = self._scan(text, changed_start, changed_end + delta)
+        if stop != changed_end + delta:
+            return None
+        # Games are matched by their text, counting repeats: two identical games are two games
+        old_texts = Counter()
+        for span_start, span_end, is_game in self.spans[head:tail]:
+            if not is_game:
+                return None
+            old_texts[old[span_start:span_end]] += 1
+        if any(self.ndjson and "rounds" not in value for _, _, value in items):
+            return None  # A new header line, or a line that isn't a game: load() sorts it out
+        added = []
+        for span_start, span_end, value in items:
+            game_text = text[span_start:span_end]
+            if old_texts[game_text]:
+                old_texts[game_text] -= 1
+            else:
+                added.append(value)
+        if any(old_texts.values()):
+            return None  # A game was edited or removed
+        self.spans = (self.spans[:head]
+                      + [(span_start, span_end, True) for span_start, span_end, _ in items]
+                      + [(span_start + delta, span_end + delta, is_game)
+                         for span_start, span_end, is_game in self.spans[tail:]])
+        self.text, self.region = text, (start, end + delta)
+        return added
+
+    def _scan(self, text, pos, stop):
+        """Decode the objects in text[pos:stop], returning ([(start, end, value)], where scanning stopped)."""
+        items = []
+        while True:
+            pos = self._skip(text, pos, _SEPARATORS, stop)
+            if pos >= stop or text[pos] == "]":
+                return items, pos
+            value, end = self.decoder.raw_decode(text, pos)
+            if end > stop:
+                raise ValueError(f"Game at offset {pos} in {self.path} runs past the end of the changed text")
+            if not isinstance(value, dict):
+                raise ValueError(f"Expected a game object at offset {pos} in {self.path}")
+            items.append((pos, end, value))
+            pos = end
+
+    @staticmethod
+    def _skip(text, pos, chars, stop=None):
+        stop = len(text) if stop is None else stop
+        while pos < stop and text[pos] in chars:
+            pos += 1
+        return pos
+
+
+def _common_prefix(a, b):
+    """Length of the common prefix of two strings, compared block by block."""
+    limit = min(len(a), len(b))
+    pos = 0
+    while pos < limit and a[pos:pos + COMPARE_BLOCK] == b[pos:pos + COMPARE_BLOCK]:
+        pos += COMPARE_BLOCK
+    pos = min(pos, limit)
+    end = min(pos + COMPARE_BLOCK, limit)
+    while pos < end and a[pos] == b[pos]:
+        pos += 1
+    return pos
+
+
+def _common_suffix(a, b, limit):
+    """Length of the common suffix of two strings, at most limit."""
+    size = 0
+    while size < limit:
+        step = min(COMPARE_BLOCK, limit - size)
+        if a[len(a) - size - step:len(a) - size] != b[len(b) - size - step:len(b) - size]:
+            break
+        size += step
+    else:
+        return size
+    while size < limit and a[len(a) - size - 1] == b[len(b) - size - 1]:
+        size += 1
+    return size
+
+
+# --- Change notification ---------------------------------------------------
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+
+class InotifyWatcher:
+    """Linux inotify on the log's directory, filtered to events for the log itself."""
+
+    def __init__(self, path):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.name = os.fsencode(os.path.basename(path))
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        directory = os.fsencode(os.path.dirname(os.path.abspath(path)))
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, directory, mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed on {directory!r}")
+
+    def wait(self, timeout=None):
+        """Block until the log changes (True) or timeout seconds pass (False)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self.fd], [], [], remaining)
+            if not readable:
+                return False
+            if self._drain():
+                return True
+
+    def _drain(self):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return False
+        relevant = False
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            _, _, _, length = _EVENT.unpack_from(data, pos)
+            name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0")
+            relevant |= name == self.name
+            pos += _EVENT.size + length
+        return relevant
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Checks the log's size, mtime and inode every interval seconds."""
+
+    def __init__(self, path, interval=POLL_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.signature = self._signature()
+
+    def _signature(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            signature = self._signature()
+            if signature != self.signature:
+                self.signature = signature
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            pause = self.interval if deadline is None else min(self.interval, max(0.0, deadline - time.monotonic()))
+            time.sleep(pause)
+
+    def close(self):
+        pass
+
+
+def make_watcher(path, polling=False):
+    """inotify where the platform has it, polling otherwise."""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(path)
+        except (OSError, AttributeError):
+            pass  # No usable inotify (e.g. some containers), fall back to polling
+    return PollingWatcher(path)
+
+
+def wait_for_change(watcher, debounce=DEBOUNCE, max_delay=MAX_DELAY):
+    """Block until the log changes, then until writes stop for debounce seconds (at most max_delay)."""
+    watcher.wait()
+    settled_by = time.monotonic() + max_delay
+    while time.monotonic() < settled_by and watcher.wait(min(debounce, max(0.0, settled_by - time.monotonic()))):
+        pass
+
+
+# --- Watch loop ------------------------------------------------------------
+
+def _full_load(tail, snapshot_path):
+    games = tail.load()
+    frequent_players = list(dict.fromkeys(tail.header.get('frequentNames', [])))
+    if snapshot_path:
+        accumulator = resume_accumulator(snapshot_path, frequent_players)
+        if accumulator.sync(games) is not None:
+            return accumulator
+    accumulator = StatsAccumulator(frequent_players)
+    accumulator.extend(games)
+    return accumulator
+
+
+def _emit(accumulator, output, pretty, compress):
+    stats = stats_view(accumulator)
+    slides = build_slides(stats, leaderboards=build_leaderboards(stats['player_stats']))
+    return write_slides(output, slides, pretty=pretty, compress=compress)
+
+
+def watch(path, output="wrapped_data.js", snapshot_path=SNAPSHOT_FILE, polling=False, pretty=True, compress=(),
+          debounce=DEBOUNCE, max_updates=None):
+    """
+    Keep output up to date with the game log at path until interrupted (or
+    after max_updates updates). With snapshot_path, the snapshot is
+    refreshed after each update so a later one-off run starts warm.
+    """
+    tail = LogTail(path)
+    with metrics.span('watch_load'):
+        accumulator = _full_load(tail, snapshot_path)
+    changed = _emit(accumulator, output, pretty, compress)
+    print(f"Watching {path} ({accumulator.num_games()} games), "
+          f"{output} {'written' if changed else 'already up to date'}")
+    watcher = make_watcher(path, polling)
+    updates = 0
+    try:
+        while max_updates is None or updates < max_updates:
+            wait_for_change(watcher, debounce)
+            started = time.perf_counter()
+            try:
+                added = tail.update()
+                if added is None:
+                    accumulator, added = _full_load(tail, None), None
+                elif added:
+                    accumulator.extend(added)
+                else:
+                    continue  # Nothing but formatting changed
+            except GameLogError as err:
+                print(f"✗ {path}: {err}; waiting for the next save")
+                continue
+            except (OSError, ValueError) as err:
+                # Usually a save in progress; the next write event will try again
+                print(f"… {path} could not be read ({err}); waiting for the next save")
+                continue
+            changed = _emit(accumulator, output, pretty, compress)
+            elapsed = (time.perf_counter() - started) * 1000
+            metrics.add_time('watch_update', elapsed / 1000)
+            what = "reloaded" if added is None else f"{len(added)} new game{'s' if len(added) != 1 else ''}"
+            print(f"✓ {what}, {output} {'updated' if changed else 'unchanged'} in {elapsed:.0f} ms")
+            if snapshot_path:
+                accumulator.save(snapshot_path)
+            updates += 1
+    finally:
+        watcher.close()
+    return accumulator
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild wrapped_data.js whenever the game log changes.")
+    parser.add_argument("log", nargs="?", default="data.json", help="game log to watch (default: data.json)")
+    parser.add_argument("--output", default="wrapped_data.js", help="deck to keep up to date (default: wrapped_data.js)")
+    parser.add_argument("--polling", action="store_true", help="poll the file instead of using inotify")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE,
+                        help=f"seconds of quiet before updating (default: {DEBOUNCE})")
+    parser.add_argument("--minify", action="store_true", help="write the deck without indentation")
+    parser.add_argument("--compress", nargs="+", choices=COMPRESSIONS, default=(), metavar="FORMAT",
+                        help="also write precompressed .gz / .br files (br needs the brotli package)")
+    args = parser.parse_args()
+    try:
+        watch(args.log, args.output, polling=args.polling, pretty=not args.minify, compress=args.compress,
+              debounce=args.debounce)
+    except KeyboardInterrupt:
+        pass
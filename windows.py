@@ -0,0 +1,211 @@
+"""
+Time-windowed and rolling statistics over a RoundTable.
+
+Per-player counters are laid out as (games + 1, players) prefix sums in
+chronological game order, so the stats for any range of games are one
+subtraction per player, however long the history is:
+
+    index = WindowIndex.from_table(table)
+    index.last_games(10)             # the league's last 10 games
+    index.player_last_games(10)      # each player's own last 10 games
+    index.month(2025, 7)             # games played in July 2025
+    index.since("2025-01-01")        # season to date
+    index.rolling("round_win_pct", 10)   # series for a chart slide
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+
+from data import CLUTCH_THRESHOLD
+from round_table import NO_DATE
+
+# Counters kept per game and player, in the same sense as data.stats_view:
+# only rounds led by frequent players count
+COUNTERS = ('leader_count', 'leader_wins', 'clutch_wins', 'teammate_count', 'teammate_wins', 'games_played')
+
+# Rates derived from two counters: (numerator counters, denominator counters)
+RATES = {
+    'round_win_pct': (('leader_wins', 'teammate_wins'), ('leader_count', 'teammate_count')),
+    'leader_conv_rate': (('leader_wins',), ('leader_count',)),
+    'teammate_win_rate': (('teammate_wins',), ('teammate_count',)),
+}
+
+
+class WindowIndex:
+    """Prefix sums of every per-player counter, indexed by chronological game position."""
+
+    def __init__(self, players, dates, prefix):
+        self.players = players    # frequent players, in column order
+        self.dates = dates        # ms since the epoch per game position, oldest first
+        self.prefix = prefix      # counter name -> (games + 1, players) int32 prefix sums
+
+    @classmethod
+    def from_table(cls, table, clutch_threshold=CLUTCH_THRESHOLD):
+        """Build the index from a RoundTable. Frequent players hold IDs 0..F-1."""
+        num_frequent = len(table.frequent_order)
+        order = table.chronological_order()
+        # Position of each game in chronological order
+        position = np.empty(table.num_games, dtype=np.int64)
+        position[order] = np.arange(table.num_games)
+
+        leader_frequent = table.frequent(table.leader)
+        won = leader_frequent & table.result
+        width = table.mates.shape[1]
+        mates = table.mates.ravel()
+        led = (table.frequent(table.mates) & leader_frequent[:, None]).ravel()
+        mate_won = led & np.repeat(table.result, width)
+        mate_games = np.repeat(position[table.game], width)
+        leader_games = position[table.game]
+
+        def per_game(games, players, mask):
+            cells = games[mask] * num_frequent + players[mask]
+            counts = np.bincount(cells, minlength=table.num_games * num_frequent)
+            return counts.reshape(table.num_games, num_frequent)
+
+        counts = {
+            'leader_count': per_game(leader_games, table.leader, leader_frequent),
+            'leader_wins': per_game(leader_games, table.leader, won),
+            'clutch_wins': per_game(leader_games, table.leader, won & (table.points >= clutch_threshold)),
+            'teammate_count': per_game(mate_games, mates, led),
+            'teammate_wins': per_game(mate_games, mates, mate_won),
+        }
+        # A game counts as played if the player held any counted seat in it
+        counts['games_played'] = ((counts['leader_count'] + counts['teammate_count']) > 0).astype(np.int64)
+
+        prefix = {}
+        for name, matrix in counts.items():
+            cumulative = np.zeros((table.num_games + 1, num_frequent), dtype=np.int32)
+            np.cumsum(matrix, axis=0, out=cumulative[1:])
+            prefix[name] = cumulative
+
+        return cls(list(table.frequent_order), table.game_date[order], prefix)
+
+    @property
+    def num_games(self):
+        return len(self.dates)
+
+    def counters(self, start, stop):
+        """Raw counter totals per player for game positions [start, stop)."""
+        return {name: self.prefix[name][stop] - self.prefix[name][start] for name in COUNTERS}
+
+    def window(self, start, stop):
+        """Stats per player for game positions [start, stop), shaped like data.stats_view's player_stats."""
+        start, stop = max(0, start), min(self.num_games, stop)
+        stop = max(start, stop)
+        return self._player_stats(self.counters(start, stop))
+
+    def last_games(self, n):
+        """Stats over the league's last n games."""
+        return self.window(self.num_games - n, self.num_games)
+
+    def player_last_games(self, n):
+        """Stats over each player's own last n games played."""
+        played = self.prefix['games_played']
+        totals = {name: np.zeros(len(self.players), dtype=np.int64) for name in COUNTERS}
+        for col in range(len(self.players)):
+            # First position where the player's remaining games fit in n
+            start = int(np.searchsorted(played[:, col], played[-1, col] - n, side='right')) - 1
+            start = max(start, 0)
+            for name in COUNTERS:
+                totals[name][col] = self.prefix[name][-1, col] - self.prefix[name][start, col]
+        return self._player_stats(totals)
+
+    def between(self, start, end=None):
+        """
+        Stats over games dated in [start, end). Dates are datetimes or ISO
+        strings. Raises ValueError unless every game has a date.
+        """
+        self._check_dated()
+        first = int(np.searchsorted(self.dates, _to_ms(start), side='left')) if start is not None else 0
+        last = int(np.searchsorted(self.dates, _to_ms(end), side='left')) if end is not None else self.num_games
+        return self.window(first, last)
+
+    def since(self, start):
+        """Stats from a date onwards, e.g. season to date."""
+        return self.between(start)
+
+    def month(self, year, month):
+        """Stats over the games played in one calendar month (UTC)."""
+        start = datetime(year, month, 1, tzinfo=timezone.utc)
+        end = datetime(year + month // 12, month % 12 + 1, 1, tzinfo=timezone.utc)
+        return self.between(start, end)
+
+    def _check_dated(self):
+        # Undated games leave the index in log order (see RoundTable.chronological_order),
+        # where a binary search by date finds the wrong games. Fully dated, it is sorted by date.
+        undated = int((self.dates == NO_DATE).sum())
+        if undated:
+            raise ValueError(f"Date windows need every game to have a date, {undated} of {self.num_games} don't")
+
+    def rolling(self, metric, window, step=1):
+        """
+        Rolling-window series of one metric (a counter or a rate in RATES)
+        over the last `window` league games, every `step` games. Rates are
+        None where a player had no rounds in the window.
+        Returns {'dates': [...], 'series': {player: [...]}} for charting.
+        """
+        ends = np.arange(min(window, self.num_games), self.num_games + 1, step)
+        starts = np.maximum(ends - window, 0)
+        if metric in RATES:
+            numerators, denominators = RATES[metric]
+            num = sum(self.prefix[name][ends] - self.prefix[name][starts] for name in numerators)
+            den = sum(self.prefix[name][ends] - self.prefix[name][starts] for name in denominators)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = np.round(num / den * 100, 1)
+            values = np.where(den > 0, values, np.nan)
+        else:
+            values = (self.prefix[metric][ends] - self.prefix[metric][starts]).astype(float)
+
+        dates = [_iso(self.dates[end - 1]) if end > 0 else None for end in ends.tolist()]
+        series = {player: [None if np.isnan(v) else v for v in values[:, col].tolist()]
+                  for col, player in enumerate(self.players)}
+        return {'metric': metric, 'window': window, 'dates': dates, 'series': series}
+
+    def _player_stats(self, totals):
+        player_stats = {}
+        for col, player in enumerate(self.players):
+            leader_count = int(totals['leader_count'][col])
+            teammate_count = int(totals['teammate_count'][col])
+            leader_wins = int(totals['leader_wins'][col])
+            teammate_wins = int(totals['teammate_wins'][col])
+            rounds = leader_count + teammate_count
+            player_stats[player] = {
+                'games_played': int(totals['games_played'][col]),
+                'round_win_pct': round((leader_wins + teammate_wins) / rounds * 100, 1) if rounds > 0 else 0,
+                'leader_conv_rate': round(leader_wins / leader_count * 100, 1) if leader_count > 0 else 0,
+                'clutch_wins': int(totals['clutch_wins'][col]),
+                'teammate_count': teammate_count,
+                'teammate_win_rate': round(teammate_wins / teammate_count * 100, 1) if teammate_count > 0 else 0,
+            }
+        return player_stats
+
+
+def trend_slide(index, metric='round_win_pct', window=10, title='The Form Guide', max_points=60):
+    """
+    A "trend" slide charting each player's rolling metric, thinned to at
+    most max_points points so the deck stays small.
+    """
+    step = max(1, (index.num_games - window) // max_points + 1)
+    rolling = index.rolling(metric, window, step)
+    return {
+        'type': 'trend',
+        'title': title,
+        'description': f"Rolling {metric.replace('_', ' ')} over the last {window} games",
+        'dates': rolling['dates'],
+        'series': [{'label': player, 'values': values} for player, values in rolling['series'].items()],
+        'theme': 'theme-3',
+    }
+
+
+def _to_ms(value):
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def _iso(ms):
+    if ms == NO_DATE:
+        return None
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%d')